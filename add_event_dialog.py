@@ -1,26 +1,41 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
+from itertools import islice
 from typing import Optional, List
-from event_manager import Event
+from event_manager import Event, EventManager
+from recurrence import Recurrence
+
+# Prikazni nazivi učestalosti ponavljanja
+RECURRENCE_CHOICES = {
+    "ne ponavlja se": None,
+    "dnevno": "daily",
+    "nedeljno": "weekly",
+    "mesečno": "monthly",
+}
+# Kod serije se preklapanja proveravaju za ovoliko prvih pojava
+CONFLICT_CHECK_OCCURRENCES = 10
+# Najviše preklapanja navedenih u upozorenju
+CONFLICT_LIST_LIMIT = 8
 
 class AddEventDialog:
     
-    def __init__(self, parent, event: Optional[Event] = None):
+    def __init__(self, parent, event: Optional[Event] = None, event_manager: Optional[EventManager] = None):
         self.parent = parent
         self.event = event
+        self.event_manager = event_manager
         self.result = None
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Dodaj događaj" if event is None else "Izmeni događaj")
-        self.dialog.geometry("600x650")
+        self.dialog.geometry("600x770")
         self.dialog.resizable(False, False)
         self.dialog.transient(parent)
         
         self.dialog.update_idletasks()
         x = (self.dialog.winfo_screenwidth() // 2) - (600 // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (650 // 2)
-        self.dialog.geometry(f"600x650+{x}+{y}")
+        y = (self.dialog.winfo_screenheight() // 2) - (770 // 2)
+        self.dialog.geometry(f"600x770+{x}+{y}")
         
         self.create_widgets()
         
@@ -80,9 +95,39 @@ class AddEventDialog:
         notification_combo.grid(row=0, column=1, padx=(0, 5))
         ttk.Label(notification_frame, text="minuta pre").grid(row=0, column=2, sticky=tk.W)
 
+        place_frame = ttk.Frame(main_frame)
+        place_frame.grid(row=7, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 15))
+        
+        ttk.Label(place_frame, text="Trajanje:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
+        self.duration_var = tk.StringVar(value="0")
+        ttk.Spinbox(place_frame, from_=0, to=1440, increment=15, textvariable=self.duration_var, 
+                    width=6).grid(row=0, column=1, padx=(0, 5))
+        ttk.Label(place_frame, text="minuta").grid(row=0, column=2, sticky=tk.W, padx=(0, 20))
+        ttk.Label(place_frame, text="Lokacija:").grid(row=0, column=3, sticky=tk.W, padx=(0, 10))
+        self.location_var = tk.StringVar()
+        ttk.Entry(place_frame, textvariable=self.location_var, width=20).grid(row=0, column=4, sticky=tk.W)
+
+        recurrence_frame = ttk.Frame(main_frame)
+        recurrence_frame.grid(row=8, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 15))
+        
+        ttk.Label(recurrence_frame, text="Ponavljanje:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
+        self.recurrence_var = tk.StringVar(value="ne ponavlja se")
+        ttk.Combobox(recurrence_frame, textvariable=self.recurrence_var, values=list(RECURRENCE_CHOICES),
+                     width=15, state="readonly").grid(row=0, column=1, padx=(0, 10))
+        ttk.Label(recurrence_frame, text="svakih").grid(row=0, column=2, sticky=tk.W, padx=(0, 5))
+        self.interval_var = tk.StringVar(value="1")
+        ttk.Spinbox(recurrence_frame, from_=1, to=99, textvariable=self.interval_var, 
+                    width=4).grid(row=0, column=3, padx=(0, 5))
+        ttk.Label(recurrence_frame, text="Do datuma:").grid(row=1, column=0, sticky=tk.W, padx=(0, 10), pady=(5, 0))
+        self.until_var = tk.StringVar()
+        ttk.Entry(recurrence_frame, textvariable=self.until_var, width=12).grid(row=1, column=1, sticky=tk.W, pady=(5, 0))
+        ttk.Label(recurrence_frame, text="Broj puta:").grid(row=1, column=2, sticky=tk.W, padx=(0, 5), pady=(5, 0))
+        self.count_var = tk.StringVar()
+        ttk.Entry(recurrence_frame, textvariable=self.count_var, width=5).grid(row=1, column=3, pady=(5, 0))
+
         # Tag selection frame
         tag_frame = ttk.LabelFrame(main_frame, text="Tagovi", padding="10")
-        tag_frame.grid(row=7, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 15))
+        tag_frame.grid(row=9, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 15))
         
         self.tag_vars = {}
         tag_checkbuttons_frame = ttk.Frame(tag_frame)
@@ -97,7 +142,7 @@ class AddEventDialog:
         
         # Update button frame row
         button_frame = ttk.Frame(main_frame)
-        button_frame.grid(row=8, column=0, columnspan=2, pady=(10, 0))
+        button_frame.grid(row=10, column=0, columnspan=2, pady=(10, 0))
 
         
         ttk.Button(button_frame, text="Sačuvaj", command=self.save_event).pack(side=tk.LEFT, padx=(0, 10))
@@ -118,11 +163,24 @@ class AddEventDialog:
             self.date_var.set(self.event.date_time.strftime("%Y-%m-%d"))
             self.time_var.set(self.event.date_time.strftime("%H:%M"))
             self.notification_var.set(str(self.event.notification_minutes))
+            self.duration_var.set(str(self.event.duration_minutes))
+            self.location_var.set(self.event.location)
             
             # Set tags
             for tag in self.event.tags:
                 if tag in self.tag_vars:
                     self.tag_vars[tag].set(True)
+            
+            recurrence = self.event.recurrence
+            if recurrence is not None:
+                for label, frequency in RECURRENCE_CHOICES.items():
+                    if frequency == recurrence.frequency:
+                        self.recurrence_var.set(label)
+                self.interval_var.set(str(recurrence.interval))
+                if recurrence.until is not None:
+                    self.until_var.set(recurrence.until.strftime("%Y-%m-%d"))
+                if recurrence.count is not None:
+                    self.count_var.set(str(recurrence.count))
     
     def set_today(self):
         self.date_var.set(datetime.now().strftime("%Y-%m-%d"))
@@ -166,6 +224,21 @@ class AddEventDialog:
             messagebox.showerror("Greška", "Molimo izaberite važeće vreme obaveštenja.")
             return
         
+        try:
+            duration_minutes = int(self.duration_var.get() or 0)
+            if duration_minutes < 0:
+                raise ValueError(duration_minutes)
+        except ValueError:
+            messagebox.showerror("Greška", "Molimo unesite trajanje kao ceo broj minuta (0 ako nema trajanja).")
+            return
+        
+        try:
+            recurrence = self.read_recurrence()
+        except ValueError:
+            messagebox.showerror("Greška", "Molimo unesite važeće ponavljanje: interval i broj puta "
+                                           "kao pozitivne cele brojeve, a datum kao GGGG-MM-DD.")
+            return
+        
         # Get selected tags
         selected_tags = [tag for tag, var in self.tag_vars.items() if var.get()]
         
@@ -174,11 +247,70 @@ class AddEventDialog:
             description=description,
             date_time=event_datetime,
             notification_minutes=notification_minutes,
-            tags=selected_tags
+            tags=selected_tags,
+            recurrence=recurrence,
+            duration_minutes=duration_minutes,
+            location=self.location_var.get().strip()
         )
+        if recurrence is not None and self.event is not None and self.event.recurrence is not None:
+            # Izmena serije ne sme ponovo da najavi već najavljene pojave
+            self.result.notified_occurrences = self.event.notified_occurrences
+        
+        if not self.confirm_conflicts(self.result):
+            self.result = None
+            return
         
         self.dialog.destroy()
     
+    def confirm_conflicts(self, event: Event) -> bool:
+        conflicts = self.find_conflicts(event)
+        if not conflicts:
+            return True
+        
+        lines = []
+        for other in conflicts[:CONFLICT_LIST_LIMIT]:
+            line = f"• {other.date_time.strftime('%d.%m. %H:%M')}-{other.end_time.strftime('%H:%M')}  {other.title}"
+            if other.location:
+                line += f" ({other.location})"
+            if event.location and other.location == event.location:
+                line += " - ista lokacija!"
+            lines.append(line)
+        if len(conflicts) > CONFLICT_LIST_LIMIT:
+            lines.append(f"... i još {len(conflicts) - CONFLICT_LIST_LIMIT}")
+        return messagebox.askyesno("Preklapanje termina", 
+                                   "Događaj se preklapa sa:\n\n" + "\n".join(lines) + 
+                                   "\n\nDa li želite da ga ipak sačuvate?", parent=self.dialog)
+    
+    def find_conflicts(self, event: Event) -> List[Event]:
+        # Događaj bez trajanja ne zauzima vreme; kod serije se proverava
+        # nekoliko prvih pojava, a sama serija koja se menja se izostavlja
+        if self.event_manager is None or not event.duration_minutes:
+            return []
+        exclude_id = self.event.series_id if self.event is not None else None
+        conflicts = {}
+        for occurrence in islice(event.occurrences(), CONFLICT_CHECK_OCCURRENCES):
+            for other in self.event_manager.get_overlapping(occurrence.date_time, occurrence.end_time,
+                                                            exclude_id=exclude_id):
+                conflicts.setdefault(other.id, other)
+        return sorted(conflicts.values(), key=lambda x: x.epoch)
+    
+    def read_recurrence(self) -> Optional[Recurrence]:
+        frequency = RECURRENCE_CHOICES.get(self.recurrence_var.get())
+        if frequency is None:
+            return None
+        
+        interval = int(self.interval_var.get())
+        until_str = self.until_var.get().strip()
+        until = datetime.strptime(until_str, "%Y-%m-%d").replace(hour=23, minute=59) if until_str else None
+        count_str = self.count_var.get().strip()
+        count = int(count_str) if count_str else None
+        if count is not None and count < 1:
+            raise ValueError(count)
+        
+        # Izuzeci (obrisane pojave) ostaju pri izmeni serije
+        exceptions = self.event.recurrence.exceptions if self.event and self.event.recurrence else None
+        return Recurrence(frequency, interval=interval, until=until, count=count, exceptions=exceptions)
+    
     def cancel(self):
         self.dialog.destroy()
     
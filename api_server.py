@@ -0,0 +1,611 @@
+import asyncio
+import hashlib
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+import metrics
+from event_manager import (ARCHIVE_INTERVAL_SECONDS, ConcurrentModificationError, Event, EventManager,
+                           OCCURRENCE_SEPARATOR)
+
+# Lokalni HTTP/JSON API nad jednim zajedničkim skladištem (cli.py serve).
+# Samo standardna biblioteka: asyncio, HTTP/1.1 sa keep-alive, telo zahteva
+# samo uz Content-Length.
+#
+#   GET    /events?start=&end=&any=&all=&none=&q=&archive=1&offset=0&limit=100
+#   GET    /events/<id>
+#   POST   /events              telo: događaj u obliku Event.to_dict, bez id-a
+#   PUT    /events/<id>         uz If-Match: ETag događaja odbija tuđu izmenu (412);
+#                               pojava serije (<serija>@<epoha>) se ne menja
+#                               zasebno (409), menja se cela serija
+#   DELETE /events/<id>
+#   GET    /changes?since=<kursor>&timeout=25
+#                               long-poll; uz Accept: text/event-stream isti
+#                               tok promena ide kao server-sent events
+#   GET    /changes/stream?since=<kursor>
+#                               server-sent events bez obzira na Accept
+#   GET    /metrics             Prometheus format (uz uključena merenja)
+#
+# Upiti nad skladištem idu u bazen niti, a petlja samo čita i piše mreže.
+# Odgovor na /events nosi ETag trenutnog kursora promena: isti upit sa
+# If-None-Match dobija 304 bez upita nad skladištem, a istovremeni isti
+# upiti posle promene dele jedno izvršavanje i jedan serijalizovan odgovor.
+
+HOST = "127.0.0.1"
+PORT = 8765
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Koliko poslednjih promena feed pamti; klijent koji zaostane više dobija reset
+FEED_SIZE = 10_000
+FEED_BATCH = 500
+LONG_POLL_SECONDS = 25.0
+MAX_LONG_POLL_SECONDS = 60.0
+SSE_PING_SECONDS = 15.0
+KEEP_ALIVE_SECONDS = 60.0
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+CACHE_ENTRIES = 256
+WORKERS = 8
+# Bez servisa obaveštenja server sam proverava izmene drugih procesa i arhivira
+CHANGE_POLL_SECONDS = 1.0
+JSON_TYPE = "application/json; charset=utf-8"
+
+REQUESTS = metrics.counter("http_requests_total", "HTTP zahtevi po metodi i statusu")
+REQUEST_TIME = metrics.histogram("http_request_seconds", "Obrada HTTP zahteva (bez čekanja na promene)")
+WAITING = metrics.gauge("http_waiting_clients", "Klijenti koji čekaju na promene (long-poll i SSE)")
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class Request:
+    __slots__ = ('method', 'target', 'segments', 'query', 'headers', 'body', 'version')
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes, version: str):
+        parts = urlsplit(target)
+        self.method = method
+        self.target = target
+        self.segments = [unquote(segment) for segment in parts.path.split("/") if segment]
+        self.query = parse_qs(parts.query)
+        self.headers = headers
+        self.body = body
+        self.version = version
+
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get('connection', "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    def param(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        values = self.query.get(name)
+        return values[-1] if values else default
+
+    def params(self, name: str) -> List[str]:
+        # Ponovljen parametar ili vrednosti odvojene zarezom
+        return [value for item in self.query.get(name, []) for value in item.split(",") if value]
+
+
+class ChangeFeed:
+    # Poslednje promene sa rednim brojevima. Slušalac skladišta se poziva iz
+    # niti koja je menjala događaje, pa se čekaoci u petlji bude preko
+    # call_soon_threadsafe (jednom za niz brzih promena). Kursor nosi oznaku
+    # pokretanja servera, da kursor iz ranijeg pokretanja ne bi važio.
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, size: int = FEED_SIZE):
+        self.instance = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self.changed = asyncio.Event()
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._changes: Deque[Tuple[int, Dict]] = deque(maxlen=size)
+        self._wake_pending = False
+
+    def on_change(self, op: str, event: Optional[Event]) -> None:
+        change: Dict[str, Any] = {'op': op}
+        if event is not None:
+            change['id'] = event.id
+            if op != 'remove':
+                change['event'] = event_json(event)
+        with self._lock:
+            self.seq += 1
+            self._changes.append((self.seq, change))
+            if self._wake_pending:
+                return
+            self._wake_pending = True
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self) -> None:
+        with self._lock:
+            self._wake_pending = False
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def cursor(self, seq: Optional[int] = None) -> str:
+        return f"{self.instance}-{self.seq if seq is None else seq}"
+
+    def since(self, cursor: str) -> Optional[List[Tuple[int, Dict]]]:
+        # Promene posle kursora (najviše FEED_BATCH); None ako kursor ne važi
+        # ili su neke promene već ispale iz dnevnika, pa klijent mora sve ponovo
+        instance, _, value = cursor.partition("-")
+        with self._lock:
+            if instance != self.instance or not value.isdigit() or int(value) > self.seq:
+                return None
+            start = int(value)
+            if start == self.seq:
+                return []
+            first = start + 1 - self._changes[0][0] if self._changes else -1
+            if first < 0:
+                return None
+            return list(islice(self._changes, first, first + FEED_BATCH))
+
+
+class ApiServer:
+    def __init__(self, manager: EventManager, notification_service=None, host: str = HOST, port: int = PORT,
+                 workers: int = WORKERS):
+        self.manager = manager
+        self.notification_service = notification_service
+        self.host = host
+        self.port = port
+        self.feed: Optional[ChangeFeed] = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        # URL upita -> (redni broj promene, odgovor u pripremi ili gotov)
+        self._cache: "OrderedDict[str, Tuple[int, asyncio.Future]]" = OrderedDict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._poller: Optional[asyncio.Task] = None
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._waiting = 0
+        self._closing = False
+
+    async def start(self) -> None:
+        self.feed = ChangeFeed(asyncio.get_running_loop())
+        self.manager.add_listener(self.feed.on_change)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.notification_service is None:
+            self._poller = asyncio.create_task(self._poll_changes())
+
+    async def close(self) -> None:
+        # Veze se zatvaraju, a čekaoci promena bude, pa se obrade završe same
+        self._closing = True
+        self._server.close()
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+        self.feed.changed.set()
+        for writer in list(self._connections.values()):
+            writer.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self.manager.remove_listener(self.feed.on_change)
+        self._executor.shutdown(wait=True)
+
+    async def _call(self, func: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def _poll_changes(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_archive = loop.time() + ARCHIVE_INTERVAL_SECONDS
+        while True:
+            await asyncio.sleep(CHANGE_POLL_SECONDS)
+            try:
+                await self._call(self.manager.poll_changes)
+                if loop.time() >= next_archive:
+                    next_archive = loop.time() + ARCHIVE_INTERVAL_SECONDS
+                    await self._call(self.manager.archive_old_events)
+            except Exception as e:
+                print(f"Greška pri proveri izmena: {e}")
+
+    # --- veza i HTTP ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_SECONDS)
+                except HttpError as e:
+                    writer.write(encode_response(e.status, e.headers, error_body(str(e)), False))
+                    await writer.drain()
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                if is_stream(request):
+                    REQUESTS.inc(method=request.method, status="200")
+                    await self._stream_changes(request, writer)
+                    break
+                loop = asyncio.get_running_loop()
+                started = loop.time()
+                status, headers, body = await self._respond(request)
+                if request.segments != ["changes"]:
+                    REQUEST_TIME.observe(loop.time() - started)
+                REQUESTS.inc(method=request.method, status=str(status))
+                keep_alive = request.keep_alive and not self._closing
+                writer.write(encode_response(status, headers, body, keep_alive, request.method == "HEAD"))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def _respond(self, request: Request) -> Tuple[int, Dict[str, str], bytes]:
+        try:
+            return await self._route(request)
+        except HttpError as e:
+            return e.status, e.headers, error_body(str(e))
+        except Exception as e:
+            metrics.ERRORS.inc(where="api")
+            print(f"Greška u obradi zahteva {request.method} {request.target}: {e!r}")
+            return 500, {}, error_body("Interna greška servera")
+
+    async def _route(self, request: Request) -> Tuple[int, Dict[str, str], bytes]:
+        segments = request.segments
+        method = "GET" if request.method == "HEAD" else request.method
+        if segments == ["events"]:
+            if method == "GET":
+                return await self._list_events(request)
+            if method == "POST":
+                return await self._create_event(request)
+            allowed = "GET, HEAD, POST"
+        elif len(segments) == 2 and segments[0] == "events":
+            if method == "GET":
+                return await self._get_event(request, segments[1])
+            if method == "PUT":
+                return await self._update_event(request, segments[1])
+            if method == "DELETE":
+                return await self._delete_event(segments[1])
+            allowed = "GET, HEAD, PUT, DELETE"
+        elif segments == ["changes"]:
+            if method == "GET":
+                return await self._long_poll(request)
+            allowed = "GET"
+        elif segments == ["changes", "stream"]:
+            # GET ovde ne stiže (is_stream), već ide u _stream_changes
+            allowed = "GET"
+        elif segments == ["metrics"]:
+            if method == "GET":
+                return 200, {'Content-Type': "text/plain; version=0.0.4"}, metrics.render().encode('utf-8')
+            allowed = "GET"
+        else:
+            raise HttpError(404, "Nepoznata putanja")
+        raise HttpError(405, "Metoda nije dozvoljena", {'Allow': allowed})
+
+    # --- događaji ---
+
+    async def _list_events(self, request: Request) -> Tuple[int, Dict[str, str], bytes]:
+        # Kursor se čita pre upita, pa je sadržaj bar toliko nov koliko ETag kaže
+        seq = self.feed.seq
+        headers = {'ETag': f'"{self.feed.cursor(seq)}"', 'Cache-Control': "no-cache"}
+        if etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+            return 304, headers, b""
+        entry = self._cache.get(request.target)
+        if entry is None or entry[0] != seq:
+            query = events_query(request)
+            future = asyncio.ensure_future(self._call(query_events, self.manager, query))
+            future.add_done_callback(lambda done, target=request.target: self._forget_failed(target, done))
+            entry = self._cache[request.target] = (seq, future)
+            while len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(request.target)
+        body = await asyncio.shield(entry[1])
+        return 200, headers, body
+
+    def _forget_failed(self, target: str, future: asyncio.Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            entry = self._cache.get(target)
+            if entry is not None and entry[1] is future:
+                del self._cache[target]
+
+    async def _get_event(self, request: Request, event_id: str) -> Tuple[int, Dict[str, str], bytes]:
+        event = await self._call(find_event, self.manager, event_id)
+        if event is None:
+            raise HttpError(404, "Događaj ne postoji")
+        body = json_body(event_json(event))
+        headers = {'ETag': body_etag(body)}
+        if etag_matches(request.headers.get('if-none-match'), headers['ETag']):
+            return 304, headers, b""
+        return 200, headers, body
+
+    async def _create_event(self, request: Request) -> Tuple[int, Dict[str, str], bytes]:
+        event = event_from_json(parse_json(request))
+        await self._call(self.manager.add_event, event)
+        body = json_body(event_json(event))
+        return 201, {'Location': f"/events/{quote(event.id)}", 'ETag': body_etag(body)}, body
+
+    async def _update_event(self, request: Request, event_id: str) -> Tuple[int, Dict[str, str], bytes]:
+        # Pojava nema svoje ponavljanje, pa bi njeno telo zamenilo seriju jednim
+        # događajem; DELETE nad pojavom briše samo nju, a PUT ide na seriju
+        series_id, separator, _ = event_id.partition(OCCURRENCE_SEPARATOR)
+        if separator:
+            raise HttpError(409, f"Pojava serije se ne menja zasebno; izmenite seriju /events/{quote(series_id)}",
+                            {'Content-Location': f"/events/{quote(series_id)}"})
+        updated = event_from_json(parse_json(request), event_id)
+        condition = request.headers.get('if-match')
+
+        def update() -> None:
+            expected = None
+            if condition is not None:
+                current = find_event(self.manager, event_id)
+                if current is None:
+                    raise HttpError(404, "Događaj ne postoji")
+                if not etag_matches(condition, body_etag(json_body(event_json(current)))):
+                    raise HttpError(412, "Događaj je u međuvremenu izmenjen")
+                expected = current
+            try:
+                if not self.manager.update_event(event_id, updated, expected=expected):
+                    raise HttpError(404, "Događaj ne postoji")
+            except ConcurrentModificationError:
+                raise HttpError(412, "Događaj je u međuvremenu izmenjen")
+
+        await self._call(update)
+        body = json_body(event_json(updated))
+        return 200, {'ETag': body_etag(body)}, body
+
+    async def _delete_event(self, event_id: str) -> Tuple[int, Dict[str, str], bytes]:
+        if not await self._call(self.manager.remove_by_id, event_id):
+            raise HttpError(404, "Događaj ne postoji")
+        return 204, {}, b""
+
+    # --- promene ---
+
+    async def _long_poll(self, request: Request) -> Tuple[int, Dict[str, str], bytes]:
+        # Bez kursora odmah vraća trenutni (klijent je upravo učitao stanje)
+        timeout = parse_number(request.param('timeout'), 'timeout', LONG_POLL_SECONDS, float, 0,
+                               MAX_LONG_POLL_SECONDS)
+        cursor = request.param('since')
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            changed = self.feed.changed
+            if cursor is None or self._closing:
+                return 200, {}, json_body({'cursor': self.feed.cursor(), 'changes': []})
+            batch = self.feed.since(cursor)
+            if batch is None:
+                return 200, {}, json_body({'cursor': self.feed.cursor(), 'changes': [], 'reset': True})
+            remaining = deadline - loop.time()
+            if batch or remaining <= 0:
+                return 200, {}, json_body({'cursor': self.feed.cursor(batch[-1][0]) if batch else cursor,
+                                           'changes': [change for _, change in batch]})
+            await self._wait(changed, remaining)
+
+    async def _stream_changes(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        # Server-sent events: id svake poruke je kursor, pa se klijent posle
+        # prekida nastavlja sa Last-Event-ID
+        cursor = request.headers.get('last-event-id') or request.param('since')
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        if cursor is None:
+            cursor = self.feed.cursor()
+            writer.write(f"id: {cursor}\nevent: ready\ndata: {{}}\n\n".encode('utf-8'))
+        await writer.drain()
+        while not self._closing:
+            changed = self.feed.changed
+            batch = self.feed.since(cursor)
+            if batch is None:
+                cursor = self.feed.cursor()
+                writer.write(f"id: {cursor}\nevent: reset\ndata: {{}}\n\n".encode('utf-8'))
+            elif batch:
+                cursor = self.feed.cursor(batch[-1][0])
+                writer.write("".join(
+                    f"id: {self.feed.cursor(seq)}\nevent: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+                    for seq, change in batch).encode('utf-8'))
+            elif not await self._wait(changed, SSE_PING_SECONDS):
+                writer.write(b": ping\n\n")
+            await writer.drain()
+
+    async def _wait(self, changed: asyncio.Event, timeout: float) -> bool:
+        self._waiting += 1
+        WAITING.set(self._waiting)
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiting -= 1
+            WAITING.set(self._waiting)
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    # None kada klijent zatvori vezu između zahteva
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "Nepotpun zahtev")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431, "Zaglavlje zahteva je predugačko")
+    lines = head.decode('latin-1').split("\r\n")
+    parts = lines[0].split(" ")
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        raise HttpError(400, "Neispravan početni red zahteva")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, separator, value = line.partition(":")
+            if not separator:
+                raise HttpError(400, "Neispravno zaglavlje zahteva")
+            headers[name.strip().lower()] = value.strip()
+    if 'transfer-encoding' in headers:
+        raise HttpError(411, "Telo zahteva mora imati Content-Length")
+    length = headers.get('content-length', "0")
+    if not length.isdigit():
+        raise HttpError(400, "Neispravan Content-Length")
+    if int(length) > MAX_BODY_BYTES:
+        raise HttpError(413, "Telo zahteva je preveliko")
+    body = await reader.readexactly(int(length)) if int(length) else b""
+    return Request(parts[0], parts[1], headers, body, parts[2])
+
+
+def encode_response(status: int, headers: Dict[str, str], body: bytes, keep_alive: bool,
+                    head_only: bool = False) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    if status not in (204, 304):
+        if 'Content-Type' not in headers:
+            lines.append(f"Content-Type: {JSON_TYPE}")
+        lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    head = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+    return head if head_only or status in (204, 304) else head + body
+
+
+def is_stream(request: Request) -> bool:
+    if request.segments == ["changes", "stream"]:
+        return request.method == "GET"
+    return request.segments == ["changes"] and "text/event-stream" in request.headers.get('accept', "")
+
+
+def json_body(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def error_body(message: str) -> bytes:
+    return json_body({'error': message})
+
+
+def body_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def event_json(event: Event) -> Dict:
+    data = event.to_dict()
+    if event.series_id != event.id:
+        data['series_id'] = event.series_id
+    return data
+
+
+def find_event(manager: EventManager, event_id: str) -> Optional[Event]:
+    # get_by_id vidi samo već pročitane mesece arhive
+    event = manager.get_by_id(event_id)
+    if event is None and manager.archive is not None:
+        event = manager.archive.find(event_id)
+    return event
+
+
+def parse_json(request: Request):
+    try:
+        return json.loads(request.body)
+    except ValueError:
+        raise HttpError(400, "Telo zahteva nije ispravan JSON")
+
+
+def event_from_json(data, event_id: Optional[str] = None) -> Event:
+    # Id dolazi iz putanje (PUT) ili se pravi nov (POST), nikad iz tela
+    if not isinstance(data, dict):
+        raise HttpError(400, "Telo zahteva mora biti JSON objekat")
+    record = {'description': "", 'notification_minutes': 15, 'tags': [], **data, 'id': event_id}
+    for name, kind in (('title', str), ('description', str), ('date_time', str),
+                       ('notification_minutes', int), ('tags', list)):
+        if name not in record:
+            raise HttpError(400, f"Nedostaje polje {name}")
+        if not isinstance(record[name], kind) or isinstance(record[name], bool):
+            raise HttpError(400, f"Polje {name} nije ispravnog tipa")
+    if not record['title'].strip():
+        raise HttpError(400, "Naslov ne sme biti prazan")
+    unknown = [tag for tag in record['tags'] if tag not in Event.AVAILABLE_TAGS]
+    if unknown:
+        raise HttpError(400, f"Nepoznat tag: {', '.join(map(str, unknown))}")
+    try:
+        return Event.from_dict(record)
+    except (KeyError, ValueError, TypeError) as e:
+        raise HttpError(400, f"Neispravan događaj: {e}")
+
+
+def parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HttpError(400, f"Neispravan datum i vreme u parametru {name}: {value}")
+
+
+def parse_number(value: Optional[str], name: str, default, kind, minimum, maximum):
+    if value is None:
+        return default
+    try:
+        number = kind(value)
+    except ValueError:
+        raise HttpError(400, f"Neispravan broj u parametru {name}: {value}")
+    if not minimum <= number <= maximum:
+        raise HttpError(400, f"Parametar {name} mora biti između {minimum} i {maximum}")
+    return number
+
+
+def events_query(request: Request) -> Dict:
+    query = {
+        'start': parse_time(request.param('start'), 'start'),
+        'end': parse_time(request.param('end'), 'end'),
+        'any_of': request.params('any') or None,
+        'all_of': request.params('all') or None,
+        'none_of': request.params('none') or None,
+        'text': request.param('q', "").strip(),
+        'with_archive': request.param('archive', "1") not in ("0", "false"),
+        'offset': parse_number(request.param('offset'), 'offset', 0, int, 0, 10 ** 9),
+        'limit': parse_number(request.param('limit'), 'limit', PAGE_SIZE, int, 1, MAX_PAGE_SIZE),
+    }
+    for name in ('any_of', 'all_of', 'none_of'):
+        unknown = [tag for tag in query[name] or () if tag not in Event.AVAILABLE_TAGS]
+        if unknown:
+            raise HttpError(400, f"Nepoznat tag: {', '.join(unknown)}")
+    return query
+
+
+def query_events(manager: EventManager, query: Dict) -> bytes:
+    # U bazenu niti; vraća već serijalizovan odgovor za keš
+    start, end, offset, limit = query['start'], query['end'], query['offset'], query['limit']
+    tags = (query['any_of'], query['all_of'], query['none_of'])
+    if query['text']:
+        events = [event for event in manager.search(query['text'], start, end, query['with_archive'])
+                  if tags_match(event, *tags)]
+    elif any(tags):
+        events = manager.get_events_by_tags(*tags, start=start, end=end, with_archive=query['with_archive'])
+    else:
+        events = None
+        total = manager.count_events_between(start, end, query['with_archive'])
+        page = manager.get_events_window(start, end, offset, limit, query['with_archive'])
+    if events is not None:
+        total = len(events)
+        page = events[offset:offset + limit]
+    return json_body({
+        'events': [event_json(event) for event in page],
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': offset + limit if offset + limit < total else None,
+    })
+
+
+def tags_match(event: Event, any_of: Optional[List[str]], all_of: Optional[List[str]],
+               none_of: Optional[List[str]]) -> bool:
+    tags = set(event.tags)
+    return ((not any_of or not tags.isdisjoint(any_of)) and tags.issuperset(all_of or ())
+            and tags.isdisjoint(none_of or ()))
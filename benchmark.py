@@ -0,0 +1,1037 @@
+import argparse
+import asyncio
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+import columnar
+from event_manager import Event, create_event_manager
+
+
+class LegacyEvent:
+    # Raniji oblik Event klase (obični __dict__, datetime i nova lista tagova
+    # po događaju), zadržan samo radi poređenja
+    def __init__(self, title: str, description: str, date_time: datetime,
+                 notification_minutes: int = 15, tags: List[str] = None,
+                 event_id: str = None):
+        self.id = event_id
+        self.title = title
+        self.description = description
+        self.date_time = date_time
+        self.notification_minutes = notification_minutes
+        self.notified = False
+        self.tags = tags if tags else []
+
+
+def synthetic_records(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, 8, 0)
+    titles = ["tim meeting", "konsultacije", "trening", "rok za projekat", "ručak"]
+    for i in range(count):
+        yield {
+            'id': f"{i:032x}",
+            'title': f"{rng.choice(titles)} {i}",
+            'description': "opis događaja",
+            'date_time': (start + timedelta(minutes=15 * rng.randrange(200_000))).isoformat(),
+            'notification_minutes': rng.choice([5, 10, 15, 30, 60, 120]),
+            'notified': False,
+            'tags': rng.sample(Event.AVAILABLE_TAGS, rng.randint(0, 3)),
+        }
+
+
+def measure_footprint(factory, count: int) -> int:
+    # Meri samo objekte događaja: zapisi se prave unapred, a naslovi i opisi
+    # se dele sa izvorom, pa razlika potiče od same reprezentacije
+    records = list(synthetic_records(count))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = [factory(record) for record in records]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del events
+    return after - before
+
+
+def legacy_from_dict(data):
+    return LegacyEvent(
+        title=data['title'],
+        description=data['description'],
+        date_time=datetime.fromisoformat(data['date_time']),
+        notification_minutes=data['notification_minutes'],
+        tags=list(data['tags']),
+        event_id=data['id'],
+    )
+
+
+def run_memory(args) -> None:
+    print(f"Memorija po događaju za {args.count} događaja")
+    for name, factory in (("staro (__dict__)", legacy_from_dict), ("Event (__slots__)", Event.from_dict)):
+        total = measure_footprint(factory, args.count)
+        print(f"  {name:20} {total / args.count:8.1f} B/događaj  ukupno {total / 2**20:8.1f} MiB")
+
+
+def peak_rss_mib() -> float:
+    # ru_maxrss je na Linuxu u KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def report(name: str, count: int, seconds: float) -> None:
+    print(f"  {name:28} {seconds:8.2f} s  {count / seconds:10.0f} događaja/s  "
+          f"najveći RSS {peak_rss_mib():8.1f} MiB")
+
+
+def run_io(args) -> None:
+    import event_io
+
+    print(f"Uvoz i izvoz za {args.count} događaja")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats:
+            path = os.path.join(tmp, f"dogadjaji.{fmt}")
+            events = (Event.from_dict(record) for record in synthetic_records(args.count))
+            start = time.perf_counter()
+            event_io.write_events(events, path)
+            report(f"izvoz {fmt}", args.count, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            valid = sum(1 for record in event_io.read_records(path)
+                        if event_io.record_to_event(record) is not None)
+            report(f"čitanje i provera {fmt}", valid, time.perf_counter() - start)
+
+        for backend in args.backends:
+            for fmt in args.formats:
+                data_file = os.path.join(tmp, f"uvoz-{fmt}.{'db' if backend == 'sqlite' else 'json'}")
+                manager = create_event_manager(backend, data_file)
+                start = time.perf_counter()
+                stats = event_io.import_file(manager, os.path.join(tmp, f"dogadjaji.{fmt}"),
+                                             batch_size=args.batch_size)
+                manager.close()
+                report(f"uvoz {fmt} -> {backend}", stats['imported'], time.perf_counter() - start)
+                del manager
+                gc.collect()
+
+
+def check_index(manager) -> List[str]:
+    # Unutrašnja konzistentnost JSON skladišta posle istovremenih izmena
+    problems = []
+    if manager._index_times != [event.epoch for event in manager._index_events]:
+        problems.append("indeks vremena ne odgovara indeksu događaja")
+    if manager._index_times != sorted(manager._index_times):
+        problems.append("indeks po datumu nije sortiran")
+    singles = {event.id for event in manager._events.values() if event.recurrence is None}
+    if {event.id for event in manager._index_events} != singles or len(manager._index_events) != len(singles):
+        problems.append("indeks po datumu ne sadrži tačno pojedinačne događaje")
+    for tag, ids in manager._tag_index.items():
+        if any(tag not in manager._events[event_id].tags for event_id in ids):
+            problems.append(f"invertovani indeks za tag {tag} je zastareo")
+    return problems
+
+
+def run_stress(args) -> None:
+    print(f"Stres test: {args.writers} pisaca, {args.readers} čitalaca, {args.seconds} s, backend {args.backend}")
+    errors: List[str] = []
+    stop = threading.Event()
+    writes = [0] * args.writers
+    reads = [0] * args.readers
+    span = timedelta(minutes=15 * 200_000)
+    origin = datetime(2025, 1, 1, 8, 0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = os.path.join(tmp, "stres.db" if args.backend == "sqlite" else "stres.json")
+        manager = create_event_manager(args.backend, data_file)
+        if args.backend == "json":
+            manager.store.fsync = args.fsync
+        manager.add_events([Event.from_dict(record) for record in synthetic_records(args.initial)])
+
+        def writer(n: int) -> None:
+            rng = random.Random(n)
+            while not stop.is_set():
+                try:
+                    choice = rng.random()
+                    when = origin + timedelta(minutes=15 * rng.randrange(200_000))
+                    tags = rng.sample(Event.AVAILABLE_TAGS, rng.randint(0, 3))
+                    if choice < 0.4:
+                        manager.add_event(Event(f"pisac {n}", "", when, tags=tags))
+                    else:
+                        window = manager.get_events_window(when, None, 0, 5)
+                        if not window:
+                            continue
+                        target = rng.choice(window)
+                        if choice < 0.7:
+                            manager.update_event(target.id, Event(target.title + "*", "", when, tags=tags))
+                        elif choice < 0.85:
+                            manager.remove_by_id(target.id)
+                        else:
+                            manager.mark_events_notified(window)
+                    writes[n] += 1
+                except Exception as e:
+                    errors.append(f"pisac {n}: {e!r}")
+
+        def reader(n: int) -> None:
+            rng = random.Random(1000 + n)
+            while not stop.is_set():
+                try:
+                    start = origin + timedelta(minutes=15 * rng.randrange(200_000))
+                    end = start + timedelta(days=7)
+                    events = manager.get_events_between(start, end)
+                    epochs = [event.epoch for event in events]
+                    if epochs != sorted(epochs) or any(not start <= event.date_time <= end for event in events):
+                        errors.append(f"čitalac {n}: opseg nije sortiran ili izlazi iz granica")
+                    tag = rng.choice(Event.AVAILABLE_TAGS)
+                    if any(tag not in event.tags for event in manager.get_events_by_tags(any_of=[tag], start=start, end=start + span)):
+                        errors.append(f"čitalac {n}: događaj bez traženog taga")
+                    if rng.random() < 0.05:
+                        snapshot = manager.snapshot()
+                        if len({event.id for event in snapshot}) != len(snapshot):
+                            errors.append(f"čitalac {n}: snapshot sadrži duplikate")
+                    reads[n] += 1
+                except Exception as e:
+                    errors.append(f"čitalac {n}: {e!r}")
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        print(f"  izmena: {sum(writes):8} ({sum(writes) / elapsed:8.0f}/s)")
+        print(f"  čitanja: {sum(reads):7} ({sum(reads) / elapsed:8.0f}/s)")
+        if args.backend == "json":
+            physical = manager.store.physical_writes
+            print(f"  upisa na disk: {physical} (prosečno {sum(writes) / max(physical, 1):.2f} izmena po upisu)")
+            errors.extend(check_index(manager))
+
+        # Sa arhivom, jer snapshot() pokriva samo radni skup, a stari obavešteni
+        # događaji su možda u međuvremenu prešli u arhivu
+        expected = sorted(json_key(event) for event in manager.get_events())
+        manager.close()
+        reopened = create_event_manager(args.backend, data_file)
+        if sorted(json_key(event) for event in reopened.get_events()) != expected:
+            errors.append("stanje posle ponovnog učitavanja se razlikuje od stanja u memoriji")
+        reopened.close()
+
+    for error in errors[:20]:
+        print(f"  GREŠKA {error}")
+    print("  rezultat: " + ("neuspeh" if errors else "u redu"))
+    if errors:
+        sys.exit(1)
+
+
+def json_key(event: Event) -> str:
+    return repr(sorted(event.to_dict().items()))
+
+
+# --- skup merenja za poređenje dve verzije koda (suite, compare) ---
+
+SUITE_SIZES = [10_000, 100_000, 1_000_000]
+# Učestalost tagova u sintetičkom kalendaru: poslovni tagovi preovlađuju
+TAG_WEIGHTS = {
+    "posao": 30, "sastanak": 25, "projekat": 12, "rok": 10, "obrazovanje": 5, "lično": 4,
+    "zdravlje": 3, "sport": 3, "porodica": 3, "društveno": 2, "kupovina": 2, "putovanje": 2,
+    "zabava": 1, "drugo": 1,
+}
+SUITE_TITLES = ["Sastanak tima", "Konsultacije", "Pregled projekta", "Rok za izveštaj",
+                "Ručak sa klijentom", "Obuka", "Planiranje sprinta", "Lekar", "Trening", "Rođendan"]
+SUITE_DESCRIPTIONS = ["", "", "opis događaja", "ponesite laptop i izveštaj za prethodni kvartal"]
+SUITE_LOCATIONS = ["", "", "", "Sala 1", "Sala 2", "Velika sala", "Online"]
+# Udeo ponavljajućih serija i prosečna udaljenost događaja od danas (u danima)
+RECURRING_SHARE = 0.005
+MEAN_DAYS_FROM_TODAY = 30
+# Metrike koje compare poredi; za sve važi da je manje bolje
+SUITE_METRICS = ("load_events_s", "load_peak_rss_mib", "save_events_s", "save_peak_rss_mib",
+                 "get_events_s", "get_upcoming_events_s", "get_events_needing_notification_s",
+                 "refresh_cold_s", "refresh_unchanged_s", "refresh_after_update_s",
+                 "refresh_scroll_s", "refresh_week_filter_s",
+                 "startup_import_s", "startup_first_paint_s", "startup_ready_s",
+                 "startup_sync_first_paint_s", "startup_sync_ready_s")
+
+
+def calendar_records(count: int, seed: int = 42, now: Optional[datetime] = None) -> Iterator[Dict]:
+    # Realističniji kalendar od synthetic_records: trećina događaja je prošla
+    # (i obaveštena), udaljenost od danas je eksponencijalna (većina je u
+    # narednih nekoliko nedelja, rep do dve godine), termini su radnim danima
+    # u radno vreme, a tagovi, trajanja i lokacije prate TAG_WEIGHTS i liste iznad
+    rng = random.Random(seed)
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    tags, weights = list(TAG_WEIGHTS), list(TAG_WEIGHTS.values())
+    for i in range(count):
+        days = min(int(rng.expovariate(1 / MEAN_DAYS_FROM_TODAY)), 730)
+        day = today + timedelta(days=-days - 1 if rng.random() < 0.3 else days)
+        if day.weekday() >= 5 and rng.random() < 0.9:
+            day += timedelta(days=7 - day.weekday())
+        when = day + timedelta(hours=rng.randint(8, 17), minutes=15 * rng.randrange(4))
+        record = {
+            'id': f"{i:032x}",
+            'title': f"{rng.choice(SUITE_TITLES)} {i}",
+            'description': rng.choice(SUITE_DESCRIPTIONS),
+            'date_time': when.isoformat(),
+            'notification_minutes': rng.choice([5, 10, 15, 15, 15, 30, 60, 1440]),
+            'notified': when < now,
+            'tags': sorted(set(rng.choices(tags, weights, k=rng.choice([0, 1, 1, 1, 2, 2, 3])))),
+        }
+        duration = rng.choice([0, 0, 15, 30, 30, 60, 60, 90, 120])
+        if duration:
+            record['duration_minutes'] = duration
+            record['location'] = rng.choice(SUITE_LOCATIONS)
+        if rng.random() < RECURRING_SHARE:
+            record['recurrence'] = {'frequency': rng.choice(["daily", "weekly", "weekly", "monthly"]),
+                                    'interval': 1, 'count': rng.randint(5, 100)}
+        yield record
+
+
+def open_backend(backend: str, data_file: str):
+    # "columnar" je JSON backend sa binarnim snapshot-om po kolonama
+    if backend == "columnar":
+        return create_event_manager("json", data_file, snapshot_format="columnar")
+    return create_event_manager(backend, data_file)
+
+
+def suite_file_suffix(backend: str) -> str:
+    return {'sqlite': "db", 'columnar': "kol"}.get(backend, "json")
+
+
+def write_calendar(backend: str, path: str, count: int, seed: int) -> None:
+    # Snapshot se piše red po red, da 1M zapisa ne bi bilo u memoriji odjednom
+    records = calendar_records(count, seed)
+    if backend == "columnar":
+        columnar.write(path, map(columnar.from_record, records))
+        return
+    if backend == "json":
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("[\n")
+            for i, record in enumerate(records):
+                f.write(("" if i == 0 else ",\n") + json.dumps(record, ensure_ascii=False))
+            f.write("\n]\n")
+        return
+    manager = create_event_manager(backend, path)
+    while True:
+        batch = [Event.from_dict(record) for record in islice(records, 50_000)]
+        if not batch:
+            break
+        manager.add_events(batch)
+    manager.close()
+
+
+def current_rss_mib() -> Optional[float]:
+    # Trenutni (ne najveći) RSS; dostupan samo na Linuxu
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def median_seconds(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def suite_case(backend: str, data_file: str, repeat: int, gui: bool) -> Dict:
+    # Izvršava se u novom procesu, pa najveći RSS pripada samo ovom slučaju
+    gc.collect()
+    results: Dict = {}
+    rss_before, peak_before = current_rss_mib(), peak_rss_mib()
+    start = time.perf_counter()
+    manager = open_backend(backend, data_file)
+    results['load_events_s'] = time.perf_counter() - start
+    results['load_peak_rss_mib'] = peak_rss_mib() - peak_before
+    rss_loaded = current_rss_mib()
+    if rss_before is not None and rss_loaded is not None:
+        results['rss_after_load_mib'] = rss_loaded - rss_before
+
+    peak_before = peak_rss_mib()
+    start = time.perf_counter()
+    manager.save_events()
+    results['save_events_s'] = time.perf_counter() - start
+    results['save_peak_rss_mib'] = peak_rss_mib() - peak_before
+
+    results['get_events_s'] = median_seconds(manager.get_events, repeat)
+    results['get_upcoming_events_s'] = median_seconds(manager.get_upcoming_events, repeat)
+    results['get_events_needing_notification_s'] = median_seconds(
+        manager.get_events_needing_notification, repeat)
+    if gui:
+        results.update(measure_refresh(manager, repeat))
+    manager.close()
+    return results
+
+
+def measure_refresh(manager, repeat: int) -> Dict:
+    # refresh_event_list zajedno sa iscrtavanjem (update_idletasks), na
+    # pravom ili virtuelnom ekranu (Xvfb); bez ekrana se merenje preskače
+    try:
+        import tkinter
+        from main import SmartOfficePlannerApp
+    except ImportError as e:
+        return {'gui_skipped': f"nedostaje modul: {e}"}
+    try:
+        app = SmartOfficePlannerApp(manager, monitor=False)
+    except tkinter.TclError as e:
+        return {'gui_skipped': f"nema ekrana: {e}"}
+
+    def refresh() -> None:
+        app.refresh_event_list()
+        app.root.update_idletasks()
+
+    def cold() -> None:
+        app.event_tree.delete(*app.event_tree.get_children())
+        app.rows.clear()
+        app.row_order = []
+        refresh()
+
+    def scroll() -> None:
+        app.scroll_to(app.view_offset + app.total_events // 2 if app.view_offset == 0 else 0)
+        app.root.update_idletasks()
+
+    def update_one() -> None:
+        event = app.event_manager.get_events_window(datetime.now(), None, 0, 1)
+        if event:
+            app.event_manager.update_event(event[0].id, Event.from_dict(event[0].to_dict()))
+        refresh()
+
+    results = {}
+    try:
+        app.root.update()
+        results['refresh_cold_s'] = median_seconds(cold, repeat)
+        results['refresh_unchanged_s'] = median_seconds(refresh, repeat)
+        results['refresh_after_update_s'] = median_seconds(update_one, repeat)
+        results['refresh_scroll_s'] = median_seconds(scroll, repeat)
+        app.filter_var.set("week")
+        app.view_offset = 0
+        results['refresh_week_filter_s'] = median_seconds(cold, repeat)
+        results['visible_rows'] = len(app.row_order)
+    finally:
+        app.root.destroy()
+    return results
+
+
+def start_virtual_display() -> Optional[subprocess.Popen]:
+    # Bez DISPLAY-a se Treeview meri na Xvfb ekranu, ako je instaliran
+    if os.environ.get("DISPLAY") or not shutil.which("Xvfb"):
+        return None
+    number = 99
+    while os.path.exists(f"/tmp/.X{number}-lock"):
+        number += 1
+    process = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1)
+    os.environ["DISPLAY"] = f":{number}"
+    return process
+
+
+def suite_metadata(args) -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+
+
+def run_suite(args) -> None:
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="merenja-")
+    os.makedirs(data_dir, exist_ok=True)
+    display = start_virtual_display() if args.gui else None
+    output = {'meta': suite_metadata(args), 'results': []}
+    # Kalendar zavisi od današnjeg datuma (događaji su raspoređeni oko danas)
+    stamp = datetime.now().strftime("%Y%m%d")
+    try:
+        for backend in args.backends:
+            for size in args.sizes:
+                data_file = os.path.join(data_dir, f"kalendar-{size}-{args.seed}-{stamp}."
+                                                   f"{suite_file_suffix(backend)}")
+                if not os.path.exists(data_file):
+                    start = time.perf_counter()
+                    write_calendar(backend, data_file, size, args.seed)
+                    print(f"Generisan kalendar {data_file} ({time.perf_counter() - start:.1f} s)")
+                # Svaki slučaj u novom procesu: čist RSS i bez keša prethodnog slučaja
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    metrics = pool.submit(suite_case, backend, data_file, args.repeat, args.gui).result()
+                output['results'].append({'backend': backend, 'events': size, 'metrics': metrics})
+                print(f"{backend:8} {size:>9}  " + "  ".join(
+                    f"{name}={value:.4f}" if isinstance(value, float) else f"{name}={value}"
+                    for name, value in metrics.items()))
+    finally:
+        if display is not None:
+            display.terminate()
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"Rezultati upisani u {args.output}")
+
+
+# Pokreće se kao "python -c STARTUP_PROBE <vreme pokretanja> <režim>" u
+# direktorijumu sa dogadjaji.json; ispisuje JSON sa vremenima od pokretanja
+# interpretera. Prvo iscrtavanje je prvi <Expose> bilo kog dela prozora, a
+# spremnost trenutak kada su događaji učitani i prikazani u listi. Režim sync
+# je stari redosled: učitavanje pre pravljenja prozora.
+STARTUP_PROBE = r'''
+import json, sys, time
+launched, mode = float(sys.argv[1]), sys.argv[2]
+from event_manager import create_event_manager
+from main import SmartOfficePlannerApp
+times = {'import_s': time.time() - launched}
+manager = create_event_manager() if mode == "sync" else None
+app = SmartOfficePlannerApp(manager, monitor=False)
+
+def on_expose(event):
+    times.setdefault('first_paint_s', time.time() - launched)
+
+def check():
+    if 'first_paint_s' in times and app.event_manager is not None:
+        app.root.update_idletasks()
+        times['ready_s'] = time.time() - launched
+        times['rows'] = len(app.row_order)
+        print(json.dumps(times))
+        app.on_closing()
+    else:
+        app.root.after(5, check)
+
+app.root.bind("<Expose>", on_expose, add="+")
+app.root.after(5, check)
+app.run()
+'''
+
+
+def startup_once(directory: str, mode: str) -> Dict:
+    env = dict(os.environ)
+    package_dir = os.path.dirname(os.path.abspath(__file__))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_dir, env.get('PYTHONPATH')]))
+    env['KANCELARIJE_BACKEND'] = "json"
+    launched = time.time()
+    result = subprocess.run([sys.executable, "-c", STARTUP_PROBE, repr(launched), mode], cwd=directory,
+                            env=env, capture_output=True, text=True, timeout=600)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                           f"izlazni kod {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_startup(args) -> None:
+    # Vreme od pokretanja "python main.py" do prvog iscrtavanja prozora i do
+    # prikaza događaja, sa učitavanjem u pozadini i sa starim redosledom
+    display = start_virtual_display()
+    if not os.environ.get("DISPLAY"):
+        print("Preskočeno: nema ekrana (DISPLAY) ni programa Xvfb")
+        return
+    output = {'meta': suite_metadata(args), 'results': []}
+    try:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                write_calendar("json", os.path.join(directory, "dogadjaji.json"), size, args.seed)
+                metrics = {}
+                for mode, prefix in (("background", "startup_"), ("sync", "startup_sync_")):
+                    runs = [startup_once(directory, mode) for _ in range(args.repeat)]
+                    for name in ("import_s", "first_paint_s", "ready_s"):
+                        if mode == "sync" and name == "import_s":
+                            continue
+                        metrics[prefix + name] = statistics.median(run[name] for run in runs)
+                output['results'].append({'backend': "json", 'events': size, 'metrics': metrics})
+                print(f"{size:>9} događaja  uvoz {metrics['startup_import_s']:.3f} s  "
+                      f"prvo iscrtavanje {metrics['startup_first_paint_s']:.3f} s "
+                      f"(ranije {metrics['startup_sync_first_paint_s']:.3f} s)  "
+                      f"spremno {metrics['startup_ready_s']:.3f} s (ranije {metrics['startup_sync_ready_s']:.3f} s)")
+    finally:
+        if display is not None:
+            display.terminate()
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+        print(f"Rezultati upisani u {args.output}")
+
+
+def run_compare(args) -> None:
+    # Odnos nova/stara vrednost po metrici; izlazni kod 1 ako je neka metrika
+    # sporija (veća) za više od praga
+    with open(args.old, encoding='utf-8') as f:
+        old = {(item['backend'], item['events']): item['metrics'] for item in json.load(f)['results']}
+    with open(args.new, encoding='utf-8') as f:
+        new = {(item['backend'], item['events']): item['metrics'] for item in json.load(f)['results']}
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        print(f"{key[0]} {key[1]} događaja")
+        for name in SUITE_METRICS:
+            before, after = old[key].get(name), new[key].get(name)
+            if not isinstance(before, (int, float)) or not isinstance(after, (int, float)) or before <= 0:
+                continue
+            ratio = after / before
+            mark = ""
+            if ratio > 1 + args.threshold:
+                mark = "  SPORIJE"
+                regressions += 1
+            elif ratio < 1 - args.threshold:
+                mark = "  brže"
+            print(f"  {name:36} {before:12.4f} -> {after:12.4f}  x{ratio:5.2f}{mark}")
+    print(f"Pogoršanih metrika: {regressions}")
+    if regressions:
+        sys.exit(1)
+
+
+class ApiClient:
+    # Jedna keep-alive veza ka API serveru; posle greške se otvara nova
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body=None,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = b"" if body is None else json.dumps(body).encode('utf-8')
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(data)}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        try:
+            self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + data)
+            head = await self.reader.readuntil(b"\r\n\r\n")
+            status_line, *header_lines = head.decode('latin-1').split("\r\n")
+            response_headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+            length = int(response_headers.get('content-length', 0))
+            payload = await self.reader.readexactly(length) if length else b""
+        except (OSError, asyncio.IncompleteReadError):
+            self.close()
+            raise
+        if response_headers.get('connection') == "close":
+            self.close()
+        return int(status_line.split(" ")[1]), response_headers, payload
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+async def api_load(host: str, port: int, args) -> Dict:
+    # Čitaoci ponavljaju nekoliko tipičnih upita sa If-None-Match, posmatrači
+    # čekaju na /changes, a pisci dodaju događaje pa ih menjaju ili brišu.
+    # Kašnjenje promene je od početka POST-a do prijema kod posmatrača.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + args.seconds
+    latencies: Dict[str, List[float]] = {"čitanje": [], "upis": []}
+    statuses: Dict[str, Counter] = {kind: Counter() for kind in ("čitanje", "upis", "promene")}
+    propagation: List[float] = []
+    written: Dict[str, float] = {}
+    errors: List[str] = []
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    week = f"start={today.isoformat()}&end={(today + timedelta(days=7)).isoformat()}"
+    queries = [f"/events?{week}&limit=50", f"/events?{week}&any=sastanak&limit=50",
+               "/events?offset=100&limit=100", "/events?q=sastanak&limit=20"]
+
+    def record(kind: str, started: float, status: int) -> None:
+        latencies[kind].append(loop.time() - started)
+        statuses[kind][status] += 1
+
+    async def reader(n: int) -> None:
+        rng = random.Random(n)
+        client = ApiClient(host, port)
+        etags: Dict[str, str] = {}
+        while loop.time() < deadline:
+            path = rng.choice(queries)
+            started = loop.time()
+            try:
+                status, headers, _ = await client.request(
+                    "GET", path, headers={'If-None-Match': etags[path]} if path in etags else None)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                errors.append(f"čitalac {n}: {e!r}")
+                continue
+            record("čitanje", started, status)
+            if status == 200:
+                etags[path] = headers.get('etag')
+            await asyncio.sleep(args.think)
+        client.close()
+
+    async def watcher(n: int) -> None:
+        client = ApiClient(host, port)
+        try:
+            cursor = json.loads((await client.request("GET", "/changes"))[2])['cursor']
+            while loop.time() < deadline:
+                timeout = min(5.0, max(0.1, deadline - loop.time()))
+                status, _, body = await client.request("GET", f"/changes?since={cursor}&timeout={timeout:.1f}")
+                received = loop.time()
+                statuses["promene"][status] += 1
+                data = json.loads(body)
+                cursor = data['cursor']
+                for change in data['changes']:
+                    sent = written.get(change.get('id'))
+                    if change['op'] == 'add' and sent is not None:
+                        propagation.append(received - sent)
+        except (OSError, asyncio.IncompleteReadError, ValueError, KeyError) as e:
+            errors.append(f"posmatrač {n}: {e!r}")
+        client.close()
+
+    async def writer(n: int) -> None:
+        rng = random.Random(10_000 + n)
+        client = ApiClient(host, port)
+        while loop.time() < deadline:
+            when = today + timedelta(days=rng.randint(0, 30), hours=rng.randint(8, 17))
+            started = loop.time()
+            try:
+                status, headers, body = await client.request("POST", "/events", {
+                    'title': f"Opterećenje {n}", 'date_time': when.isoformat(),
+                    'tags': [rng.choice(Event.AVAILABLE_TAGS)]})
+                record("upis", started, status)
+                if status != 201:
+                    errors.append(f"pisac {n}: POST {status} {body[:100]!r}")
+                    continue
+                event = json.loads(body)
+                written[event['id']] = started
+                started = loop.time()
+                if rng.random() < 0.5:
+                    status, _, _ = await client.request("PUT", f"/events/{event['id']}", {**event, 'title': "Izmenjen"},
+                                                        {'If-Match': headers['etag']})
+                else:
+                    status, _, _ = await client.request("DELETE", f"/events/{event['id']}")
+                record("upis", started, status)
+            except (OSError, asyncio.IncompleteReadError) as e:
+                errors.append(f"pisac {n}: {e!r}")
+            await asyncio.sleep(args.write_interval)
+        client.close()
+
+    started, cpu = loop.time(), time.process_time()
+    await asyncio.gather(*[reader(i) for i in range(args.clients)], *[watcher(i) for i in range(args.watchers)],
+                         *[writer(i) for i in range(args.writers)])
+    elapsed = loop.time() - started
+    return {'elapsed': elapsed, 'client_cpu': (time.process_time() - cpu) / elapsed, 'latencies': latencies,
+            'statuses': statuses, 'propagation': propagation, 'errors': errors}
+
+
+def run_api(args) -> None:
+    # Bez --url server (cli.py serve) se pokreće u posebnom procesu nad
+    # generisanim kalendarom, da klijenti i server ne dele jedan GIL
+    print(f"API opterećenje: {args.clients} čitalaca, {args.watchers} posmatrača, "
+          f"{args.writers} pisaca, {args.seconds} s")
+    tmp = server = None
+    url = args.url
+    try:
+        if url is None:
+            tmp = tempfile.mkdtemp(prefix="api-")
+            data_file = os.path.join(tmp, "kalendar.json")
+            write_calendar("json", data_file, args.events, args.seed)
+            server = subprocess.Popen(
+                [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py"),
+                 "--backend", "json", "--data-file", data_file, "serve", "--port", "0", "--no-notifications"],
+                stdout=subprocess.PIPE, text=True)
+            url = server.stdout.readline().strip().split(" ")[-1]
+            if not url.startswith("http://"):
+                sys.exit("API server nije pokrenut")
+            print(f"  server {url}, {args.events} događaja")
+        parts = urlsplit(url)
+        result = asyncio.run(api_load(parts.hostname, parts.port or 80, args))
+    finally:
+        if server is not None:
+            server.send_signal(signal.SIGINT)
+            server.wait(timeout=30)
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    elapsed = result['elapsed']
+    for kind, values in result['latencies'].items():
+        count = sum(result['statuses'][kind].values())
+        codes = ", ".join(f"{code}: {number}" for code, number in sorted(result['statuses'][kind].items()))
+        print(f"  {kind:8} {count:8} ({count / elapsed:7.0f}/s)  p50 {percentile(values, 0.5) * 1000:7.1f} ms  "
+              f"p95 {percentile(values, 0.95) * 1000:7.1f} ms  p99 {percentile(values, 0.99) * 1000:7.1f} ms  [{codes}]")
+    feed = sum(result['statuses']["promene"].values())
+    print(f"  promene  {feed:8} ({feed / elapsed:7.0f}/s) odgovora na /changes")
+    reads = result['statuses']["čitanje"]
+    print(f"  odgovora 304: {reads[304] / max(sum(reads.values()), 1):.0%} čitanja")
+    propagation = result['propagation']
+    print(f"  kašnjenje promene do posmatrača: p50 {percentile(propagation, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(propagation, 0.95) * 1000:.1f} ms ({len(propagation)} prijema)")
+    # Klijenti su u jednom procesu; blizu 100% znači da su merenja ograničena klijentom
+    print(f"  procesor klijenata: {result['client_cpu']:.0%}")
+    for error in result['errors'][:20]:
+        print(f"  GREŠKA {error}")
+    print("  rezultat: " + ("neuspeh" if result['errors'] else "u redu"))
+    if result['errors']:
+        sys.exit(1)
+
+
+# --- odredišta obaveštenja nad lokalnim zamenama za HTTP i SMTP server (sinks) ---
+
+class StandInHttpServer:
+    # Lokalni webhook: /ok odgovara 200, /flaky prvi put 500 pa 200, /fail
+    # uvek 500, a /slow odgovara tek posle delay sekundi
+    def __init__(self, delay: float):
+        import http.server
+
+        stand_in = self
+        self.delay = delay
+        self.requests: Counter = Counter()
+        self.bodies: List[Dict] = []
+        self._lock = threading.Lock()
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stand_in._lock:
+                    stand_in.requests[self.path] += 1
+                    count = stand_in.requests[self.path]
+                    stand_in.bodies.append(json.loads(body))
+                if self.path == "/slow":
+                    time.sleep(stand_in.delay)
+                failed = self.path == "/fail" or (self.path == "/flaky" and count == 1)
+                try:
+                    self.send_response(500 if failed else 200)
+                    self.send_header('Content-Length', "0")
+                    self.end_headers()
+                except OSError:
+                    pass
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StandInSmtpServer:
+    # Najmanji SMTP razgovor (bez proširenja) koji prihvata poruke; uz delay
+    # pozdrav kasni, pa klijentu istekne timeout soketa
+    def __init__(self):
+        import socketserver
+
+        stand_in = self
+        self.delay = 0.0
+        self.sessions = 0
+        self.messages: List[bytes] = []
+        self._lock = threading.Lock()
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                with stand_in._lock:
+                    stand_in.sessions += 1
+                if stand_in.delay:
+                    time.sleep(stand_in.delay)
+                try:
+                    self.reply(b"220 zamena")
+                    for line in self.rfile:
+                        command = line[:4].upper()
+                        if command == b"DATA":
+                            self.reply(b"354 kraj sa <CRLF>.<CRLF>")
+                            data = []
+                            for row in self.rfile:
+                                if row in (b".\r\n", b".\n"):
+                                    break
+                                data.append(row)
+                            with stand_in._lock:
+                                stand_in.messages.append(b"".join(data))
+                            self.reply(b"250 primljeno")
+                        elif command == b"QUIT":
+                            self.reply(b"221 kraj")
+                            return
+                        else:
+                            self.reply(b"250 u redu")
+                except OSError:
+                    pass
+
+            def reply(self, text: bytes) -> None:
+                self.wfile.write(text + b"\r\n")
+
+        socketserver.ThreadingTCPServer.daemon_threads = True
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_sinks(args) -> None:
+    # Provera ponašanja odredišta: uspeh, ponovni pokušaj posle greške, istek
+    # roka i upis u dead-letter fajl; svaki slučaj ide kroz DeliveryEngine
+    from notification_dispatch import MemoryBackend
+    from notification_sinks import BackendSink, DeliveryEngine, EmailSink, WebhookSink
+
+    print(f"Odredišta obaveštenja: rok {args.timeout} s, {args.retries} ponovna pokušaja")
+    errors: List[str] = []
+    http = StandInHttpServer(delay=args.timeout * 3)
+    smtp = StandInSmtpServer()
+    options = {'timeout': args.timeout, 'retries': args.retries, 'backoff': 0.05}
+    attempts = args.retries + 1
+
+    def deliver(sink, title: str) -> Tuple[bool, List[Dict]]:
+        with tempfile.TemporaryDirectory() as tmp:
+            dead_letter = os.path.join(tmp, "neisporuceno.jsonl")
+            engine = DeliveryEngine([sink], dead_letter_file=dead_letter)
+            try:
+                delivered = engine.deliver(title, "poruka")[sink.name]
+            finally:
+                engine.close()
+            if not os.path.exists(dead_letter):
+                return delivered, []
+            with open(dead_letter, encoding='utf-8') as f:
+                return delivered, [json.loads(line) for line in f]
+
+    def check(name: str, condition: bool, detail: str) -> None:
+        print(f"  {name:28} {'u redu' if condition else 'GREŠKA'}  ({detail})")
+        if not condition:
+            errors.append(f"{name}: {detail}")
+
+    try:
+        results = {}
+        for path in ("ok", "flaky", "fail", "slow"):
+            started = time.perf_counter()
+            results[path] = deliver(WebhookSink(f"{http.url}/{path}", **options), f"webhook {path}") + (
+                time.perf_counter() - started,)
+        delivered, dead, _ = results["ok"]
+        check("webhook uspeh", delivered and http.requests["/ok"] == 1 and not dead,
+              f"zahteva {http.requests['/ok']}, dead-letter {len(dead)}")
+        delivered, dead, _ = results["flaky"]
+        check("webhook ponovni pokušaj", delivered and http.requests["/flaky"] == 2 and not dead,
+              f"zahteva {http.requests['/flaky']}")
+        delivered, dead, _ = results["fail"]
+        check("webhook dead-letter", not delivered and http.requests["/fail"] == attempts
+              and len(dead) == 1 and dead[0]['attempts'] == attempts and "500" in dead[0]['error'],
+              f"zahteva {http.requests['/fail']}, zapis {dead[0] if dead else None}")
+        delivered, dead, elapsed = results["slow"]
+        check("webhook istek roka", not delivered and len(dead) == 1 and "isteklo" in dead[0]['error']
+              and elapsed < attempts * args.timeout + 1.0,
+              f"{elapsed:.2f} s, greška {dead[0]['error'] if dead else None}")
+
+        email = EmailSink("127.0.0.1", smtp.port, "planer@localhost", ["ana@localhost"], **options)
+        delivered, dead = deliver(email, "email uspeh")
+        check("email uspeh", delivered and len(smtp.messages) == 1 and b"Subject: email uspeh" in smtp.messages[0]
+              and not dead, f"poruka {len(smtp.messages)}, sesija {smtp.sessions}")
+        smtp.delay, smtp.sessions = args.timeout * 3, 0
+        delivered, dead = deliver(email, "email istek roka")
+        check("email istek roka", not delivered and smtp.sessions == attempts and len(smtp.messages) == 1
+              and len(dead) == 1, f"sesija {smtp.sessions}, dead-letter {len(dead)}")
+
+        # Blokirajuće odredište sporije od roka: nit se ne prekida, pa ponovni
+        # pokušaj ne sme da pošalje istu poruku još jednom
+        backend = MemoryBackend(delay=args.timeout * 2)
+        delivered, dead = deliver(BackendSink(backend, **options), "spor backend")
+        check("spor backend bez duplikata", delivered and len(backend.sent) == 1 and not dead,
+              f"poslato {len(backend.sent)}, dead-letter {len(dead)}")
+    finally:
+        http.close()
+        smtp.close()
+
+    print("  rezultat: " + ("neuspeh" if errors else "u redu"))
+    if errors:
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merenja performansi Pametnih Kancelarija")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    memory = subparsers.add_parser("memory", help="zauzeće memorije po događaju")
+    memory.add_argument("--count", type=int, default=1_000_000)
+    memory.set_defaults(func=run_memory)
+
+    io = subparsers.add_parser("io", help="protok uvoza i izvoza (JSON Lines, CSV, iCalendar)")
+    io.add_argument("--count", type=int, default=1_000_000)
+    io.add_argument("--batch-size", type=int, default=5000)
+    io.add_argument("--formats", nargs="+", default=["jsonl", "csv", "ics"], choices=["jsonl", "csv", "ics", "json"])
+    io.add_argument("--backends", nargs="+", default=["json", "sqlite"], choices=["json", "sqlite"])
+    io.set_defaults(func=run_io)
+
+    stress = subparsers.add_parser("stress", help="istovremene izmene i čitanja iz više niti")
+    stress.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    stress.add_argument("--writers", type=int, default=4)
+    stress.add_argument("--readers", type=int, default=4)
+    stress.add_argument("--seconds", type=float, default=10.0)
+    stress.add_argument("--initial", type=int, default=10_000, help="događaja pre početka testa")
+    stress.add_argument("--fsync", action="store_true", help="fsync posle svakog upisa u žurnal")
+    stress.set_defaults(func=run_stress)
+
+    suite = subparsers.add_parser("suite", help="skup merenja sa JSON izlazom za poređenje verzija")
+    suite.add_argument("--sizes", nargs="+", type=int, default=SUITE_SIZES)
+    suite.add_argument("--backends", nargs="+", default=["json"], choices=["json", "columnar", "sqlite"])
+    suite.add_argument("--repeat", type=int, default=5, help="ponavljanja po merenju (uzima se medijana)")
+    suite.add_argument("--seed", type=int, default=42)
+    suite.add_argument("--no-gui", dest="gui", action="store_false", help="bez merenja osvežavanja liste")
+    suite.add_argument("--data-dir", default=None, help="čuva generisane kalendare za sledeća pokretanja")
+    suite.add_argument("--output", default="merenja.json")
+    suite.set_defaults(func=run_suite)
+
+    startup = subparsers.add_parser("startup", help="vreme od pokretanja do prvog iscrtavanja prozora")
+    startup.add_argument("--sizes", nargs="+", type=int, default=[0, 10_000, 100_000])
+    startup.add_argument("--repeat", type=int, default=5, help="pokretanja po veličini (uzima se medijana)")
+    startup.add_argument("--seed", type=int, default=42)
+    startup.add_argument("--output", default=None, help="JSON izlaz u formatu komande suite (za compare)")
+    startup.set_defaults(func=run_startup)
+
+    api = subparsers.add_parser("api", help="opterećenje HTTP API servera (cli.py serve) sa mnogo klijenata")
+    api.add_argument("--url", default=None, help="postojeći server; bez toga se pokreće nov nad --events događaja")
+    api.add_argument("--events", type=int, default=10_000)
+    api.add_argument("--seed", type=int, default=42)
+    api.add_argument("--clients", type=int, default=200, help="čitaoci koji ponavljaju upite")
+    api.add_argument("--watchers", type=int, default=100, help="klijenti na /changes (long-poll)")
+    api.add_argument("--writers", type=int, default=4)
+    api.add_argument("--seconds", type=float, default=10.0)
+    api.add_argument("--think", type=float, default=0.05, help="pauza čitaoca između upita (s)")
+    api.add_argument("--write-interval", type=float, default=0.05, help="pauza pisca između izmena (s)")
+    api.set_defaults(func=run_api)
+
+    sinks = subparsers.add_parser("sinks", help="odredišta obaveštenja nad lokalnim HTTP i SMTP zamenama")
+    sinks.add_argument("--timeout", type=float, default=0.3, help="rok jednog pokušaja (s)")
+    sinks.add_argument("--retries", type=int, default=2)
+    sinks.set_defaults(func=run_sinks)
+
+    compare = subparsers.add_parser("compare", help="poredi dva JSON izlaza komande suite")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.1, help="dozvoljeno odstupanje (0.1 = 10%%)")
+    compare.set_defaults(func=run_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
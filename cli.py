@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+from datetime import datetime
+from typing import List
+import metrics
+from event_manager import Event, create_event_manager
+from journal_store import JournalStore
+
+# Komandna linija bez tkinter-a: pozadinski servis obaveštenja i brze komande
+# za skriptovanje. Svaka komanda učitava samo ono što joj treba.
+
+
+def parse_datetime(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Neispravan datum i vreme: {value} (GGGG-MM-DD HH:MM)")
+
+
+def open_manager(args):
+    return create_event_manager(args.backend, args.data_file)
+
+
+def print_events(events: List[Event], as_json: bool) -> None:
+    for event in events:
+        if as_json:
+            print(json.dumps(event.to_dict(), ensure_ascii=False))
+        else:
+            tags = f" [{', '.join(event.tags)}]" if event.tags else ""
+            print(f"{event.id}  {event.date_time.strftime('%d.%m.%Y %H:%M')}  {event.title}{tags}")
+
+
+def build_backend(args):
+    # Bez dodatnih odredišta ostaje samo obaveštenje na radnoj površini
+    if not (args.log_file or args.webhook or args.smtp or args.no_desktop):
+        return None
+    from notification_sinks import DeliveryEngine, DesktopSink, EmailSink, LogSink, WebhookSink
+
+    options = {'timeout': args.sink_timeout, 'retries': args.sink_retries}
+    sinks = [] if args.no_desktop else [DesktopSink(**options)]
+    if args.log_file:
+        sinks.append(LogSink(args.log_file, **options))
+    for i, url in enumerate(args.webhook):
+        sinks.append(WebhookSink(url, name=f"webhook-{i + 1}" if len(args.webhook) > 1 else "webhook", **options))
+    if args.smtp:
+        host, _, port = args.smtp.rpartition(":")
+        sinks.append(EmailSink(host or args.smtp, int(port) if host else 25, args.mail_from, args.mail_to,
+                               starttls=args.starttls, **options))
+    return DeliveryEngine(sinks, dead_letter_file=args.dead_letter)
+
+
+def cmd_daemon(args) -> int:
+    from notification_service import NotificationService
+
+    if args.smtp and not args.mail_to:
+        print("Za --smtp je potrebna bar jedna adresa (--mail-to)", file=sys.stderr)
+        return 2
+    if args.metrics or args.profile:
+        try:
+            metrics.enable(args.metrics or metrics.DEFAULT_DUMP_FILE, args.profile)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+    manager = open_manager(args)
+    manager.archive_old_events()
+    service = NotificationService(manager, backend=build_backend(args))
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+
+    service.start_monitoring()
+    print(f"Servis obaveštenja pokrenut ({len(manager.get_pending_notifications())} na čekanju)")
+    while not stop.wait(3600):
+        pass
+    service.stop_monitoring()
+    manager.close()
+    print("Servis obaveštenja zaustavljen")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    # Jedno skladište i jedan servis obaveštenja za sve klijente; izmena je
+    # potvrđena (201/200/204) tek kada je upisana u žurnal
+    import asyncio
+    from api_server import ApiServer
+    from notification_service import NotificationService
+
+    if args.metrics:
+        metrics.enable(args.metrics)
+    manager = open_manager(args)
+    manager.archive_old_events()
+    service = None if args.no_notifications else NotificationService(manager)
+    if service is not None:
+        service.start_monitoring()
+    server = ApiServer(manager, service, args.host, args.port, workers=args.workers)
+
+    async def serve() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await server.start()
+        print(f"API server sluša na http://{args.host}:{server.port}", flush=True)
+        await stop.wait()
+        await server.close()
+
+    asyncio.run(serve())
+    if service is not None:
+        service.stop_monitoring()
+    manager.close()
+    print("API server zaustavljen")
+    return 0
+
+
+def cmd_add(args) -> int:
+    event = Event(
+        title=args.title,
+        description=args.description,
+        date_time=args.date_time,
+        notification_minutes=args.notify,
+        tags=args.tag
+    )
+    if (args.backend or os.environ.get("KANCELARIJE_BACKEND", "json")) == "json":
+        # Novi događaj je samo jedan red u žurnalu, postojeći se ne učitavaju
+        JournalStore(args.data_file or "dogadjaji.json").append({'op': 'put', 'event': event.to_dict()})
+    else:
+        manager = open_manager(args)
+        manager.add_event(event)
+        manager.close()
+    print(event.id)
+    return 0
+
+
+def cmd_list(args) -> int:
+    manager = open_manager(args)
+    if args.all:
+        events = manager.get_events()
+    else:
+        events = manager.get_upcoming_events(args.days)
+    print_events(events, args.json)
+    return 0
+
+
+def cmd_range(args) -> int:
+    manager = open_manager(args)
+    print_events(manager.get_events_between(args.start, args.end), args.json)
+    return 0
+
+
+def cmd_tags(args) -> int:
+    manager = open_manager(args)
+    events = manager.get_events_by_tags(
+        any_of=args.any, all_of=args.all, none_of=args.none, start=args.start, end=args.end)
+    print_events(events, args.json)
+    return 0
+
+
+def cmd_search(args) -> int:
+    # Svako pokretanje je nov proces, pa se indeks pretrage čuva pri zatvaranju
+    # i sledeća pretraga ga samo učita, ako se događaji nisu menjali
+    manager = create_event_manager(args.backend, args.data_file, persist_search=True)
+    events = manager.search(" ".join(args.query), args.start, args.end)
+    manager.close()
+    print_events(events, args.json)
+    return 0 if events else 1
+
+
+def cmd_remove(args) -> int:
+    manager = open_manager(args)
+    removed = [event_id for event_id in args.ids if manager.remove_by_id(event_id)]
+    manager.close()
+    for event_id in set(args.ids) - set(removed):
+        print(f"Događaj {event_id} ne postoji", file=sys.stderr)
+    return 0 if len(removed) == len(args.ids) else 1
+
+
+def cmd_archive(args) -> int:
+    # Isto se radi pri otvaranju skladišta u pozadini GUI-ja i pri pokretanju
+    # daemon/serve, a zatim jednom na sat u servisu obaveštenja i u API poller-u;
+    # komanda služi za drugu granicu (--days) ili proveru stanja
+    manager = open_manager(args)
+    if manager.archive is None:
+        print("Arhiva nije uključena za ovo skladište", file=sys.stderr)
+        return 1
+    moved = manager.archive_old_events(args.days)
+    manager.close()
+    months = manager.archive.months()
+    print(f"Arhivirano {moved} događaja; u radnom skupu {len(manager.snapshot())}, "
+          f"arhiva ima {len(months)} meseci" + (f" ({months[0]} – {months[-1]})" if months else ""))
+    return 0
+
+
+def cmd_metrics(args) -> int:
+    # Metrike žive u procesu koji ih meri (daemon, grafički interfejs), pa se
+    # čita fajl koji on periodično upisuje
+    path = args.file or os.environ.get("KANCELARIJE_METRICS") or metrics.DEFAULT_DUMP_FILE
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+    except OSError as e:
+        print(f"Nema upisanih metrika ({e}); pokrenite daemon sa --metrics ili "
+              f"grafički interfejs sa KANCELARIJE_METRICS", file=sys.stderr)
+        return 1
+    if args.summary:
+        for line in metrics.summarize(text):
+            print(line)
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+def cmd_import(args) -> int:
+    import event_io
+
+    manager = open_manager(args)
+    stats = event_io.import_file(manager, args.file, args.format, args.batch_size)
+    manager.close()
+    print(f"Uvezeno {stats['imported']} događaja, preskočeno {stats['duplicates']} duplikata "
+          f"i {stats['invalid']} neispravnih zapisa")
+    return 0 if stats['invalid'] == 0 else 1
+
+
+def cmd_export(args) -> int:
+    import event_io
+
+    manager = open_manager(args)
+    count = event_io.export_file(manager, args.file, args.format)
+    print(f"Izvezeno {count} događaja u {args.file}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="cli.py", description="Pametne Kancelarije bez grafičkog interfejsa")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default=None,
+                        help="skladište događaja (podrazumevano KANCELARIJE_BACKEND ili json)")
+    parser.add_argument("--data-file", default=None, help="putanja do fajla sa događajima")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    daemon = subparsers.add_parser("daemon", help="pokreće servis obaveštenja u pozadini")
+    daemon.add_argument("--no-desktop", action="store_true", help="bez obaveštenja na radnoj površini")
+    daemon.add_argument("--log-file", default=None, help="upisuje obaveštenja u fajl")
+    daemon.add_argument("--webhook", action="append", default=[], metavar="URL", help="šalje POST na adresu")
+    daemon.add_argument("--smtp", default=None, metavar="HOST[:PORT]", help="šalje obaveštenja e-poštom")
+    daemon.add_argument("--mail-from", default="kancelarije@localhost")
+    daemon.add_argument("--mail-to", action="append", default=[], metavar="ADRESA")
+    daemon.add_argument("--starttls", action="store_true")
+    daemon.add_argument("--sink-timeout", type=float, default=10.0, help="sekundi po pokušaju")
+    daemon.add_argument("--sink-retries", type=int, default=2)
+    daemon.add_argument("--dead-letter", default="neisporucena_obavestenja.jsonl",
+                        help="fajl sa obaveštenjima koja nisu isporučena")
+    daemon.add_argument("--metrics", default=None, metavar="FAJL",
+                        help=f"uključuje merenja i upisuje ih u fajl (uz --profile: {metrics.DEFAULT_DUMP_FILE})")
+    daemon.add_argument("--profile", choices=metrics.PROFILE_MODES, default=None,
+                        help="profilisanje merenih sekcija (cProfile) ili memorije (tracemalloc)")
+    daemon.set_defaults(func=cmd_daemon)
+
+    serve = subparsers.add_parser("serve", help="HTTP/JSON API nad zajedničkim skladištem (api_server.py)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765, help="0 bira slobodan port")
+    serve.add_argument("--workers", type=int, default=8, help="niti za upite nad skladištem")
+    serve.add_argument("--no-notifications", action="store_true", help="bez servisa obaveštenja")
+    serve.add_argument("--metrics", default=None, metavar="FAJL",
+                       help="uključuje merenja (i GET /metrics) i upisuje ih u fajl")
+    serve.set_defaults(func=cmd_serve)
+
+    add = subparsers.add_parser("add", help="dodaje događaj")
+    add.add_argument("title")
+    add.add_argument("date_time", type=parse_datetime, help="GGGG-MM-DD HH:MM")
+    add.add_argument("-d", "--description", default="")
+    add.add_argument("-n", "--notify", type=int, default=15, help="minuta pre događaja")
+    add.add_argument("-t", "--tag", action="append", choices=Event.AVAILABLE_TAGS, default=[])
+    add.set_defaults(func=cmd_add)
+
+    for name, func, help_text in (("list", cmd_list, "predstojeći događaji"),
+                                  ("range", cmd_range, "događaji u opsegu datuma"),
+                                  ("tags", cmd_tags, "događaji po tagovima")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--json", action="store_true", help="ispis kao JSON redovi")
+        sub.set_defaults(func=func)
+        if name == "list":
+            sub.add_argument("--days", type=int, default=7)
+            sub.add_argument("--all", action="store_true", help="svi događaji")
+        elif name == "range":
+            sub.add_argument("start", type=parse_datetime)
+            sub.add_argument("end", type=parse_datetime)
+        else:
+            sub.add_argument("--any", nargs="+", default=None, metavar="TAG")
+            sub.add_argument("--all", nargs="+", default=None, metavar="TAG")
+            sub.add_argument("--none", nargs="+", default=None, metavar="TAG")
+            sub.add_argument("--from", dest="start", type=parse_datetime, default=None)
+            sub.add_argument("--to", dest="end", type=parse_datetime, default=None)
+
+    search = subparsers.add_parser("search", help="pretraga naslova, opisa i lokacije")
+    search.add_argument("query", nargs="+", help="reči ili njihovi počeci, bez obzira na dijakritike")
+    search.add_argument("--from", dest="start", type=parse_datetime, default=None)
+    search.add_argument("--to", dest="end", type=parse_datetime, default=None)
+    search.add_argument("--json", action="store_true", help="ispis kao JSON redovi")
+    search.set_defaults(func=cmd_search)
+
+    remove = subparsers.add_parser("remove", help="briše događaje po id-u")
+    remove.add_argument("ids", nargs="+")
+    remove.set_defaults(func=cmd_remove)
+
+    archive = subparsers.add_parser("archive", help="prebacuje stare obaveštene događaje u arhivu po mesecima")
+    archive.add_argument("--days", type=int, default=None,
+                         help="starije od ovoliko dana (podrazumevano KANCELARIJE_ARHIVA_DANA ili 30)")
+    archive.set_defaults(func=cmd_archive)
+
+    metrics_ = subparsers.add_parser("metrics", help="ispisuje metrike koje je upisao daemon ili prozor")
+    metrics_.add_argument("--file", default=None,
+                          help=f"podrazumevano KANCELARIJE_METRICS ili {metrics.DEFAULT_DUMP_FILE}")
+    metrics_.add_argument("--summary", action="store_true", help="prosek i percentili umesto Prometheus formata")
+    metrics_.set_defaults(func=cmd_metrics)
+
+    formats = ["jsonl", "csv", "ics", "json"]
+    import_ = subparsers.add_parser("import", help="uvozi događaje (JSON Lines, CSV, iCalendar, JSON)")
+    import_.add_argument("file")
+    import_.add_argument("--format", choices=formats, default=None, help="podrazumevano po ekstenziji")
+    import_.add_argument("--batch-size", type=int, default=5000, help="događaja po jednom upisu")
+    import_.set_defaults(func=cmd_import)
+
+    export = subparsers.add_parser("export", help="izvozi događaje (JSON Lines, CSV, iCalendar, JSON)")
+    export.add_argument("file")
+    export.add_argument("--format", choices=formats, default=None, help="podrazumevano po ekstenziji")
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command != "metrics":
+        metrics.enable_from_env()
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # Izlaz je prosleđen komandi poput head koja se već završila
+        sys.stdout = open(os.devnull, 'w')
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+# Binarni snapshot događaja po kolonama. Posle zaglavlja slede kolone fiksne
+# širine (little-endian, poravnate na 8 bajtova) redom iz COLUMNS, pa tabela
+# stringova: pomeraji (uint64, jedan više od broja stringova) i UTF-8 bajtovi.
+# Tekstualne kolone čuvaju indeks u tabeli, a svaki različit string (naslov,
+# opis, lokacija, kombinacija tagova) je u njoj samo jednom; indeks 0 je "".
+# Redovi su poređani po vremenu početka, pa se opseg nalazi bisekcijom nad
+# kolonom epoha, a polja se čitaju direktno iz mmap-a tek za redove koji trebaju.
+MAGIC = b"KPKOL\x00\x00\x01"
+# magic, broj redova, broj stringova, string sa rečnikom tagova za bitmaske
+_HEADER = struct.Struct("<8sIII")
+COLUMNS = (
+    ('epoch', 'q'),
+    ('notification_minutes', 'i'),
+    ('duration_minutes', 'i'),
+    ('tag_mask', 'I'),
+    ('flags', 'B'),
+    ('id', 'I'),
+    ('title', 'I'),
+    ('description', 'I'),
+    ('location', 'I'),
+    ('tags', 'I'),
+    ('extra', 'I'),
+)
+NOTIFIED = 1
+# Bitmaska pokriva prvih toliko tagova iz rečnika; ostali se proveravaju po redu
+MASK_BITS = 32
+# Polja koja imaju svoju kolonu; sva ostala (ponavljanje, obaveštene pojave)
+# idu kao JSON u kolonu extra
+_CORE = frozenset(('id', 'title', 'description', 'date_time', 'notification_minutes', 'notified',
+                   'tags', 'duration_minutes', 'location'))
+_TAG_SEPARATOR = "\x1f"
+_ALIGN = 8
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+Row = namedtuple('Row', 'id title description epoch notification_minutes notified tags '
+                        'duration_minutes location extra')
+
+
+def is_columnar(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def write(path: str, rows: Iterable[Row]) -> None:
+    # Redovi se pišu po vremenu početka; Row pravi Event.to_row ili from_record
+    rows = sorted(rows, key=itemgetter(3))
+    strings: Dict[str, int] = {"": 0}
+    intern = strings.setdefault
+    vocabulary: Dict[str, int] = {}
+    # Kombinacija tagova -> (bitmaska, indeks stringa), jednom po kombinaciji
+    combinations: Dict[tuple, tuple] = {}
+    for tags in {tuple(row.tags) for row in rows}:
+        mask = 0
+        for tag in tags:
+            bit = vocabulary.setdefault(tag, len(vocabulary))
+            if bit < MASK_BITS:
+                mask |= 1 << bit
+        combinations[tags] = (mask, intern(_TAG_SEPARATOR.join(tags), len(strings)))
+    tag_info = [combinations[tuple(row.tags)] for row in rows]
+
+    columns = {
+        'epoch': [row.epoch for row in rows],
+        'notification_minutes': [row.notification_minutes for row in rows],
+        'duration_minutes': [row.duration_minutes for row in rows],
+        'tag_mask': [info[0] for info in tag_info],
+        'flags': [NOTIFIED if row.notified else 0 for row in rows],
+        'id': [intern(row.id, len(strings)) for row in rows],
+        'title': [intern(row.title, len(strings)) for row in rows],
+        'description': [intern(row.description, len(strings)) for row in rows],
+        'location': [intern(row.location, len(strings)) for row in rows],
+        'tags': [info[1] for info in tag_info],
+        'extra': [intern(json.dumps(row.extra, ensure_ascii=False), len(strings)) if row.extra else 0
+                  for row in rows],
+    }
+    vocabulary_index = intern(_TAG_SEPARATOR.join(vocabulary), len(strings))
+    header = _HEADER.pack(MAGIC, len(rows), len(strings), vocabulary_index)
+
+    offsets = array('Q', [0])
+    blob = bytearray()
+    for value in strings:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        pos = len(header)
+        for data in [array(code, columns[name]) for name, code in COLUMNS] + [offsets]:
+            pos = _pad(f, pos)
+            if not _LITTLE_ENDIAN:
+                data.byteswap()
+            f.write(data.tobytes())
+            pos += len(data) * data.itemsize
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class ColumnarSnapshot:
+    # Fajl se mapira u memoriju i ne učitava ceo: kolone su memoryview nad
+    # mmap-om, a stringovi se dekodiraju tek kada neki red zatreba. Objekat
+    # je samo za čitanje; posle zamene fajla na disku vidi stari sadržaj.
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rows, strings, vocabulary = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} nije binarni snapshot događaja")
+        self._view = memoryview(self._map)
+        self.columns: Dict[str, Sequence[int]] = {}
+        pos = _HEADER.size
+        for name, code in COLUMNS:
+            pos = _aligned(pos)
+            size = array(code).itemsize * rows
+            self.columns[name] = _column(self._view[pos:pos + size], code)
+            pos += size
+        pos = _aligned(pos)
+        self._offsets = _column(self._view[pos:pos + 8 * (strings + 1)], 'Q')
+        self._blob = self._view[pos + 8 * (strings + 1):]
+        self._strings: List[Optional[str]] = [None] * strings
+        self._tags: Dict[int, tuple] = {}
+        self.length = rows
+        self.vocabulary = self.string(vocabulary).split(_TAG_SEPARATOR) if vocabulary else []
+        self._bits = {tag: bit for bit, tag in enumerate(self.vocabulary)}
+
+    def __len__(self) -> int:
+        return self.length
+
+    def string(self, index: int) -> str:
+        value = self._strings[index]
+        if value is None:
+            value = self._strings[index] = str(self._blob[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+        return value
+
+    def tags(self, row: int) -> tuple:
+        return self.tags_of(self.columns['tags'][row])
+
+    def tags_of(self, index: int) -> tuple:
+        tags = self._tags.get(index)
+        if tags is None:
+            text = self.string(index)
+            tags = self._tags[index] = tuple(text.split(_TAG_SEPARATOR)) if text else ()
+        return tags
+
+    def rows_between(self, lo: Optional[int], hi: Optional[int]) -> range:
+        # Redovi sa početkom u [lo, hi] (epohe, None bez granice)
+        epochs = self.columns['epoch']
+        first = 0 if lo is None else bisect_left(epochs, lo)
+        last = self.length if hi is None else bisect_right(epochs, hi)
+        return range(first, max(first, last))
+
+    def rows_with_tags(self, rows: Iterable[int], any_of: Optional[Iterable[str]] = None,
+                       all_of: Optional[Iterable[str]] = None,
+                       none_of: Optional[Iterable[str]] = None) -> Optional[List[int]]:
+        # Filtriranje po koloni bitmaski, bez dekodiranja ijednog stringa;
+        # None ako neki tag nema svoj bit (pozivalac tada proverava sam)
+        masks = []
+        for tags in (any_of, all_of, none_of):
+            mask = 0
+            for tag in tags or ():
+                bit = self._bits.get(tag)
+                if bit is None:
+                    continue
+                if bit >= MASK_BITS:
+                    return None
+                mask |= 1 << bit
+            masks.append(mask)
+        any_mask, all_mask, none_mask = masks
+        if any_of and not any_mask or all_of and any(tag not in self._bits for tag in all_of):
+            return []
+        column = self.columns['tag_mask']
+        return [row for row in rows
+                if (not any_of or column[row] & any_mask)
+                and column[row] & all_mask == all_mask
+                and not column[row] & none_mask]
+
+    def row(self, index: int) -> Row:
+        columns = self.columns
+        extra = columns['extra'][index]
+        return Row(self.string(columns['id'][index]), self.string(columns['title'][index]),
+                   self.string(columns['description'][index]), columns['epoch'][index],
+                   columns['notification_minutes'][index], bool(columns['flags'][index] & NOTIFIED),
+                   self.tags(index), columns['duration_minutes'][index],
+                   self.string(columns['location'][index]), json.loads(self.string(extra)) if extra else None)
+
+    def rows(self, indexes: Optional[Iterable[int]] = None) -> Iterator[Row]:
+        if indexes is not None:
+            return map(self.row, indexes)
+        # Svi redovi (učitavanje celog snapshot-a): tabela stringova se dekodira
+        # odjednom, a kolone se čitaju redom umesto red po red
+        blob, offsets = bytes(self._blob), self._offsets
+        strings = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self._strings))]
+        self._strings = strings
+        string = strings.__getitem__
+        columns = self.columns
+        tags = {index: self.tags_of(index) for index in set(columns['tags'])}
+        return map(Row, map(string, columns['id']), map(string, columns['title']),
+                   map(string, columns['description']), columns['epoch'], columns['notification_minutes'],
+                   (bool(flags & NOTIFIED) for flags in columns['flags']), map(tags.__getitem__, columns['tags']),
+                   columns['duration_minutes'], map(string, columns['location']),
+                   (json.loads(strings[index]) if index else None for index in columns['extra']))
+
+    def ids(self) -> Iterator[str]:
+        return map(self.string, self.columns['id'])
+
+    def records(self) -> Iterator[Dict]:
+        return map(to_record, self.rows())
+
+    def close(self) -> None:
+        # Pogledi na mmap moraju da se otpuste pre zatvaranja
+        for column in self.columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        self._blob.release()
+        self._view.release()
+        self._map.close()
+
+
+def from_record(record: Dict) -> Row:
+    # Rečnik u obliku Event.to_dict; polja bez svoje kolone idu u extra, kao i
+    # tekst vremena koji se iz epohe ne bi vratio isti
+    value = record['date_time']
+    when = datetime.fromisoformat(value)
+    extra = {key: item for key, item in record.items() if key not in _CORE}
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    if when.isoformat() != value:
+        extra['date_time'] = value
+    return Row(record['id'], record['title'], record['description'], (when - _EPOCH) // _MICROSECOND,
+               record['notification_minutes'], bool(record.get('notified')), tuple(record.get('tags') or ()),
+               record.get('duration_minutes', 0), record.get('location', ""), extra or None)
+
+
+def to_record(row: Row) -> Dict:
+    record = {
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'date_time': (_EPOCH + timedelta(microseconds=row.epoch)).isoformat(),
+        'notification_minutes': row.notification_minutes,
+        'notified': row.notified,
+        'tags': list(row.tags),
+    }
+    if row.duration_minutes:
+        record['duration_minutes'] = row.duration_minutes
+    if row.location:
+        record['location'] = row.location
+    if row.extra:
+        record.update(row.extra)
+    return record
+
+
+def _column(view: memoryview, code: str) -> Union[memoryview, array]:
+    if _LITTLE_ENDIAN:
+        return view.cast(code)
+    data = array(code)
+    data.frombytes(view)
+    data.byteswap()
+    return data
+
+
+def _aligned(pos: int) -> int:
+    return -(-pos // _ALIGN) * _ALIGN
+
+
+def _pad(f, pos: int) -> int:
+    aligned = _aligned(pos)
+    f.write(b"\x00" * (aligned - pos))
+    return aligned
@@ -0,0 +1,263 @@
+import json
+import os
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import columnar
+from columnar import ColumnarSnapshot
+
+# Koliko pročitanih meseci arhiva drži u memoriji (najskorije korišćeni)
+CACHE_MONTHS = 24
+_MONTH_FILE = re.compile(r"^(\d{4}-\d{2})\.(kol|json)$")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class _ColumnarMonth:
+    # Mesec u binarnom formatu po kolonama (mmap): opseg i tagovi se traže nad
+    # kolonama, a događaji se prave tek za redove koje upit vrati
+    def __init__(self, stamp, snapshot: ColumnarSnapshot, from_row: Callable):
+        self.stamp = stamp
+        self.snapshot = snapshot
+        self.from_row = from_row
+        self._built: Dict[int, object] = {}
+        self._rows_by_id: Optional[Dict[str, int]] = None
+
+    def between(self, lo: Optional[int], hi: Optional[int], tags: Optional[Sequence] = None) -> List:
+        rows = self.snapshot.rows_between(lo, hi)
+        if tags is not None:
+            matching = self.snapshot.rows_with_tags(rows, *tags)
+            if matching is not None:
+                rows = matching
+        return [self._event(row) for row in rows]
+
+    def get(self, event_id: str):
+        if self._rows_by_id is None:
+            self._rows_by_id = {value: row for row, value in enumerate(self.snapshot.ids())}
+        row = self._rows_by_id.get(event_id)
+        return None if row is None else self._event(row)
+
+    def ids(self) -> Iterable[str]:
+        return self.snapshot.ids()
+
+    def all(self) -> List:
+        return [self._event(row) for row in range(len(self.snapshot))]
+
+    def _event(self, row: int):
+        event = self._built.get(row)
+        if event is None:
+            event = self._built.setdefault(row, self.from_row(self.snapshot.row(row)))
+        return event
+
+
+class _JsonMonth:
+    # Mesec u JSON formatu iz ranijih verzija; pri prvoj izmeni se prepisuje u kolone
+    def __init__(self, stamp, events: List):
+        self.stamp = stamp
+        self.events = events
+        self.times = [event.epoch for event in events]
+        self.by_id = {event.id: event for event in events}
+
+    def between(self, lo: Optional[int], hi: Optional[int], tags: Optional[Sequence] = None) -> List:
+        i = 0 if lo is None else bisect_left(self.times, lo)
+        j = len(self.times) if hi is None else bisect_right(self.times, hi)
+        return self.events[i:j]
+
+    def get(self, event_id: str):
+        return self.by_id.get(event_id)
+
+    def ids(self) -> Iterable[str]:
+        return self.by_id.keys()
+
+    def all(self) -> List:
+        return self.events
+
+
+class EventArchive:
+    # Hladni deo kalendara: prošli događaji, po jedan fajl za svaki mesec
+    # ("2024-05.kol", binarni format po kolonama iz columnar.py) u
+    # direktorijumu pored fajla sa podacima. Mesec se mapira tek kada ga upit
+    # dotakne i zatim čuva u ograničenom kešu; keš važi dok se fajl ne
+    # promeni, pa arhiviranje iz drugog procesa postaje vidljivo bez dodatnog
+    # dogovora. Upisi idu pod bravom fajla skladišta (pozivalac), a ovde samo
+    # atomski (tmp + replace).
+
+    def __init__(self, directory: str, from_dict: Callable[[Dict], object], from_row: Callable,
+                 cache_months: int = CACHE_MONTHS):
+        self.directory = directory
+        self.from_dict = from_dict
+        self.from_row = from_row
+        self.cache_months = cache_months
+        self._lock = threading.RLock()
+        self._months: Dict[str, str] = {}
+        self._months_stamp = None
+        self._cache: "OrderedDict[str, object]" = OrderedDict()
+
+    def months(self) -> List[str]:
+        # Spisak meseci se ponovo čita samo kada se promeni direktorijum
+        # (novi ili obrisan fajl, ili zamena fajla preko replace)
+        stamp = _stat(self.directory)
+        with self._lock:
+            if stamp != self._months_stamp:
+                names = os.listdir(self.directory) if stamp is not None else []
+                files: Dict[str, str] = {}
+                for match in filter(None, map(_MONTH_FILE.match, sorted(names))):
+                    # Ako su oba, binarni je noviji (prekinut prelazak sa JSON-a)
+                    if match.group(2) == "kol" or match.group(1) not in files:
+                        files[match.group(1)] = match.group(0)
+                self._months = dict(sorted(files.items()))
+                self._months_stamp = stamp
+            return list(self._months)
+
+    def end_epoch(self) -> Optional[int]:
+        # Svi arhivirani događaji počinju pre ovog trenutka (početak meseca
+        # posle poslednjeg arhiviranog); None ako je arhiva prazna
+        months = self.months()
+        if not months:
+            return None
+        year, month = map(int, months[-1].split("-"))
+        following = datetime(year + month // 12, month % 12 + 1, 1)
+        return (following - _EPOCH) // _MICROSECOND
+
+    def between(self, lo: Optional[int], hi: Optional[int], tags: Optional[Sequence] = None) -> List:
+        # Arhivirani događaji sa početkom u [lo, hi] (epohe), po datumu. tags je
+        # (any_of, all_of, none_of) i samo sužava izbor; pozivalac ga ipak proverava
+        first = None if lo is None else _month_of(lo)
+        last = None if hi is None else _month_of(hi)
+        result = []
+        for month in self.months():
+            if (first is not None and month < first) or (last is not None and month > last):
+                continue
+            data = self._load(month)
+            if data is not None:
+                result.extend(data.between(lo, hi, tags))
+        return result
+
+    def get(self, event_id: str):
+        # Samo meseci koji su već u kešu (događaj je prikazan posle upita
+        # koji je dotakao njegov mesec); bez čitanja diska
+        with self._lock:
+            months = list(self._cache.values())
+        for data in months:
+            event = data.get(event_id)
+            if event is not None:
+                return event
+        return None
+
+    def find(self, event_id: str):
+        # Kao get, ali po potrebi čita sve mesece (brisanje ili izmena po id-u)
+        event = self.get(event_id)
+        if event is not None:
+            return event
+        for month in reversed(self.months()):
+            data = self._load(month)
+            event = None if data is None else data.get(event_id)
+            if event is not None:
+                return event
+        return None
+
+    def existing_ids(self, event_ids: Iterable[str]) -> Set[str]:
+        # Iz binarnih meseci se čita samo kolona id-jeva
+        wanted = set(event_ids)
+        found = set()
+        for month in self.months():
+            if not wanted:
+                break
+            data = self._open(month)
+            if data is not None:
+                found.update(wanted.intersection(data.ids()))
+                wanted -= found
+        return found
+
+    def iter_all(self) -> Iterator:
+        # Ceo sadržaj arhive mesec po mesec, bez punjenja keša (izvoz)
+        for month in self.months():
+            yield from self._read(month)
+
+    def add(self, events: Iterable) -> None:
+        # Događaj koji je već u arhivi (ponovljeno arhiviranje posle pada) se zamenjuje
+        for month, group in _by_month(events).items():
+            merged = {event.id: event for event in self._read(month)}
+            merged.update((event.id, event) for event in group)
+            self._write(month, list(merged.values()))
+
+    def remove(self, events: Iterable) -> None:
+        for month, group in _by_month(events).items():
+            ids = {event.id for event in group}
+            self._write(month, [event for event in self._read(month) if event.id not in ids])
+
+    def _load(self, month: str):
+        # Mapirani mesec iz keša; mmap se zatvara sam kada mesec ispadne iz
+        # keša i nijedan upit ga više ne koristi
+        with self._lock:
+            data = self._cache.get(month)
+            path = self._path(month)
+            stamp = _stat(path)
+            if data is not None and data.stamp == stamp:
+                self._cache.move_to_end(month)
+                return data
+            data = self._open(month, path, stamp)
+            if data is None:
+                self._cache.pop(month, None)
+                return None
+            self._cache[month] = data
+            while len(self._cache) > self.cache_months:
+                self._cache.popitem(last=False)
+            return data
+
+    def _open(self, month: str, path: Optional[str] = None, stamp=None):
+        path = path or self._path(month)
+        stamp = stamp or _stat(path)
+        try:
+            if columnar.is_columnar(path):
+                return _ColumnarMonth(stamp, ColumnarSnapshot(path), self.from_row)
+            with open(path, 'r', encoding='utf-8') as f:
+                return _JsonMonth(stamp, [self.from_dict(item) for item in json.load(f)])
+        except FileNotFoundError:
+            return None
+
+    def _read(self, month: str) -> List:
+        data = self._open(month)
+        return [] if data is None else data.all()
+
+    def _write(self, month: str, events: List) -> None:
+        old_path = self._path(month)
+        path = os.path.join(self.directory, f"{month}.kol")
+        with self._lock:
+            self._cache.pop(month, None)
+            if events:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_file = f"{path}.{os.getpid()}.tmp"
+                columnar.write(tmp_file, [event.to_row() for event in events])
+                os.replace(tmp_file, path)
+            elif os.path.exists(path):
+                os.remove(path)
+            if old_path != path and os.path.exists(old_path):
+                os.remove(old_path)
+
+    def _path(self, month: str) -> str:
+        self.months()
+        name = self._months.get(month, f"{month}.kol")
+        return os.path.join(self.directory, name)
+
+
+def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _month_of(epoch: int) -> str:
+    return (_EPOCH + timedelta(microseconds=epoch)).strftime("%Y-%m")
+
+
+def _by_month(events: Iterable) -> Dict[str, List]:
+    groups: Dict[str, List] = {}
+    for event in events:
+        groups.setdefault(_month_of(event.epoch), []).append(event)
+    return groups
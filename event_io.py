@@ -0,0 +1,479 @@
+import csv
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+from event_manager import Event, EventManager, OCCURRENCE_SEPARATOR
+
+# Uvoz i izvoz u toku (generatori): u memoriji je uvek samo jedna serija
+# zapisa, bez obzira na veličinu fajla. Podržani formati su JSON Lines, CSV,
+# iCalendar (.ics) i stari JSON niz.
+
+FORMATS = ("jsonl", "csv", "ics", "json")
+EXTENSIONS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".ics": "ics", ".json": "json"}
+
+CSV_FIELDS = ["id", "title", "description", "date_time", "notification_minutes", "notified", "tags",
+              "duration_minutes", "location", "recurrence", "notified_occurrences"]
+
+ICS_FREQUENCIES = {"daily": "DAILY", "weekly": "WEEKLY", "monthly": "MONTHLY"}
+ICS_DATETIME = "%Y%m%dT%H%M%S"
+# Sopstveno svojstvo da se posle povratnog uvoza ne ponove već poslata obaveštenja
+ICS_NOTIFIED = "X-PAMETNE-KANCELARIJE-NOTIFIED"
+
+# Prostor imena za id-jeve izvedene iz tuđih UID-ova ili sadržaja zapisa;
+# isti zapis uvek dobija isti id, pa ponovljeni uvoz preskače duplikate
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "pametne-kancelarije")
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(f"Nepoznat format fajla: {path} (podržani su {', '.join(FORMATS)})")
+    return EXTENSIONS[extension]
+
+
+# --- čitanje ---
+
+def read_records(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    readers = {"jsonl": _read_jsonl, "csv": _read_csv, "ics": _read_ics, "json": _read_json}
+    return readers[detect_format(path, fmt)](path)
+
+
+def _read_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Neispravan red se broji kao neispravan zapis, a uvoz ide dalje
+                    yield {}
+
+
+def _read_json(path: str) -> Iterator[Dict]:
+    # Stari format je jedan JSON niz, pa ga biblioteka json mora učitati ceo
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from json.load(f)
+
+
+def _read_csv(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            record = {
+                'title': row.get('title') or '',
+                'description': row.get('description') or '',
+                'date_time': row.get('date_time') or '',
+                'notification_minutes': row.get('notification_minutes') or 15,
+                'notified': (row.get('notified') or '').strip().lower() in ('1', 'true', 'da'),
+                'tags': [tag for tag in (row.get('tags') or '').split(';') if tag],
+                'duration_minutes': row.get('duration_minutes') or 0,
+                'location': row.get('location') or '',
+            }
+            if row.get('id'):
+                record['id'] = row['id']
+            try:
+                for field in ('recurrence', 'notified_occurrences'):
+                    if row.get(field):
+                        record[field] = json.loads(row[field])
+            except ValueError:
+                record = {}
+            yield record
+
+
+def _read_ics(path: str) -> Iterator[Dict]:
+    current = None
+    in_alarm = False
+    for name, params, value in _ics_properties(path):
+        if name == "BEGIN" and value == "VEVENT":
+            current = {'title': '', 'description': '', 'notification_minutes': 15, 'tags': [],
+                       'exdates': []}
+        elif current is None:
+            continue
+        elif name == "BEGIN" and value == "VALARM":
+            in_alarm = True
+        elif name == "END" and value == "VALARM":
+            in_alarm = False
+        elif in_alarm:
+            if name == "TRIGGER":
+                minutes = _ics_trigger_minutes(value)
+                if minutes is not None:
+                    current['notification_minutes'] = minutes
+        elif name == "END" and value == "VEVENT":
+            yield _ics_record(current)
+            current = None
+        elif name == "UID":
+            current['uid'] = value
+        elif name == "SUMMARY":
+            current['title'] = _ics_unescape(value)
+        elif name == "DESCRIPTION":
+            current['description'] = _ics_unescape(value)
+        elif name == "DTSTART":
+            current['dtstart'] = _ics_datetime(value)
+        elif name == "DTEND":
+            current['dtend'] = _ics_datetime(value)
+        elif name == "DURATION":
+            current['duration'] = _ics_duration_minutes(value)
+        elif name == "LOCATION":
+            current['location'] = _ics_unescape(value)
+        elif name == "CATEGORIES":
+            current['tags'].extend(_ics_unescape(tag) for tag in _ics_split(value))
+        elif name == "RRULE":
+            current['rrule'] = value
+        elif name == "EXDATE":
+            current['exdates'].extend(_ics_datetime(item) for item in value.split(','))
+        elif name == ICS_NOTIFIED:
+            current['notified'] = value.upper() == "TRUE"
+
+
+def _ics_properties(path: str) -> Iterator[tuple]:
+    # Spaja presavijene redove (nastavak počinje razmakom ili tabom) i deli
+    # svaki red na ime, parametre i vrednost
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        pending = None
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line[:1] in (' ', '\t') and pending is not None:
+                pending += line[1:]
+                continue
+            if pending:
+                yield _ics_split_line(pending)
+            pending = line
+        if pending:
+            yield _ics_split_line(pending)
+
+
+def _ics_split_line(line: str) -> tuple:
+    head, _, value = line.partition(':')
+    name, *params = head.split(';')
+    return name.upper(), params, value
+
+
+def _ics_split(value: str) -> List[str]:
+    if '\\' not in value:
+        return value.split(',')
+    parts, current, escaped = [], [], False
+    for char in value:
+        if escaped:
+            current.append('\\' + char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == ',':
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append(''.join(current))
+    return parts
+
+
+def _ics_escape(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _ics_unescape(value: str) -> str:
+    if '\\' not in value:
+        return value
+    result, escaped = [], False
+    for char in value:
+        if escaped:
+            result.append('\n' if char in 'nN' else char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        else:
+            result.append(char)
+    return ''.join(result)
+
+
+def _ics_datetime(value: str) -> Optional[datetime]:
+    # Ručno sečenje je nekoliko puta brže od strptime, a uvoz ga poziva za svaki događaj
+    value = value.strip()
+    try:
+        if len(value) == 8 and value.isdigit():
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+        if len(value) not in (15, 16) or value[8] != 'T' or not value[9:15].isdigit():
+            return None
+        parsed = datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]),
+                          int(value[9:11]), int(value[11:13]), int(value[13:15]))
+        if len(value) == 16:
+            if value[15] != 'Z':
+                return None
+            # UTC vreme se prevodi u lokalno, kao i ostali datumi u aplikaciji
+            return parsed.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+        return parsed
+    except ValueError:
+        return None
+
+
+def _ics_trigger_minutes(value: str) -> Optional[int]:
+    # Podržava relativne okidače oblika -PT15M, -PT1H30M, -P1D
+    value = value.strip()
+    if not value.startswith('-P'):
+        return None
+    return _ics_duration_minutes(value[1:])
+
+
+def _ics_duration_minutes(value: str) -> Optional[int]:
+    # Trajanje oblika PT1H30M, P1D, P1W
+    value = value.strip().lstrip('+')
+    if not value.startswith('P'):
+        return None
+    minutes, number = 0, ''
+    units = {'W': 7 * 24 * 60, 'D': 24 * 60, 'H': 60, 'M': 1, 'S': 0}
+    for char in value[1:]:
+        if char.isdigit():
+            number += char
+        elif char in units and number:
+            minutes += int(number) * units[char]
+            number = ''
+        elif char != 'T':
+            return None
+    return minutes
+
+
+def _ics_record(item: Dict) -> Dict:
+    record = {
+        'title': item['title'],
+        'description': item['description'],
+        'date_time': item['dtstart'].isoformat() if item.get('dtstart') else '',
+        'notification_minutes': item['notification_minutes'],
+        'tags': item['tags'],
+    }
+    if item.get('duration'):
+        record['duration_minutes'] = item['duration']
+    elif item.get('dtend') and item.get('dtstart') and item['dtend'] > item['dtstart']:
+        record['duration_minutes'] = int((item['dtend'] - item['dtstart']).total_seconds() // 60)
+    if item.get('location'):
+        record['location'] = item['location']
+    uid = item.get('uid')
+    if uid:
+        record['id'] = uid if OCCURRENCE_SEPARATOR not in uid else uuid.uuid5(ID_NAMESPACE, uid).hex
+    if 'rrule' in item:
+        record['recurrence'] = _ics_recurrence(item['rrule'], item['exdates'])
+        if record['recurrence'] is None:
+            # Pravilo koje aplikacija ne ume da ponovi (npr. YEARLY) ili neispravno
+            # pravilo čini zapis neispravnim
+            return {}
+    if 'notified' in item:
+        record['notified'] = item['notified']
+    elif 'rrule' not in item and item.get('dtstart'):
+        # Tuđi kalendar ne zna šta je već najavljeno; prošli događaji se ne najavljuju
+        record['notified'] = item['dtstart'] < datetime.now()
+    return record
+
+
+def _ics_recurrence(rrule: str, exdates: List[Optional[datetime]]) -> Optional[Dict]:
+    parts = dict(part.split('=', 1) for part in rrule.split(';') if '=' in part)
+    frequencies = {value: key for key, value in ICS_FREQUENCIES.items()}
+    frequency = frequencies.get(parts.get('FREQ', '').upper())
+    if frequency is None:
+        return None
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        return None
+    rule = {'frequency': frequency, 'interval': interval}
+    if 'UNTIL' in parts:
+        until = _ics_datetime(parts['UNTIL'])
+        if until is None:
+            return None
+        if 'T' not in parts['UNTIL']:
+            until = until.replace(hour=23, minute=59, second=59)
+        rule['until'] = until.isoformat()
+    if count is not None:
+        rule['count'] = count
+    exceptions = [value.isoformat() for value in exdates if value is not None]
+    if exceptions:
+        rule['exceptions'] = exceptions
+    return rule
+
+
+# --- validacija i uvoz ---
+
+def record_to_event(record: Dict) -> Optional[Event]:
+    # Neispravan zapis vraća None; nepoznati tagovi se izostavljaju
+    try:
+        title = str(record.get('title') or '').strip()
+        if not title or not record.get('date_time'):
+            return None
+        minutes = int(record.get('notification_minutes', 15))
+        if minutes < 0:
+            return None
+        data = dict(record)
+        data['title'] = title
+        data['description'] = str(record.get('description') or '')
+        data['notification_minutes'] = minutes
+        data['duration_minutes'] = int(record.get('duration_minutes') or 0)
+        if data['duration_minutes'] < 0:
+            return None
+        data['location'] = str(record.get('location') or '')
+        data['tags'] = [tag for tag in record.get('tags') or [] if tag in Event.AVAILABLE_TAGS]
+        if not data.get('id'):
+            data['id'] = uuid.uuid5(ID_NAMESPACE, f"{title}|{record['date_time']}").hex
+        elif OCCURRENCE_SEPARATOR in str(data['id']):
+            return None
+        return Event.from_dict(data)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+def import_events(manager: EventManager, records: Iterable[Dict],
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    # Zapisi se obrađuju u serijama: duplikati (u seriji i u skladištu) se
+    # odbacuju jednim upitom, a cela serija se upisuje kao jedna izmena skladišta
+    stats = {'imported': 0, 'duplicates': 0, 'invalid': 0}
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return stats
+        events: Dict[str, Event] = {}
+        for record in batch:
+            event = record_to_event(record)
+            if event is None:
+                stats['invalid'] += 1
+            elif event.id in events:
+                stats['duplicates'] += 1
+            else:
+                events[event.id] = event
+        existing = manager.existing_ids(events)
+        new_events = [event for event_id, event in events.items() if event_id not in existing]
+        manager.add_events(new_events)
+        stats['imported'] += len(new_events)
+        stats['duplicates'] += len(existing)
+
+
+def import_file(manager: EventManager, path: str, fmt: Optional[str] = None,
+                batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    return import_events(manager, read_records(path, fmt), batch_size)
+
+
+# --- izvoz ---
+
+def write_events(events: Iterable[Event], path: str, fmt: Optional[str] = None) -> int:
+    writers = {"jsonl": _write_jsonl, "csv": _write_csv, "ics": _write_ics, "json": _write_json}
+    fmt = detect_format(path, fmt)
+    # Upis ide u privremeni fajl, pa prekinut izvoz ne ostavlja polovičan fajl
+    tmp_file = path + ".tmp"
+    newline = '' if fmt in ("csv", "ics") else None
+    with open(tmp_file, 'w', encoding='utf-8', newline=newline) as f:
+        count = writers[fmt](events, f)
+    os.replace(tmp_file, path)
+    return count
+
+
+def export_file(manager: EventManager, path: str, fmt: Optional[str] = None) -> int:
+    return write_events(manager.iter_events(), path, fmt)
+
+
+def _write_jsonl(events: Iterable[Event], f) -> int:
+    count = 0
+    for event in events:
+        f.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def _write_json(events: Iterable[Event], f) -> int:
+    # Isti oblik kao snapshot, ali se niz ispisuje događaj po događaj
+    count = 0
+    f.write("[")
+    for event in events:
+        f.write(",\n  " if count else "\n  ")
+        f.write(json.dumps(event.to_dict(), ensure_ascii=False))
+        count += 1
+    f.write("\n]\n" if count else "]\n")
+    return count
+
+
+def _write_csv(events: Iterable[Event], f) -> int:
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    count = 0
+    for event in events:
+        row = event.to_dict()
+        row['tags'] = ';'.join(row['tags'])
+        row['notified'] = int(row['notified'])
+        for field in ('recurrence', 'notified_occurrences'):
+            if field in row:
+                row[field] = json.dumps(row[field], ensure_ascii=False)
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _write_ics(events: Iterable[Event], f) -> int:
+    f.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Pametne Kancelarije//SR\r\n")
+    stamp = datetime.now(timezone.utc).strftime(ICS_DATETIME) + "Z"
+    count = 0
+    for event in events:
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{event.id}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{event.date_time.strftime(ICS_DATETIME)}",
+            f"SUMMARY:{_ics_escape(event.title)}",
+        ]
+        if event.duration_minutes:
+            lines.append(f"DTEND:{event.end_time.strftime(ICS_DATETIME)}")
+        if event.location:
+            lines.append(f"LOCATION:{_ics_escape(event.location)}")
+        if event.description:
+            lines.append(f"DESCRIPTION:{_ics_escape(event.description)}")
+        if event.tags:
+            lines.append(f"CATEGORIES:{','.join(_ics_escape(tag) for tag in event.tags)}")
+        if event.recurrence is not None:
+            lines.extend(_ics_rrule_lines(event))
+        lines.append(f"{ICS_NOTIFIED}:{'TRUE' if event.notified else 'FALSE'}")
+        lines.extend([
+            "BEGIN:VALARM",
+            "ACTION:DISPLAY",
+            f"DESCRIPTION:{_ics_escape(event.title)}",
+            f"TRIGGER:-PT{event.notification_minutes}M",
+            "END:VALARM",
+            "END:VEVENT",
+        ])
+        f.write("".join(_ics_fold(line) for line in lines))
+        count += 1
+    f.write("END:VCALENDAR\r\n")
+    return count
+
+
+def _ics_rrule_lines(event: Event) -> List[str]:
+    recurrence = event.recurrence
+    rule = f"RRULE:FREQ={ICS_FREQUENCIES[recurrence.frequency]};INTERVAL={recurrence.interval}"
+    if recurrence.until is not None:
+        rule += f";UNTIL={recurrence.until.strftime(ICS_DATETIME)}"
+    if recurrence.count is not None:
+        rule += f";COUNT={recurrence.count}"
+    lines = [rule]
+    if recurrence.exceptions:
+        lines.append("EXDATE:" + ",".join(
+            value.strftime(ICS_DATETIME) for value in sorted(recurrence.exceptions)))
+    return lines
+
+
+def _ics_fold(line: str) -> str:
+    # RFC 5545: redovi duži od 75 okteta se prelamaju, nastavak počinje razmakom
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Ne sme se preseći višebajtni UTF-8 znak
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
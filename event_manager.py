@@ -1,7 +1,28 @@
-import json
 import os
+import sys
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
-from typing import List, Dict
+from heapq import heappop, heappush, merge
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Set, Tuple
+import columnar
+import metrics
+from columnar import ColumnarSnapshot
+from event_archive import EventArchive
+from journal_store import CommitBatch, JournalStore
+from recurrence import Recurrence
+from rwlock import ReadWriteLock
+from search_index import SearchIndex, event_text, fingerprint, matches, query_terms
+from write_behind import WriteBehind
+
+# Id pojave ponavljajućeg događaja: "<id serije>@<epoha pojave>"
+OCCURRENCE_SEPARATOR = "@"
+
+class ConcurrentModificationError(Exception):
+    # Događaj je u međuvremenu izmenjen (npr. iz drugog procesa nad istim fajlom)
+    pass
 
 class Event:
     # Predefinisani tagovi
@@ -22,24 +43,104 @@ class Event:
         "drugo"         # other
     ]
     
+    __slots__ = ('id', 'title', 'description', 'notification_minutes', 'notified',
+                 '_epoch', '_date_time', '_tags', 'recurrence', 'notified_occurrences',
+                 'duration_minutes', 'location')
+    
     def __init__(self, title: str, description: str, date_time: datetime, 
-                 notification_minutes: int = 15, tags: List[str] = None):
+                 notification_minutes: int = 15, tags: List[str] = None,
+                 event_id: Optional[str] = None, recurrence: Optional[Recurrence] = None,
+                 duration_minutes: int = 0, location: str = ""):
+        self.id = event_id if event_id else uuid.uuid4().hex
         self.title = title
         self.description = description
         self.date_time = date_time
         self.notification_minutes = notification_minutes
         self.notified = False
-        self.tags = tags if tags else []
+        self.tags = tags
+        self.recurrence = recurrence
+        # Događaj bez trajanja (podsetnik, rok) ne zauzima vreme i nije u konfliktu ni sa čim
+        self.duration_minutes = duration_minutes
+        self.location = location
+        # Retko popunjen skup epoha pojava za koje je obaveštenje poslato
+        self.notified_occurrences: Optional[Set[int]] = None
+    
+    # Vreme se čuva kao ceo broj mikrosekundi od 1970-01-01 (lokalno vreme),
+    # a datetime se pravi tek kada ga neko zatraži
+    @property
+    def date_time(self) -> datetime:
+        if self._date_time is None:
+            self._date_time = from_epoch(self._epoch)
+        return self._date_time
+    
+    @date_time.setter
+    def date_time(self, value: datetime) -> None:
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        self._epoch = to_epoch(value)
+        self._date_time = value
+    
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+    
+    @property
+    def end_epoch(self) -> int:
+        return self._epoch + self.duration_minutes * MICROS_PER_MINUTE
+    
+    @property
+    def end_time(self) -> datetime:
+        return self.date_time + timedelta(minutes=self.duration_minutes)
+    
+    # Tagovi su internovana torka deljena među događajima sa istim tagovima
+    @property
+    def tags(self) -> List[str]:
+        return list(self._tags)
+    
+    @tags.setter
+    def tags(self, value: Optional[List[str]]) -> None:
+        self._tags = intern_tags(value)
+    
+    @property
+    def series_id(self) -> str:
+        return self.id
+    
+    @property
+    def tag_mask(self) -> int:
+        mask = 0
+        for tag in self._tags:
+            mask |= TAG_BITS.get(tag, 0)
+        return mask
     
     def to_dict(self) -> Dict:
-        return {
+        data = {
+            'id': self.id,
             'title': self.title,
             'description': self.description,
-            'date_time': self.date_time.isoformat(),
+            'date_time': (self._date_time or from_epoch(self._epoch)).isoformat(),
             'notification_minutes': self.notification_minutes,
             'notified': self.notified,
-            'tags': self.tags
+            'tags': list(self._tags)
         }
+        if self.duration_minutes:
+            data['duration_minutes'] = self.duration_minutes
+        if self.location:
+            data['location'] = self.location
+        if self.recurrence is not None:
+            data['recurrence'] = self.recurrence.to_dict()
+            if self.notified_occurrences:
+                data['notified_occurrences'] = sorted(
+                    from_epoch(epoch).isoformat() for epoch in self.notified_occurrences)
+        return data
+    
+    def to_row(self) -> columnar.Row:
+        # Za binarni snapshot: epoha ide direktno, bez pretvaranja u tekst
+        extra = None
+        if self.recurrence is not None:
+            data = self.to_dict()
+            extra = {key: data[key] for key in ('recurrence', 'notified_occurrences') if key in data}
+        return columnar.Row(self.id, self.title, self.description, self._epoch, self.notification_minutes,
+                            self.notified, self._tags, self.duration_minutes, self.location, extra)
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Event':
@@ -48,22 +149,74 @@ class Event:
             description=data['description'],
             date_time=datetime.fromisoformat(data['date_time']),
             notification_minutes=data['notification_minutes'],
-            tags=data.get('tags', [])
+            tags=data.get('tags', []),
+            event_id=data.get('id'),
+            recurrence=Recurrence.from_dict(data['recurrence']) if data.get('recurrence') else None,
+            duration_minutes=data.get('duration_minutes', 0),
+            location=data.get('location', "")
         )
         event.notified = data.get('notified', False)
+        event._date_time = None
+        if data.get('notified_occurrences'):
+            event.notified_occurrences = {
+                to_epoch(datetime.fromisoformat(value)) for value in data['notified_occurrences']}
+        return event
+    
+    @classmethod
+    def from_row(cls, row: columnar.Row) -> 'Event':
+        # Red binarnog snapshot-a: vreme je već epoha, pa nema parsiranja teksta
+        # ni provera iz konstruktora; retka polja (ponavljanje) idu preko rečnika
+        if row.extra:
+            return cls.from_dict(columnar.to_record(row))
+        event = cls.__new__(cls)
+        event.id = row.id
+        event.title = row.title
+        event.description = row.description
+        event._epoch = row.epoch
+        event._date_time = None
+        event.notification_minutes = row.notification_minutes
+        event.notified = row.notified
+        event._tags = intern_tags(row.tags)
+        event.recurrence = None
+        event.notified_occurrences = None
+        event.duration_minutes = row.duration_minutes
+        event.location = row.location
         return event
     
-    def is_notification_due(self) -> bool:
+    def occurrences(self, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> Iterator['Event']:
+        if self.recurrence is None:
+            if (start is None or self.date_time >= start) and (end is None or self.date_time <= end):
+                yield self
+            return
+        for value in self.recurrence.occurrences(self.date_time, start, end):
+            yield Occurrence(self, value)
+    
+    def pending_occurrence(self, now: Optional[datetime] = None) -> Optional['Event']:
+        # Sledeća pojava koja još čeka obaveštenje; propuštene prošle pojave
+        # serije se ne najavljuju naknadno
+        now = now or datetime.now()
+        for occurrence in self.occurrences(start=now):
+            if not occurrence.notified:
+                return occurrence
+        return None
+    
+    def notification_epoch(self) -> int:
+        return self._epoch - self.notification_minutes * MICROS_PER_MINUTE
+    
+    def notification_time(self) -> datetime:
+        return from_epoch(self.notification_epoch())
+    
+    def is_notification_due(self, now: Optional[datetime] = None) -> bool:
         if self.notified:
             return False
-        notification_time = self.date_time - timedelta(minutes=self.notification_minutes)
-        return datetime.now() >= notification_time
+        return to_epoch(now or datetime.now()) >= self.notification_epoch()
     
-    def is_overdue(self) -> bool:
-        return datetime.now() > self.date_time
+    def is_overdue(self, now: Optional[datetime] = None) -> bool:
+        return to_epoch(now or datetime.now()) > self._epoch
     
-    def time_until_event(self) -> str:
-        now = datetime.now()
+    def time_until_event(self, now: Optional[datetime] = None) -> str:
+        now = now or datetime.now()
         if now > self.date_time:
             return "Prošao je rok"
         
@@ -79,64 +232,1100 @@ class Event:
         else:
             return f"{minutes} minuta"
 
+class Occurrence(Event):
+    # Jedna pojava ponavljajućeg događaja; sva polja osim vremena i stanja
+    # obaveštenja čita iz serije (master)
+    __slots__ = ('master',)
+    
+    def __init__(self, master: Event, date_time: datetime):
+        self.master = master
+        self._epoch = to_epoch(date_time)
+        self._date_time = date_time
+    
+    id = property(lambda self: f"{self.master.id}{OCCURRENCE_SEPARATOR}{self._epoch}")
+    series_id = property(lambda self: self.master.id)
+    title = property(lambda self: self.master.title)
+    description = property(lambda self: self.master.description)
+    notification_minutes = property(lambda self: self.master.notification_minutes)
+    duration_minutes = property(lambda self: self.master.duration_minutes)
+    location = property(lambda self: self.master.location)
+    _tags = property(lambda self: self.master._tags)
+    recurrence = property(lambda self: None)
+    
+    @property
+    def notified(self) -> bool:
+        return bool(self.master.notified_occurrences) and self._epoch in self.master.notified_occurrences
+    
+    @notified.setter
+    def notified(self, value: bool) -> None:
+        if value:
+            # Starije pojave više nisu relevantne jer se najavljuju redom
+            keep = {epoch for epoch in self.master.notified_occurrences or () if epoch > self._epoch}
+            keep.add(self._epoch)
+            self.master.notified_occurrences = keep
+        elif self.master.notified_occurrences:
+            # Nov skup umesto izmene postojećeg, jer ga druge niti možda upravo čitaju
+            self.master.notified_occurrences = self.master.notified_occurrences - {self._epoch}
+    
+    def in_series(self, master: Event) -> Optional['Occurrence']:
+        # Ista pojava u (možda izmenjenoj) verziji serije; None ako serija više
+        # nema pojavu u to vreme ili joj se promenilo vreme obaveštenja
+        if master is self.master:
+            return self
+        current = next(master.occurrences(self._date_time, self._date_time), None)
+        if not isinstance(current, Occurrence) or current.notification_epoch() != self.notification_epoch():
+            return None
+        return current
+    
+    def to_dict(self) -> Dict:
+        data = self.master.to_dict()
+        data.pop('recurrence', None)
+        data.pop('notified_occurrences', None)
+        data.update(id=self.id, date_time=self.date_time.isoformat(), notified=self.notified)
+        return data
+
+TAG_BITS = {tag: 1 << i for i, tag in enumerate(Event.AVAILABLE_TAGS)}
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+MICROS_PER_MINUTE = 60_000_000
+# Od ove veličine serije indeks se ne dopunjuje umetanjem nego spajanjem
+INDEX_MERGE_THRESHOLD = 64
+# Provera jednog događaja pri prolazu kroz opseg indeksa je oko toliko puta
+# jeftinija od dohvatanja i sortiranja jednog kandidata po id-u
+INDEX_SCAN_RATIO = 16
+# Prošli, obavešteni događaji stariji od ovoliko dana prelaze u arhivu. Učitavanje
+# ne arhivira (komande koje samo čitaju ne pišu na disk); procesi koji dugo rade
+# pozivaju archive_old_events pri pokretanju i zatim na svakih ARCHIVE_INTERVAL_SECONDS.
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_INTERVAL_SECONDS = 3600
+_tag_tuples: Dict[tuple, tuple] = {}
+
+def to_epoch(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return (value - _EPOCH) // _MICROSECOND
+
+def from_epoch(epoch: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=epoch)
+
+def intern_tags(tags: Optional[List[str]]) -> tuple:
+    key = tuple(tags) if tags else ()
+    cached = _tag_tuples.get(key)
+    if cached is None:
+        cached = tuple(sys.intern(tag) for tag in key)
+        _tag_tuples[cached] = cached
+    return cached
+
 class EventManager:
+    # Bezbedan za više niti: čitanja idu pod deljenom bravom i vraćaju nove
+    # liste, izmene su serijalizovane pod bravom za pisanje. Događaji se ne
+    # menjaju na mestu (izmena zamenjuje objekat), pa je jednom vraćen
+    # rezultat nepromenljiv pogled na stanje u trenutku čitanja. Upis u
+    # žurnal se potvrđuje tek posle otpuštanja brave, da bi se izmene
+    # iz više niti spojile u jedan upis na disk.
+    #
+    # Izmene drugih procesa nad istim fajlom stižu preko _apply_foreign (pre
+    # svakog upisa i u poll_changes) i primenjuju se zapis po zapis, uz iste
+    # obaveštenja slušaocima kao i lokalne izmene.
+    #
+    # U memoriji je samo radni skup (predstojeći i skorašnji događaji); stari
+    # prelaze u arhivu po mesecima (archive_old_events) i čitaju se tek kada
+    # upit po datumu dođe do njih. Ako je isti id i u radnom skupu i u arhivi
+    # (prekinuto arhiviranje), važi verzija iz radnog skupa.
+    #
+    # Uz write_delay upis je odložen (write_behind.py): izmena se vraća čim je
+    # u memoriji i u redu žurnala, a pozadinska nit upisuje red kada izmene
+    # zastanu. flush() čeka da sve bude na disku; greška upisa je u
+    # persist_error dok ponovni pokušaj ne uspe.
+    #
+    # Podklasa sa drugim skladištem (SQLiteEventManager) menja _open_store i
+    # load_events, a ostalo stanje deli sa ovom klasom.
     
-    def __init__(self, data_file: str = "dogadjaji.json"):
+    def __init__(self, data_file: str = "dogadjaji.json", compact_threshold: int = 500,
+                 persist_search: bool = False, archive_after_days: Optional[int] = ARCHIVE_AFTER_DAYS,
+                 snapshot_format: str = "json", write_delay: Optional[float] = None):
         self.data_file = data_file
-        self.events: List[Event] = []
+        self._lock = ReadWriteLock()
+        # Broj izmena; snapshot() se pravi ponovo samo kada se verzija promeni
+        self._version = 0
+        self._snapshot_cache: Optional[Tuple[int, Tuple[Event, ...]]] = None
+        self._events: Dict[str, Event] = {}
+        # Sortirani indeks po date_time: paralelne liste epoha i događaja
+        self._index_times: List[int] = []
+        self._index_events: List[Event] = []
+        # Invertovani indeks: tag -> skup id-jeva događaja
+        self._tag_index: Dict[str, Set[str]] = {}
+        # Ponavljajuće serije nisu u indeksu po datumu; njihove pojave se
+        # računaju tek za opseg koji upit traži
+        self._recurring: Dict[str, Event] = {}
+        # Najduže trajanje u minutima: događaj koji preklapa neki opseg počinje
+        # najviše toliko pre njega, pa upit po indeksu kreće od te tačke
+        self._max_duration = 0
+        # Indeks pretrage teksta se pravi tek pri prvoj pretrazi, a zatim prati
+        # izmene; po želji se pri zatvaranju čuva pored fajla sa podacima
+        self._search: Optional[SearchIndex] = None
+        self._search_build_lock = threading.Lock()
+        self.search_file = data_file + ".search" if persist_search else None
+        self.archive_after_days = archive_after_days
+        self.archive: Optional[EventArchive] = None
+        if archive_after_days is not None:
+            self.archive = EventArchive(data_file + ".arhiva", Event.from_dict, Event.from_row)
+        self._listeners: List[Callable[[str, Event], None]] = []
+        self._writer: Optional[WriteBehind] = None
+        # Arhivirani događaji koji se iz arhive uklanjaju tek posle upisa zapisa o izmeni
+        self._archive_removals: List[Event] = []
+        self._open_store(compact_threshold, snapshot_format)
+        if write_delay is not None:
+            self._writer = WriteBehind(self._write_pending, delay=write_delay)
         self.load_events()
     
+    def _open_store(self, compact_threshold: int, snapshot_format: str) -> None:
+        self.store = JournalStore(self.data_file, compact_threshold=compact_threshold,
+                                  snapshot_format=snapshot_format)
+        self.store.on_foreign = self._apply_foreign
+    
+    def add_listener(self, callback: Callable[[str, Event], None]) -> None:
+        # callback(op, event) gde je op jedno od: add, update, remove, notified,
+        # ili reload (event je None) kada je sve ponovo učitano sa diska
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback: Callable[[str, Event], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify_listeners(self, op: str, event: Event) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(op, event)
+            except Exception as e:
+                print(f"Greška u obradi promene događaja: {e}")
+    
+    @property
+    def version(self) -> int:
+        return self._version
+    
+    def snapshot(self) -> Tuple[Event, ...]:
+        # Nepromenljiv pogled na sve sačuvane događaje; pravi se jednom po
+        # verziji i deli između svih čitalaca do sledeće izmene
+        with self._lock.read():
+            cached = self._snapshot_cache
+            if cached is None or cached[0] != self._version:
+                cached = (self._version, tuple(self._events.values()))
+                self._snapshot_cache = cached
+            return cached[1]
+    
+    @property
+    def events(self) -> List[Event]:
+        return list(self.snapshot())
+    
+    def iter_events(self) -> Iterator[Event]:
+        # Sačuvani događaji (serija je jedan događaj sa pravilom), sa arhivom
+        events = self.snapshot()
+        if self.archive is None:
+            return iter(events)
+        hot = {event.id for event in events}
+        archived = (event for event in self.archive.iter_all() if event.id not in hot)
+        return chain(events, archived)
+    
+    def existing_ids(self, event_ids: Iterable[str]) -> Set[str]:
+        event_ids = set(event_ids)
+        with self._lock.read():
+            found = {event_id for event_id in event_ids if event_id in self._events}
+        missing = event_ids - found
+        if missing and self.archive is not None:
+            found |= self.archive.existing_ids(missing)
+        return found
+    
+    def get_by_id(self, event_id: str) -> Optional[Event]:
+        if OCCURRENCE_SEPARATOR in event_id:
+            return self._occurrence_by_id(event_id)
+        with self._lock.read():
+            event = self._events.get(event_id)
+        if event is None and self.archive is not None:
+            # Arhivirani događaj je prikazan samo ako je njegov mesec već pročitan
+            event = self.archive.get(event_id)
+        return event
+    
+    def _occurrence_by_id(self, occurrence_id: str) -> Optional[Event]:
+        series_id, _, epoch = occurrence_id.partition(OCCURRENCE_SEPARATOR)
+        master = self.get_by_id(series_id)
+        if master is None or master.recurrence is None or not epoch.isdigit():
+            return None
+        return Occurrence(master, from_epoch(int(epoch)))
+    
+    def _remove_occurrence(self, occurrence_id: str) -> bool:
+        # Brisanje jedne pojave je izuzetak u pravilu serije; serija se menja
+        # kopijom, jer original možda upravo čita druga nit
+        while True:
+            occurrence = self._occurrence_by_id(occurrence_id)
+            if occurrence is None:
+                return False
+            master = Event.from_dict(occurrence.master.to_dict())
+            master.recurrence.exceptions.add(occurrence.date_time)
+            try:
+                return self.update_event(master.id, master, expected=occurrence.master)
+            except ConcurrentModificationError:
+                continue
+    
     def add_event(self, event: Event) -> None:
-        self.events.append(event)
-        self.save_events()
+        self.add_events([event])
+    
+    def add_events(self, events: Iterable[Event]) -> None:
+        # Više događaja odjednom, sa jednim upisom u žurnal
+        with self._lock.write():
+            added = []
+            for event in events:
+                self._events[event.id] = event
+                added.append(event)
+            self._index_add_many(added)
+            batch = self._journal_many([{'op': 'put', 'event': event.to_dict()} for event in added])
+        self._commit(batch)
+        for event in added:
+            self._notify_listeners('add', event)
     
     def remove_event(self, index: int) -> bool:
-        if 0 <= index < len(self.events):
-            del self.events[index]
-            self.save_events()
-            return True
+        events = self.events
+        if 0 <= index < len(events):
+            return self.remove_by_id(events[index].id)
         return False
     
+    def remove_by_id(self, event_id: str) -> bool:
+        if OCCURRENCE_SEPARATOR in event_id:
+            return self._remove_occurrence(event_id)
+        with self._lock.write():
+            event = self._events.pop(event_id, None)
+            if event is not None:
+                self._index_remove(event)
+                batch = self._journal({'op': 'delete', 'id': event_id})
+        if event is None:
+            event = self._find_archived(event_id)
+            if event is None:
+                return False
+            # Brisanje iz arhive se beleži i u žurnalu, da bi ga drugi procesi videli
+            with self._lock.write():
+                batch = self._journal({'op': 'delete', 'id': event_id})
+                self._queue_unarchive(event)
+            self._commit_unarchive(batch, event)
+        else:
+            self._commit(batch)
+        self._notify_listeners('remove', event)
+        return True
+    
+    def update_event(self, event_id: str, updated_event: Event, expected: Optional[Event] = None) -> bool:
+        # Izmenjeni događaj zadržava id i mesto originala; izmena pojave menja celu seriju.
+        # expected je verzija od koje je izmena krenula (optimistička provera):
+        # ako ju je u međuvremenu neko zamenio, izmena se odbija.
+        event_id = event_id.partition(OCCURRENCE_SEPARATOR)[0]
+        if expected is not None:
+            self.poll_changes()
+        with self._lock.read():
+            in_memory = event_id in self._events
+        archived = None if in_memory else self._find_archived(event_id, expected)
+        with self._lock.write():
+            old_event = self._events.get(event_id)
+            if old_event is None and archived is None:
+                return False
+            if (expected is not None and old_event is not None
+                    and old_event is not getattr(expected, 'master', expected)):
+                raise ConcurrentModificationError(f"Događaj {event_id} je u međuvremenu izmenjen")
+            # Izmenjeni arhivirani događaj se vraća u radni skup
+            updated_event.id = event_id
+            if old_event is not None:
+                self._index_remove(old_event)
+            self._events[event_id] = updated_event
+            self._index_add(updated_event)
+            batch = self._journal({'op': 'put', 'event': updated_event.to_dict()})
+            if archived is not None:
+                self._queue_unarchive(archived)
+        if archived is not None:
+            self._commit_unarchive(batch, archived)
+        else:
+            self._commit(batch)
+        self._notify_listeners('update', updated_event)
+        return True
+    
     def get_events(self, sort_by_date: bool = True) -> List[Event]:
         if sort_by_date:
-            return sorted(self.events, key=lambda x: x.date_time)
-        return self.events.copy()
+            return self.get_events_between(None, None)
+        return self.events
+    
+    def iter_events_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            with_archive: bool = True) -> Iterator[Event]:
+        # Obe granice su uključene; None znači da granice nema. Pojave serija se
+        # generišu tek dok se rezultat čita i spajaju sa pojedinačnim događajima.
+        # Arhiva se čita samo ako opseg seže do nje i with_archive je uključen.
+        archived = self._archived_between(start, end) if with_archive else []
+        with self._lock.read():
+            singles, masters = self._single_between(start, end), self._recurring_masters()
+            singles = self._with_archived(singles, archived)
+        return self._with_occurrences(singles, masters, start, end)
+    
+    def get_events_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                           with_archive: bool = True) -> List[Event]:
+        return list(self.iter_events_between(start, end, with_archive))
+    
+    def get_events_window(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                          offset: int = 0, limit: int = 50, with_archive: bool = True) -> List[Event]:
+        # Stranica rezultata get_events_between, bez pravljenja cele liste
+        offset = max(offset, 0)
+        archived = self._archived_between(start, end) if with_archive else []
+        with self._lock.read():
+            if not self._recurring_masters():
+                archived = self._unshadowed(archived)
+                if not archived:
+                    return self._single_window(start, end, offset, limit)
+                # Arhiva je pre radnog skupa, pa se spaja samo početak opsega
+                # indeksa koji se vremenski preklapa sa njom
+                lo, hi = self._index_bounds(start, end)
+                split = bisect_right(self._index_times, archived[-1].epoch, lo, hi)
+                head = archived if split == lo else list(
+                    merge(archived, self._index_events[lo:split], key=lambda x: x.epoch))
+                window = head[offset:offset + limit]
+                first = split + max(0, offset - len(head))
+                return window + self._index_events[first:min(hi, first + limit - len(window))]
+        return list(islice(self.iter_events_between(start, end, with_archive), offset, offset + limit))
+    
+    def count_events_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                             with_archive: bool = True) -> int:
+        archived = self._archived_between(start, end) if with_archive else []
+        with self._lock.read():
+            singles, masters = self._single_count(start, end), self._recurring_masters()
+            singles += len(self._unshadowed(archived))
+        return singles + sum(sum(1 for _ in self._expand(master, start, end)) for master in masters)
     
     def get_upcoming_events(self, days: int = 7) -> List[Event]:
         now = datetime.now()
-        end_date = now + timedelta(days=days)
+        return self.get_events_between(now, now + timedelta(days=days))
+    
+    def _with_occurrences(self, singles: Iterable[Event], masters: Iterable[Event],
+                          start: Optional[datetime], end: Optional[datetime]) -> Iterator[Event]:
+        expansions = [self._expand(master, start, end) for master in masters]
+        if not expansions:
+            return iter(singles)
+        return merge(singles, *expansions, key=lambda x: x.epoch)
+    
+    def _expand(self, master: Event, start: Optional[datetime],
+                end: Optional[datetime]) -> Iterator[Event]:
+        if end is not None:
+            yield from master.occurrences(start, end)
+            return
+        # Bez gornje granice serija bi bila beskonačna, pa se prikazuje samo
+        # sledeća pojava (za završene serije bez početne granice poslednja)
+        following = next(master.occurrences(start if start is not None else datetime.now()), None)
+        if following is None and start is None:
+            for following in master.occurrences():
+                pass
+        if following is not None:
+            yield following
+    
+    @staticmethod
+    def _tags_match(event: Event, any_of: Optional[Iterable[str]], all_of: Optional[Iterable[str]],
+                    none_of: Optional[Iterable[str]]) -> bool:
+        tags = set(event.tags)
+        return ((not any_of or not tags.isdisjoint(any_of))
+                and (not all_of or tags.issuperset(all_of))
+                and (not none_of or tags.isdisjoint(none_of)))
+    
+    # --- pojedinačni (neponavljajući) događaji; SQLite backend ih zamenjuje upitima ---
+    
+    def _single_between(self, start: Optional[datetime], end: Optional[datetime]) -> List[Event]:
+        lo, hi = self._index_bounds(start, end)
+        return self._index_events[lo:hi]
+    
+    def _single_window(self, start: Optional[datetime], end: Optional[datetime],
+                       offset: int, limit: int) -> List[Event]:
+        lo, hi = self._index_bounds(start, end)
+        first = lo + offset
+        return self._index_events[first:min(hi, first + limit)]
+    
+    def _single_count(self, start: Optional[datetime], end: Optional[datetime]) -> int:
+        lo, hi = self._index_bounds(start, end)
+        return hi - lo
+    
+    def _recurring_masters(self) -> List[Event]:
+        return list(self._recurring.values())
+    
+    # --- arhiva ---
+    
+    def _archived_between(self, start: Optional[datetime], end: Optional[datetime],
+                          tags: Optional[tuple] = None) -> List[Event]:
+        # Čita se van brave; mesec koji opseg ne dotiče se ne otvara
+        if self.archive is None:
+            return []
+        archive_end = self.archive.end_epoch()
+        lo = None if start is None else to_epoch(start)
+        if archive_end is None or (lo is not None and lo >= archive_end):
+            return []
+        return self.archive.between(lo, None if end is None else to_epoch(end), tags)
+    
+    def _unshadowed(self, archived: List[Event]) -> List[Event]:
+        # Pod bravom: arhivirani događaji čiji id nije i u radnom skupu
+        return [event for event in archived if event.id not in self._events]
+    
+    def _with_archived(self, singles: List[Event], archived: List[Event]) -> List[Event]:
+        archived = self._unshadowed(archived)
+        if not archived:
+            return singles
+        return list(merge(archived, singles, key=lambda x: x.epoch))
+    
+    def _find_archived(self, event_id: str, expected: Optional[Event] = None) -> Optional[Event]:
+        # Arhivirani događaj koji se briše ili izmenom vraća u radni skup;
+        # expected se poredi po sadržaju jer se mesec arhive mogao u
+        # međuvremenu ponovo pročitati
+        if self.archive is None:
+            return None
+        with self.store.locked():
+            event = self.archive.find(event_id)
+        if event is not None and expected is not None and (
+                event.to_dict() != getattr(expected, 'master', expected).to_dict()):
+            raise ConcurrentModificationError(f"Događaj {event_id} je u međuvremenu izmenjen")
+        return event
+    
+    def _queue_unarchive(self, event: Event) -> None:
+        # Pod bravom za pisanje, zajedno sa zapisom u žurnal
+        if self._writer is not None:
+            self._archive_removals.append(event)
+    
+    def _commit_unarchive(self, batch: Optional[CommitBatch], event: Event) -> None:
+        # Događaj se uklanja iz arhive tek kada je zapis o izmeni ili brisanju
+        # na disku: posle pada između ta dva koraka važi zapis iz žurnala
+        # (izmena zasenjuje arhivu), a drugi procesi ga ni u međuvremenu ne
+        # vide kao nestao. Upisuje se odmah i uz odloženi upis; ako upis ne
+        # uspe, uklanjanje čeka sledeći uspešan upis (_write_pending).
+        if self._writer is None:
+            if self._commit(batch):
+                self._remove_archived([event])
+            return
+        try:
+            self._writer.flush()
+        except Exception as e:
+            print(f"Greška pri čuvanju događaja: {e}")
+    
+    def _remove_archived(self, events: List[Event]) -> None:
+        if not events:
+            return
+        try:
+            with self.store.locked():
+                self.archive.remove(events)
+        except OSError as e:
+            metrics.ERRORS.inc(where="archive")
+            print(f"Greška pri uklanjanju događaja iz arhive: {e}")
+    
+    @metrics.timed("archive_seconds", "Prebacivanje starih događaja iz radnog skupa u arhivu")
+    def archive_old_events(self, days: Optional[int] = None, now: Optional[datetime] = None) -> int:
+        # Pojedinačni događaji koji su obavešteni i završeni pre više od days
+        # dana (podrazumevano archive_after_days) se upisuju u arhivu, a zatim
+        # brišu iz radnog skupa; vraća broj prebačenih
+        if self.archive is None:
+            return 0
+        days = self.archive_after_days if days is None else days
+        cutoff = to_epoch((now or datetime.now()) - timedelta(days=days))
+        with self._lock.read():
+            old = self._index_events[:bisect_left(self._index_times, cutoff)]
+            candidates = [event for event in old if event.notified and event.end_epoch < cutoff]
+        if not candidates:
+            return 0
+        try:
+            with self.store.locked():
+                self.archive.add(candidates)
+        except OSError as e:
+            metrics.ERRORS.inc(where="archive")
+            print(f"Greška pri arhiviranju događaja: {e}")
+            return 0
         
-        upcoming = []
-        for event in self.events:
-            if now <= event.date_time <= end_date:
-                upcoming.append(event)
+        moved, stale = [], []
+        with self._lock.write():
+            for event in candidates:
+                if self._events.get(event.id) is event:
+                    del self._events[event.id]
+                    moved.append(event)
+                else:
+                    stale.append(event)
+            bulk = len(moved) >= INDEX_MERGE_THRESHOLD
+            if bulk:
+                self._rebuild_index()
+            else:
+                for event in moved:
+                    self._index_remove(event)
+            batch = self._journal_many([{'op': 'delete', 'id': event.id, 'archived': True} for event in moved])
+        self._commit(batch)
+        if stale:
+            # Izmenjeni ili obrisani dok se arhiva upisivala: radni skup je merodavan
+            try:
+                with self.store.locked():
+                    self.archive.remove(stale)
+            except OSError as e:
+                metrics.ERRORS.inc(where="archive")
+                print(f"Greška pri arhiviranju događaja: {e}")
         
-        return sorted(upcoming, key=lambda x: x.date_time)
+        if bulk:
+            self._notify_listeners('reload', None)
+        else:
+            for event in moved:
+                self._notify_listeners('remove', event)
+        return len(moved)
+    
+    def _index_bounds(self, start: Optional[datetime], end: Optional[datetime]):
+        lo = 0 if start is None else bisect_left(self._index_times, to_epoch(start))
+        hi = len(self._index_times) if end is None else bisect_right(self._index_times, to_epoch(end))
+        return lo, max(lo, hi)
+    
+    def get_events_by_tags(self, any_of: Optional[Iterable[str]] = None,
+                           all_of: Optional[Iterable[str]] = None,
+                           none_of: Optional[Iterable[str]] = None,
+                           start: Optional[datetime] = None,
+                           end: Optional[datetime] = None,
+                           with_archive: bool = True) -> List[Event]:
+        # Kandidati se dobijaju iz invertovanog indeksa, pa cena zavisi od broja
+        # pogodaka; bez any_of/all_of polazi se od opsega datuma. U arhivi se
+        # meseci iz opsega filtriraju po koloni bitmaski tagova.
+        tags = (any_of, all_of, none_of)
+        archived = [event for event in (self._archived_between(start, end, tags) if with_archive else [])
+                    if self._tags_match(event, any_of, all_of, none_of)]
+        with self._lock.read():
+            candidates = self._tag_candidates(any_of, all_of)
+            excluded = set().union(*(self._tag_index.get(tag, ()) for tag in none_of or ()))
+            masters = [master for master in self._recurring.values()
+                       if self._tags_match(master, any_of, all_of, none_of)]
+        
+            if candidates is None:
+                singles = [event for event in self._single_between(start, end) if event.id not in excluded]
+            else:
+                singles = self._singles_among(candidates - excluded, start, end)
+            singles = self._with_archived(singles, archived)
+        return list(self._with_occurrences(singles, masters, start, end))
+    
+    def _singles_among(self, event_ids: Set[str], start: Optional[datetime],
+                       end: Optional[datetime]) -> List[Event]:
+        # Pojedinačni događaji iz skupa u opsegu, po datumu: za veliki skup se
+        # prolazi kroz opseg indeksa, a mali se sortira
+        if self._single_count(start, end) <= len(event_ids) * INDEX_SCAN_RATIO:
+            return [event for event in self._single_between(start, end) if event.id in event_ids]
+        lo = None if start is None else to_epoch(start)
+        hi = None if end is None else to_epoch(end)
+        singles = []
+        for event_id in event_ids:
+            event = self._events[event_id]
+            if event.recurrence is None and (lo is None or event.epoch >= lo) and (hi is None or event.epoch <= hi):
+                singles.append(event)
+        singles.sort(key=lambda x: x.epoch)
+        return singles
+    
+    def _tag_candidates(self, any_of: Optional[Iterable[str]],
+                        all_of: Optional[Iterable[str]]) -> Optional[Set[str]]:
+        candidates = None
+        if all_of:
+            sets = sorted((self._tag_index.get(tag, set()) for tag in set(all_of)), key=len)
+            candidates = set(sets[0]).intersection(*sets[1:])
+        if any_of:
+            union = set().union(*(self._tag_index.get(tag, ()) for tag in any_of))
+            candidates = union if candidates is None else candidates & union
+        return candidates
+    
+    # --- pretraga teksta ---
+    
+    def search(self, query: str, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, with_archive: bool = True) -> List[Event]:
+        # Događaji čiji naslov, opis ili lokacija sadrže sve reči upita, bilo
+        # gde u tekstu i kao početak reči ("sast" nalazi "Sastanak"), bez obzira
+        # na velika slova, dijakritike i pismo. Serije se šire na pojave u opsegu.
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # Arhiva nije u indeksu pretrage; njeni meseci iz opsega se pretražuju redom
+        archived = [event for event in (self._archived_between(start, end) if with_archive else [])
+                    if matches(terms, event_text(event))]
+        while True:
+            with self._lock.read():
+                if self._search is not None:
+                    found = self._search.lookup(terms)
+                    masters = [master for event_id, master in self._recurring.items() if event_id in found]
+                    singles = self._with_archived(self._singles_among(found, start, end), archived)
+                    break
+            # Prva pretraga (ili prva posle ponovnog učitavanja) pravi indeks
+            self.build_search_index()
+        return list(self._with_occurrences(singles, masters, start, end))
+    
+    def build_search_index(self) -> None:
+        # Indeks se gradi van brave, pa čitanja i izmene za to vreme ne čekaju;
+        # ako su se događaji u međuvremenu promenili, gradi se ponovo pod bravom.
+        # Grafički interfejs ovo zove unapred, čim korisnik krene na pretragu.
+        with self._search_build_lock:
+            with self._lock.read():
+                if self._search is not None:
+                    return
+                version = self._version
+                docs = [(event.id, event_text(event)) for event in self._events.values()]
+            index = self._new_search_index(docs)
+            with self._lock.write():
+                if self._search is None:
+                    if self._version != version:
+                        index = self._new_search_index(
+                            [(event.id, event_text(event)) for event in self._events.values()])
+                    self._search = index
+    
+    def _new_search_index(self, docs: List[Tuple[str, str]]) -> SearchIndex:
+        # Sačuvan indeks važi samo ako mu otisak odgovara trenutnim događajima
+        index = None
+        if self.search_file is not None:
+            index = SearchIndex.load(self.search_file, fingerprint(docs))
+        if index is None:
+            index = SearchIndex()
+            index.add_many(docs)
+        return index
+    
+    def _save_search_index(self) -> None:
+        with self._lock.read():
+            index = self._search
+            if self.search_file is None or index is None or not index.dirty:
+                return
+            try:
+                index.save(self.search_file)
+            except OSError as e:
+                print(f"Greška pri čuvanju indeksa pretrage: {e}")
+    
+    # --- preklapanja i slobodni termini ---
+    
+    def get_overlapping(self, start: datetime, end: datetime, location: Optional[str] = None,
+                        exclude_id: Optional[str] = None) -> List[Event]:
+        # Događaji koji zauzimaju bar deo [start, end); za start == end to su
+        # događaji u toku u tom trenutku. exclude_id izostavlja seriju koja se menja.
+        lo = to_epoch(start)
+        hi = max(to_epoch(end), lo + 1)
+        return [event for event in self._busy_between(start, end, location)
+                if event.epoch < hi and event.series_id != exclude_id]
+    
+    def find_conflicts(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       location: Optional[str] = None) -> List[Tuple[Event, Event]]:
+        # Sweep line: događaji stižu po početku, a u aktivnom skupu (min-heap po
+        # kraju) su samo oni koji još traju, pa je svaki novi u konfliktu tačno
+        # sa aktivnima. Cena je O((n + k) log n) umesto poređenja svih parova.
+        stop = None if end is None else to_epoch(end)
+        conflicts = []
+        active: List[Tuple[int, int, Event]] = []
+        for seq, event in enumerate(self._busy_between(start, end, location)):
+            if stop is not None and event.epoch >= stop:
+                break
+            while active and active[0][0] <= event.epoch:
+                heappop(active)
+            conflicts.extend((other, event) for _, _, other in active)
+            heappush(active, (event.end_epoch, seq, event))
+        return conflicts
+    
+    def find_free_slots(self, start: datetime, end: datetime, duration: timedelta, limit: int = 5,
+                        location: Optional[str] = None) -> List[Tuple[datetime, datetime]]:
+        # Prvih limit slobodnih prozora u [start, end) dugih bar duration; zauzeti
+        # intervali se spajaju u istom prolazu kroz sortirane događaje
+        need = max(1, duration // _MICROSECOND)
+        cursor, stop = to_epoch(start), to_epoch(end)
+        slots = []
+        for event in self._busy_between(start, end, location):
+            if event.epoch >= stop:
+                break
+            if event.epoch - cursor >= need:
+                slots.append((from_epoch(cursor), event.date_time))
+                if len(slots) >= limit:
+                    return slots
+            cursor = max(cursor, event.end_epoch)
+        if stop - cursor >= need:
+            slots.append((from_epoch(cursor), end))
+        return slots[:limit]
+    
+    def _busy_between(self, start: Optional[datetime], end: Optional[datetime],
+                      location: Optional[str]) -> Iterator[Event]:
+        # Događaji sa trajanjem, po početku, koji se završavaju posle start a
+        # počinju najkasnije u end
+        lo = None if start is None else start - timedelta(minutes=self._max_duration_minutes())
+        begin = None if start is None else to_epoch(start)
+        for event in self.iter_events_between(lo, end):
+            if (event.duration_minutes > 0 and (begin is None or event.end_epoch > begin)
+                    and (location is None or event.location == location)):
+                yield event
+    
+    def _max_duration_minutes(self) -> int:
+        return self._max_duration
+    
+    def _index_add(self, event: Event) -> None:
+        self._max_duration = max(self._max_duration, event.duration_minutes)
+        if self._search is not None:
+            self._search.add(event.id, event_text(event))
+        for tag in event.tags:
+            self._tag_index.setdefault(tag, set()).add(event.id)
+        if event.recurrence is not None:
+            self._recurring[event.id] = event
+            return
+        pos = bisect_right(self._index_times, event.epoch)
+        self._index_times.insert(pos, event.epoch)
+        self._index_events.insert(pos, event)
+    
+    def _index_add_many(self, events: List[Event]) -> None:
+        if len(events) < INDEX_MERGE_THRESHOLD:
+            for event in events:
+                self._index_add(event)
+            return
+        # Velika serija (uvoz) se spaja sa indeksom u jednom prolazu: delovi
+        # postojećih listi između novih događaja se kopiraju isečcima, umesto
+        # da svako umetanje pomera ceo ostatak liste
+        if self._search is not None:
+            self._search.add_many((event.id, event_text(event)) for event in events)
+        singles = []
+        for event in events:
+            self._max_duration = max(self._max_duration, event.duration_minutes)
+            for tag in event.tags:
+                self._tag_index.setdefault(tag, set()).add(event.id)
+            if event.recurrence is not None:
+                self._recurring[event.id] = event
+            else:
+                singles.append(event)
+        times, indexed = self._index_times, self._index_events
+        merged_times: List[int] = []
+        merged_events: List[Event] = []
+        prev = 0
+        for event in sorted(singles, key=lambda x: x.epoch):
+            epoch = event.epoch
+            pos = bisect_right(times, epoch, prev)
+            merged_times += times[prev:pos]
+            merged_events += indexed[prev:pos]
+            merged_times.append(epoch)
+            merged_events.append(event)
+            prev = pos
+        merged_times += times[prev:]
+        merged_events += indexed[prev:]
+        self._index_times, self._index_events = merged_times, merged_events
+    
+    def _index_remove(self, event: Event) -> None:
+        if self._search is not None:
+            self._search.remove(event.id, event_text(event))
+        for tag in event.tags:
+            ids = self._tag_index.get(tag)
+            if ids is not None:
+                ids.discard(event.id)
+                if not ids:
+                    del self._tag_index[tag]
+        if self._recurring.pop(event.id, None) is not None:
+            return
+        pos = bisect_left(self._index_times, event.epoch)
+        while pos < len(self._index_times) and self._index_times[pos] == event.epoch:
+            if self._index_events[pos].id == event.id:
+                del self._index_times[pos]
+                del self._index_events[pos]
+                return
+            pos += 1
+    
+    def _rebuild_index(self) -> None:
+        self._recurring = {event.id: event for event in self._events.values()
+                           if event.recurrence is not None}
+        self._index_events = sorted((event for event in self._events.values() if event.recurrence is None),
+                                    key=lambda x: x.epoch)
+        self._index_times = [event.epoch for event in self._index_events]
+        self._max_duration = max((event.duration_minutes for event in self._events.values()), default=0)
+        # Indeks pretrage se ne pravi unapred; prva sledeća pretraga ga učitava ili gradi
+        self._search = None
+        self._tag_index = {}
+        for event in self._events.values():
+            for tag in event.tags:
+                self._tag_index.setdefault(tag, set()).add(event.id)
     
     def get_events_needing_notification(self) -> List[Event]:
-        return [event for event in self.events if event.is_notification_due()]
+        now = datetime.now()
+        with self._lock.read():
+            due = [event for event in self._index_events if event.is_notification_due(now)]
+            return due + self._due_occurrences(now)
+    
+    def get_pending_notifications(self) -> List[Event]:
+        with self._lock.read():
+            pending = [event for event in self._index_events if not event.notified]
+            return pending + self._pending_occurrences()
+    
+    def _due_occurrences(self, now: datetime) -> List[Event]:
+        return [occurrence for occurrence in self._pending_occurrences(now)
+                if occurrence.is_notification_due(now)]
+    
+    def _pending_occurrences(self, now: Optional[datetime] = None) -> List[Event]:
+        occurrences = (master.pending_occurrence(now) for master in self._recurring_masters())
+        return [occurrence for occurrence in occurrences if occurrence is not None]
     
     def mark_event_notified(self, event: Event) -> None:
-        event.notified = True
-        self.save_events()
+        self.mark_events_notified([event])
+    
+    def mark_events_notified(self, events: Iterable[Event]) -> None:
+        # Cela grupa obaveštenja se beleži jednim upisom u žurnal. Događaj je od
+        # isporuke možda izmenjen (pomeren termin); tada se nova verzija ne
+        # označava, jer njeno obaveštenje još nije poslato.
+        records, marked = [], []
+        with self._lock.write():
+            for event in events:
+                if isinstance(event, Occurrence):
+                    # Za seriju se pamti samo skup obaveštenih pojava
+                    master = self._events.get(event.series_id)
+                    current = None if master is None else event.in_series(master)
+                    if current is None:
+                        continue
+                    current.notified = True
+                    fields = {'notified_occurrences': master.to_dict().get('notified_occurrences', [])}
+                    records.append({'op': 'patch', 'id': event.series_id, 'fields': fields})
+                else:
+                    current = self._events.get(event.id)
+                    if current is None or current is not event and (
+                            current.recurrence is not None
+                            or current.notification_epoch() != event.notification_epoch()):
+                        continue
+                    current.notified = True
+                    records.append({'op': 'patch', 'id': event.id, 'fields': {'notified': True}})
+                marked.append(current)
+            batch = self._journal_many(records) if records else None
+        self._commit(batch)
+        for event in marked:
+            self._notify_listeners('notified', event)
+    
+    def _journal(self, record: Dict) -> Optional[CommitBatch]:
+        return self._journal_many([record])
     
+    def _journal_many(self, records: List[Dict]) -> Optional[CommitBatch]:
+        # Poziva se pod bravom za pisanje: zapis se samo stavlja u red, a na
+        # disk ide u _commit, posle otpuštanja brave
+        self._version += 1
+        try:
+            return self.store.enqueue(records)
+        except Exception as e:
+            metrics.ERRORS.inc(where="commit")
+            print(f"Greška pri čuvanju događaja: {e}")
+            return None
+    
+    @metrics.timed("journal_commit_seconds", "Upis izmena u žurnal (sa čekanjem na grupni upis)")
+    def _commit(self, batch: Optional[CommitBatch]) -> bool:
+        # Van brave za pisanje: upis prvo primenjuje tuđe izmene (_apply_foreign),
+        # a za to mu treba ista brava. Vraća False ako upis nije uspeo.
+        if self._writer is not None:
+            if batch is not None:
+                self._writer.schedule()
+            return True
+        try:
+            self.store.commit(batch)
+        except Exception as e:
+            metrics.ERRORS.inc(where="commit")
+            print(f"Greška pri čuvanju događaja: {e}")
+            return False
+        try:
+            if self.store.should_compact(len(self._events)):
+                self.store.compact_async(self._snapshot)
+        except Exception as e:
+            metrics.ERRORS.inc(where="commit")
+            print(f"Greška pri sažimanju žurnala: {e}")
+        return True
+    
+    @metrics.timed("write_behind_seconds", "Odloženi upis reda izmena u žurnal")
+    def _write_pending(self) -> None:
+        # Iz niti odloženog upisa ili iz flush(). Uklanjanja iz arhive zabeležena
+        # pre upisa imaju svoj zapis u redu, pa su posle uspešnog upisa bezbedna.
+        with self._lock.write():
+            removals, self._archive_removals = self._archive_removals, []
+        try:
+            try:
+                self.store.flush()
+            except Exception:
+                with self._lock.write():
+                    self._archive_removals[:0] = removals
+                raise
+            self._remove_archived(removals)
+            if self.store.should_compact(len(self._events)):
+                self.store.compact_async(self._snapshot)
+        except Exception:
+            metrics.ERRORS.inc(where="write_behind")
+            raise
+    
+    def flush(self) -> None:
+        # Granica trajnosti: posle povratka bez izuzetka sve dosadašnje izmene
+        # su u žurnalu. Bez odloženog upisa izmene su već upisane.
+        if self._writer is not None:
+            self._writer.flush()
+    
+    @property
+    def persist_error(self) -> Optional[str]:
+        return None if self._writer is None else self._writer.error
+    
+    def _snapshot(self) -> List:
+        with self._lock.read():
+            if self.store.snapshot_format == "columnar":
+                return [event.to_row() for event in self._events.values()]
+            return [event.to_dict() for event in self._events.values()]
+    
+    @metrics.timed("save_events_seconds", "Upis celog snapshot-a događaja")
     def save_events(self) -> None:
+        # Snapshot se pravi tek pod bravom fajla, jer se žurnal odmah zatim briše
         try:
-            data = [event.to_dict() for event in self.events]
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            self.store.write_snapshot(self._snapshot)
         except Exception as e:
+            metrics.ERRORS.inc(where="save_events")
             print(f"Greška pri čuvanju događaja: {e}")
     
+    @metrics.timed("load_events_seconds", "Učitavanje događaja sa diska sa izgradnjom indeksa")
     def load_events(self) -> None:
-        if not os.path.exists(self.data_file):
+        # Brava fajla pre brave za pisanje, istim redom kao pri upisu
+        try:
+            with self.store.locked():
+                missing_ids = self._load()
+        except Exception as e:
+            metrics.ERRORS.inc(where="load_events")
+            print(f"Greška pri učitavanju događaja: {e}")
             return
         
+        # Stari fajlovi nemaju id, prekinuta kompakcija ostavlja segment, a snapshot
+        # može biti u drugom formatu od izabranog; u svim slučajevima se odmah prepisuje
+        if self.store.needs_rewrite() or missing_ids:
+            self.save_events()
+    
+    def _load(self) -> bool:
+        # Vraća True ako snapshot treba odmah prepisati (zapisi bez id-a)
+        with self._lock.write():
+            self._version += 1
+            try:
+                snapshot, journal = self.store.load_parts()
+                if isinstance(snapshot, ColumnarSnapshot):
+                    try:
+                        events = [Event.from_row(row) for row in snapshot.rows()]
+                    finally:
+                        snapshot.close()
+                    missing_ids = False
+                else:
+                    events = [Event.from_dict(item) for item in snapshot]
+                    missing_ids = any('id' not in item for item in snapshot)
+                self._events = {event.id: event for event in events}
+                # Žurnal se primenjuje kao tuđe izmene, direktno nad događajima
+                for record in journal:
+                    self._apply_record(record, False)
+                self._rebuild_index()
+                return missing_ids
+            except Exception as e:
+                metrics.ERRORS.inc(where="load_events")
+                print(f"Greška pri učitavanju događaja: {e}")
+                self._events = {}
+                self._rebuild_index()
+                return False
+    
+    def poll_changes(self) -> bool:
+        # Primenjuje izmene koje su u međuvremenu upisali drugi procesi; ako
+        # ih nije bilo, košta samo jedan stat žurnala
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            self.events = [Event.from_dict(item) for item in data]
+            return self.store.poll()
         except Exception as e:
-            print(f"Greška pri učitavanju događaja: {e}")
-            self.events = []
+            metrics.ERRORS.inc(where="poll_changes")
+            print(f"Greška pri proveri izmena: {e}")
+            return False
+    
+    def _apply_foreign(self, records: Optional[List[Dict]]) -> None:
+        # Poziva ga skladište pod bravom fajla. Sopstveni zapisi koji još čekaju
+        # upis idu u žurnal posle ovih, pa za isti događaj pobeđuju: tuđi put i
+        # delete se preskaču, a posle tuđe izmene ponovo se primeni naš patch.
+        if records is None:
+            with self._lock.write():
+                self._load()
+                for own in self.store.pending_records():
+                    self._apply_record(own, True)
+            self._notify_listeners('reload', None)
+            return
+        
+        changes = []
+        with self._lock.write():
+            pending: Dict[str, List[Dict]] = {}
+            for record in self.store.pending_records():
+                pending.setdefault(record_id(record), []).append(record)
+            # Veliki paket (tuđi uvoz) ide bez pojedinačnog ažuriranja indeksa
+            bulk = len(records) >= INDEX_MERGE_THRESHOLD
+            for record in records:
+                ours = pending.get(record_id(record), ())
+                if any(own.get('op') != 'patch' for own in ours):
+                    continue
+                change = self._apply_record(record, not bulk)
+                for own in ours:
+                    self._apply_record(own, not bulk)
+                if change is not None:
+                    changes.append(change)
+            if bulk:
+                self._rebuild_index()
+            self._version += 1
+        
+        if bulk:
+            self._notify_listeners('reload', None)
+            return
+        for op, event in changes:
+            self._notify_listeners(op, event)
+    
+    def _apply_record(self, record: Dict, indexed: bool) -> Optional[Tuple[str, Event]]:
+        op = record.get('op')
+        if op == 'delete':
+            event = self._events.pop(record['id'], None)
+            if event is None:
+                return None
+            if indexed:
+                self._index_remove(event)
+            return 'remove', event
+        if op == 'patch':
+            current = self._events.get(record['id'])
+            if current is None:
+                return None
+            fields = record['fields']
+            if set(fields) <= {'notified', 'notified_occurrences'}:
+                # Oznake obaveštenja se menjaju na mestu, kao i lokalno
+                if 'notified' in fields:
+                    current.notified = fields['notified']
+                if 'notified_occurrences' in fields:
+                    current.notified_occurrences = {
+                        to_epoch(datetime.fromisoformat(value))
+                        for value in fields['notified_occurrences']} or None
+                # Za seriju se menja sledeća pojava koja čeka obaveštenje
+                return ('update' if current.recurrence is not None else 'notified'), current
+            event = Event.from_dict({**current.to_dict(), **fields})
+        elif op == 'put':
+            event = Event.from_dict(record['event'])
+        else:
+            return None
+        
+        old_event = self._events.get(event.id)
+        if old_event is not None and indexed:
+            self._index_remove(old_event)
+        self._events[event.id] = event
+        if indexed:
+            self._index_add(event)
+        return ('update' if old_event is not None else 'add'), event
+    
+    def close(self) -> None:
+        # Ono što je ostalo u redu upisuje store.close(); uz odloženi upis to
+        # radi _write_pending, da bi se završila i uklanjanja iz arhive
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                self._write_pending()
+            except Exception as e:
+                print(f"Greška pri čuvanju događaja: {e}")
+        self.store.close()
+        self._save_search_index()
+
+
+def record_id(record: Dict) -> str:
+    return record['event']['id'] if record.get('op') == 'put' else record.get('id')
+
+
+def create_event_manager(backend: Optional[str] = None, data_file: Optional[str] = None,
+                         persist_search: bool = False, snapshot_format: Optional[str] = None,
+                         write_delay: Optional[float] = None) -> EventManager:
+    # Backend se bira argumentom ili promenljivom okruženja KANCELARIJE_BACKEND.
+    # persist_search, arhiva i format snapshot-a važe samo za JSON; SQLite indeks
+    # pretrage čuva u bazi, a upiti po datumu već ne zavise od broja starih događaja.
+    # KANCELARIJE_ARHIVA_DANA menja granicu arhiviranja (0 je isključuje), a
+    # KANCELARIJE_SNAPSHOT=columnar bira binarni snapshot po kolonama.
+    # write_delay (odložen upis) važi samo za JSON; SQLite upisuje odmah.
+    backend = backend or os.environ.get("KANCELARIJE_BACKEND", "json")
+    if backend == "json":
+        archive_days = int(os.environ.get("KANCELARIJE_ARHIVA_DANA", ARCHIVE_AFTER_DAYS)) or None
+        return EventManager(data_file or "dogadjaji.json", persist_search=persist_search,
+                            archive_after_days=archive_days,
+                            snapshot_format=snapshot_format or os.environ.get("KANCELARIJE_SNAPSHOT", "json"),
+                            write_delay=write_delay)
+    if backend == "sqlite":
+        from sqlite_event_manager import SQLiteEventManager
+        # Podrazumevana baza se pri prvom otvaranju puni iz podrazumevanog JSON fajla
+        migrate_from = "dogadjaji.json" if data_file is None else None
+        return SQLiteEventManager(data_file or "dogadjaji.db", migrate_from=migrate_from)
+    raise ValueError(f"Nepoznat backend: {backend}")
@@ -2,24 +2,118 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import time
-from datetime import datetime, timedelta
-from event_manager import EventManager
+from bisect import bisect_left
+from datetime import datetime, timedelta, time as dt_time
+import metrics
+from event_manager import ConcurrentModificationError, Event, create_event_manager
 from notification_service import NotificationService
 from add_event_dialog import AddEventDialog
+from write_behind import WRITE_DELAY_SECONDS
+
+# Iznad ovog broja događaja lista prelazi u virtuelni režim: u Treeview-u su
+# samo redovi vidljivog prozora, a ostali se dobavljaju pri skrolovanju
+VIRTUAL_THRESHOLD = 1000
+VIRTUAL_OVERSCAN = 5
+# Koliko često lista proverava da li su se događaji promenili (drugi proces
+# nad istim fajlom, oznake obaveštenja iz pozadine)
+CHANGE_POLL_MS = 1000
+# Pretraga se pokreće tek kada kucanje zastane, ne posle svakog slova
+SEARCH_DELAY_MS = 250
+# Koliko često prozor proverava da li je pozadinsko učitavanje završeno
+LOAD_POLL_MS = 50
+LOADING_ROW = "ucitavanje"
 
 class SmartOfficePlannerApp:
-    def __init__(self):
+    def __init__(self, event_manager=None, monitor=True):
+        # Merenja (benchmark.py suite) prosleđuju svoje skladište i rade bez servisa obaveštenja
         self.root = tk.Tk()
         self.root.title("Pametne Kancelarije")
         self.root.geometry("900x700")
         self.root.minsize(800, 600)
-        self.event_manager = EventManager()
-        self.notification_service = NotificationService(self.event_manager)
-        self.notification_service.start_monitoring()
+        self.monitor = monitor
+        self.event_manager = None
+        self.notification_service = None
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        if event_manager is not None:
+            self.on_loaded(self.open_storage(event_manager))
+        else:
+            # Prozor se prikazuje odmah, a događaji se učitavaju u pozadini
+            self.start_loading()
+    
+    def open_storage(self, event_manager=None):
+        # Učitavanje događaja i raspoređivanje obaveštenja; ne dira prozor, pa
+        # može da se izvrši u pozadinskoj niti
+        if event_manager is None:
+            # Izmene se upisuju u pozadini, da klik ne bi čekao na disk
+            event_manager = create_event_manager(write_delay=WRITE_DELAY_SECONDS)
+        # Učitavanje ne arhivira; program koji ostaje otvoren to radi sam
+        event_manager.archive_old_events()
+        notification_service = NotificationService(event_manager)
+        if self.monitor:
+            notification_service.start_monitoring()
+        return event_manager, notification_service
+    
+    def start_loading(self):
+        self.load_result = None
+        self.load_started = time.perf_counter()
+        self.set_loading(True)
+        threading.Thread(target=self.load_in_background, daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.check_loaded)
+    
+    def load_in_background(self):
+        # Tkinter se ne poziva iz ove niti; rezultat preuzima check_loaded
+        try:
+            self.load_result = self.open_storage()
+        except Exception as e:
+            self.load_result = e
+    
+    def check_loaded(self):
+        result = self.load_result
+        if result is None:
+            status = f"Učitavanje događaja... {time.perf_counter() - self.load_started:.0f} s"
+            if self.status_var.get() != status:
+                self.status_var.set(status)
+            self.root.after(LOAD_POLL_MS, self.check_loaded)
+        elif isinstance(result, Exception):
+            self.loading_bar.stop()
+            self.status_var.set("Događaji nisu učitani")
+            messagebox.showerror("Greška", f"Neuspešno učitavanje događaja:\n{result}")
+        else:
+            self.on_loaded(result)
+    
+    def on_loaded(self, result):
+        self.event_manager, self.notification_service = result
+        self.shown_persist_error = None
+        self.set_loading(False)
         self.refresh_event_list()
         self.start_auto_refresh()
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.after(CHANGE_POLL_MS, self.watch_changes)
+    
+    def set_loading(self, loading):
+        # Dok se događaji učitavaju, kontrole su onemogućene, a u listi je
+        # samo red sa porukom i traka napretka
+        state = ["disabled"] if loading else ["!disabled"]
+        pending = [self.control_frame]
+        while pending:
+            widget = pending.pop()
+            pending.extend(widget.winfo_children())
+            if isinstance(widget, (ttk.Button, ttk.Radiobutton, ttk.Checkbutton)):
+                widget.state(state)
+        self.search_entry.state(state)
+        self.tag_listbox.configure(state=tk.DISABLED if loading else tk.NORMAL)
+        if loading:
+            self.event_tree.configure(selectmode="none")
+            self.event_tree.insert("", tk.END, iid=LOADING_ROW,
+                                   values=("Učitavanje događaja...", "", "", "", ""))
+            self.loading_bar.grid()
+            self.loading_bar.start(15)
+        else:
+            self.event_tree.configure(selectmode="extended")
+            if self.event_tree.exists(LOADING_ROW):
+                self.event_tree.delete(LOADING_ROW)
+            self.loading_bar.stop()
+            self.loading_bar.grid_remove()
     
     def create_widgets(self):
         main_frame = ttk.Frame(self.root, padding="10")
@@ -32,6 +126,7 @@ class SmartOfficePlannerApp:
         title_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
         control_frame = ttk.LabelFrame(main_frame, text="Kontrole", padding="10")
         control_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 10))
+        self.control_frame = control_frame
         ttk.Button(control_frame, text="Dodaj novi događaj", 
                   command=self.add_event, width=20).grid(row=0, column=0, pady=(0, 10), sticky=tk.W)
         ttk.Button(control_frame, text="Izmeni izabrani", 
@@ -49,21 +144,54 @@ class SmartOfficePlannerApp:
         filter_frame = ttk.Frame(control_frame)
         filter_frame.grid(row=8, column=0, sticky=tk.W, pady=(0, 10))
         ttk.Radiobutton(filter_frame, text="Sve", variable=self.filter_var, 
-                       value="all", command=self.refresh_event_list).pack(anchor=tk.W)
+                       value="all", command=self.on_filter_changed).pack(anchor=tk.W)
         ttk.Radiobutton(filter_frame, text="Danas", variable=self.filter_var, 
-                       value="today", command=self.refresh_event_list).pack(anchor=tk.W)
+                       value="today", command=self.on_filter_changed).pack(anchor=tk.W)
         ttk.Radiobutton(filter_frame, text="Ova nedelja", variable=self.filter_var, 
-                       value="week", command=self.refresh_event_list).pack(anchor=tk.W)
+                       value="week", command=self.on_filter_changed).pack(anchor=tk.W)
         ttk.Radiobutton(filter_frame, text="Predstojeći", variable=self.filter_var, 
-                       value="upcoming", command=self.refresh_event_list).pack(anchor=tk.W)
+                       value="upcoming", command=self.on_filter_changed).pack(anchor=tk.W)
+        # Stari događaji su u arhivi i čitaju se sa diska samo kada se ovo uključi
+        self.show_archive = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filter_frame, text="Sa arhivom", variable=self.show_archive,
+                        command=self.on_filter_changed).pack(anchor=tk.W, pady=(5, 0))
+        ttk.Label(control_frame, text="Tagovi:").grid(row=9, column=0, sticky=tk.W, pady=(0, 5))
+        tag_filter_frame = ttk.Frame(control_frame)
+        tag_filter_frame.grid(row=10, column=0, sticky=(tk.W, tk.E))
+        self.tag_listbox = tk.Listbox(tag_filter_frame, selectmode=tk.MULTIPLE, 
+                                      exportselection=False, height=6, width=18)
+        for tag in Event.AVAILABLE_TAGS:
+            self.tag_listbox.insert(tk.END, tag)
+        tag_scrollbar = ttk.Scrollbar(tag_filter_frame, orient=tk.VERTICAL, command=self.tag_listbox.yview)
+        self.tag_listbox.configure(yscrollcommand=tag_scrollbar.set)
+        self.tag_listbox.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        tag_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.tag_listbox.bind("<<ListboxSelect>>", lambda e: self.on_filter_changed())
+        self.tag_match_all = tk.BooleanVar(value=False)
+        ttk.Checkbutton(control_frame, text="Svi izabrani tagovi", variable=self.tag_match_all,
+                        command=self.on_filter_changed).grid(row=11, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Button(control_frame, text="Poništi tagove", command=self.clear_tag_filter, 
+                  width=20).grid(row=12, column=0, pady=(5, 0), sticky=tk.W)
         self.status_var = tk.StringVar(value="Spreman")
         status_label = ttk.Label(control_frame, textvariable=self.status_var, 
                                 font=("Arial", 9))
-        status_label.grid(row=9, column=0, sticky=tk.W, pady=(20, 0))
+        status_label.grid(row=13, column=0, sticky=tk.W, pady=(20, 0))
         list_frame = ttk.LabelFrame(main_frame, text="Događaji", padding="10")
         list_frame.grid(row=1, column=1, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         list_frame.columnconfigure(0, weight=1)
-        list_frame.rowconfigure(0, weight=1)
+        list_frame.rowconfigure(1, weight=1)
+        search_frame = ttk.Frame(list_frame)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        search_frame.columnconfigure(1, weight=1)
+        ttk.Label(search_frame, text="Pretraga:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_job = None
+        self.filtered_cache = None
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var)
+        self.search_entry.grid(row=0, column=1, sticky=(tk.W, tk.E))
+        self.search_entry.bind("<Escape>", lambda e: self.search_var.set(""))
+        self.search_entry.bind("<FocusIn>", lambda e: self.on_search_focus())
+        self.search_var.trace_add("write", lambda *args: self.on_search_changed())
         columns = ("Naslov", "Tagovi", "Datum i vreme", "Vreme do", "Status")
         self.event_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=20)
         self.event_tree.heading("Naslov", text="Naslov događaja")
@@ -76,13 +204,31 @@ class SmartOfficePlannerApp:
         self.event_tree.column("Datum i vreme", width=150, minwidth=120)
         self.event_tree.column("Vreme do", width=120, minwidth=100)
         self.event_tree.column("Status", width=100, minwidth=80)
-        v_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.event_tree.yview)
+        self.v_scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.on_vertical_scroll)
         h_scrollbar = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL, command=self.event_tree.xview)
-        self.event_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-        self.event_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        v_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        h_scrollbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.event_tree.configure(yscrollcommand=self.on_tree_yscroll, xscrollcommand=h_scrollbar.set)
+        self.event_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.v_scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        h_scrollbar.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.loading_bar = ttk.Progressbar(list_frame, mode="indeterminate")
+        self.loading_bar.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.loading_bar.grid_remove()
+        self.event_tree.bind("<MouseWheel>", lambda e: self.on_mouse_wheel(-1 if e.delta > 0 else 1))
+        self.event_tree.bind("<Button-4>", lambda e: self.on_mouse_wheel(-1))
+        self.event_tree.bind("<Button-5>", lambda e: self.on_mouse_wheel(1))
+        self.event_tree.bind("<Configure>", lambda e: self.virtual_mode and self.refresh_event_list())
         self.event_tree.bind("<Double-1>", lambda e: self.edit_event())
+        self.event_tree.tag_configure("overdue", background="#ffebee", foreground="#c62828")
+        self.event_tree.tag_configure("due", background="#fff3e0", foreground="#ef6c00")
+        self.event_tree.tag_configure("notified", background="#e8f5e8", foreground="#2e7d32")
+        self.event_tree.tag_configure("scheduled", background="white", foreground="black")
+        # Prikazani redovi: id događaja -> (vrednosti, tagovi) i njihov redosled
+        self.rows = {}
+        self.row_order = []
+        self.virtual_mode = False
+        self.view_offset = 0
+        self.total_events = 0
+        self.selected_id = None
         details_frame = ttk.LabelFrame(main_frame, text="Detalji događaja", padding="10")
         details_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
         details_frame.columnconfigure(0, weight=1)
@@ -96,7 +242,7 @@ class SmartOfficePlannerApp:
         self.event_tree.bind("<<TreeviewSelect>>", self.on_event_select)
     
     def add_event(self):
-        dialog = AddEventDialog(self.root)
+        dialog = AddEventDialog(self.root, event_manager=self.event_manager)
         event = dialog.show()
         
         if event:
@@ -105,109 +251,264 @@ class SmartOfficePlannerApp:
             self.status_var.set(f"Dodat događaj: {event.title}")
     
     def edit_event(self):
-        selection = self.event_tree.selection()
-        if not selection:
+        event = self.get_selected_event()
+        if not event:
             messagebox.showwarning("Nema izbora", "Molimo izaberite događaj za izmenu.")
             return
-        item = selection[0]
-        event_index = self.event_tree.index(item)
-        events = self.get_filtered_events()
         
-        if event_index < len(events):
-            event = events[event_index]
-            dialog = AddEventDialog(self.root, event)
-            updated_event = dialog.show()
-            
-            if updated_event:
-                # Pronalazi događaj u potpunoj listi i ažurira ga
-                for i, e in enumerate(self.event_manager.events):
-                    if e is event:
-                        self.event_manager.events[i] = updated_event
-                        self.event_manager.save_events()
-                        break
-                
-                self.refresh_event_list()
+        # Pojava ponavljajućeg događaja menja celu seriju
+        event = self.event_manager.get_by_id(event.series_id) or event
+        dialog = AddEventDialog(self.root, event, event_manager=self.event_manager)
+        updated_event = dialog.show()
+        
+        if updated_event:
+            try:
+                updated = self.event_manager.update_event(event.id, updated_event, expected=event)
+            except ConcurrentModificationError:
+                # Neko drugi je izmenio isti događaj dok je dijalog bio otvoren
+                if not messagebox.askyesno("Događaj je izmenjen", 
+                                           f"Događaj '{event.title}' je u međuvremenu izmenjen na drugom mestu.\n\n"
+                                           f"Da li želite da ga zamenite svojom izmenom?"):
+                    self.refresh_event_list()
+                    return
+                updated = self.event_manager.update_event(event.id, updated_event)
+            self.refresh_event_list()
+            if updated:
                 self.status_var.set(f"Ažuriran događaj: {updated_event.title}")
+            else:
+                messagebox.showwarning("Događaj ne postoji", 
+                                       f"Događaj '{event.title}' je u međuvremenu obrisan.")
     
     def delete_event(self):
-        selection = self.event_tree.selection()
-        if not selection:
+        event = self.get_selected_event()
+        if not event:
             messagebox.showwarning("Nema izbora", "Molimo izaberite događaj za brisanje.")
             return
-        item = selection[0]
-        event_index = self.event_tree.index(item)
-        events = self.get_filtered_events()
         
-        if event_index < len(events):
-            event = events[event_index]
-            
+        if event.id != event.series_id:
+            result = messagebox.askyesnocancel("Potvrdi brisanje", 
+                                             f"Događaj '{event.title}' se ponavlja. Da li želite da obrišete "
+                                             f"samo ovu pojavu?\n\nDa - samo ova pojava\nNe - cela serija")
+            if result is not None:
+                self.event_manager.remove_by_id(event.id if result else event.series_id)
+                self.refresh_event_list()
+                self.status_var.set(f"Obrisan događaj: {event.title}")
+        else:
             result = messagebox.askyesno("Potvrdi brisanje", 
                                        f"Da li ste sigurni da želite da obrišete događaj '{event.title}'?")
             if result:
-                # Pronalazi i uklanja događaj iz potpune liste
-                for i, e in enumerate(self.event_manager.events):
-                    if e is event:
-                        self.event_manager.remove_event(i)
-                        break
-                
+                self.event_manager.remove_by_id(event.id)
                 self.refresh_event_list()
                 self.status_var.set(f"Obrisan događaj: {event.title}")
     
-    def get_filtered_events(self):
+    def get_selected_event(self):
+        # U virtuelnom režimu izabrani red može biti van prikazanog prozora
+        selection = self.event_tree.selection()
+        event_id = selection[0] if selection else self.selected_id
+        return self.event_manager.get_by_id(event_id) if event_id else None
+    
+    def get_filter_range(self):
         filter_value = self.filter_var.get()
+        now = datetime.now()
         
-        if filter_value == "all":
-            return self.event_manager.get_events()
-        elif filter_value == "today":
-            today = datetime.now().date()
-            return [e for e in self.event_manager.get_events() 
-                   if e.date_time.date() == today]
+        if filter_value == "today":
+            today = now.date()
+            return datetime.combine(today, dt_time.min), datetime.combine(today, dt_time.max)
         elif filter_value == "week":
-            return self.event_manager.get_upcoming_events(7)
+            return now, now + timedelta(days=7)
         elif filter_value == "upcoming":
-            return [e for e in self.event_manager.get_events() 
-                   if e.date_time >= datetime.now()]
+            return now, None
         
-        return self.event_manager.get_events()
+        return None, None
+    
+    def get_selected_tags(self):
+        return [self.tag_listbox.get(i) for i in self.tag_listbox.curselection()]
+    
+    def clear_tag_filter(self):
+        self.tag_listbox.selection_clear(0, tk.END)
+        self.on_filter_changed()
+    
+    def get_filtered_events(self):
+        # Pogoci se pamte dok se ne promene filter, događaji ili minut (opsezi
+        # zavise od trenutnog vremena), pa skrolovanje ne ponavlja pretragu
+        key = (self.filter_var.get(), self.show_archive.get(), tuple(self.get_selected_tags()),
+               self.tag_match_all.get(), self.search_var.get().strip(), self.event_manager.version, int(time.time() // 60))
+        if self.filtered_cache is None or self.filtered_cache[0] != key:
+            self.filtered_cache = (key, self.find_filtered_events())
+        return self.filtered_cache[1]
     
+    def find_filtered_events(self):
+        start, end = self.get_filter_range()
+        tags = self.get_selected_tags()
+        query = self.search_var.get().strip()
+        archive = self.show_archive.get()
+        if query:
+            events = self.event_manager.search(query, start, end, with_archive=archive)
+            if not tags:
+                return events
+            if self.tag_match_all.get():
+                return [event for event in events if set(tags).issubset(event.tags)]
+            return [event for event in events if not set(tags).isdisjoint(event.tags)]
+        if not tags:
+            return self.event_manager.get_events_between(start, end, with_archive=archive)
+        if self.tag_match_all.get():
+            return self.event_manager.get_events_by_tags(all_of=tags, start=start, end=end, with_archive=archive)
+        return self.event_manager.get_events_by_tags(any_of=tags, start=start, end=end, with_archive=archive)
+    
+    def get_visible_events(self):
+        start, end = self.get_filter_range()
+        archive = self.show_archive.get()
+        # Sa tagovima ili pretragom se radi nad listom pogodaka, bez njih direktno nad indeksom
+        filtered = self.get_selected_tags() or self.search_var.get().strip()
+        matches = self.get_filtered_events() if filtered else None
+        if matches is not None:
+            self.total_events = len(matches)
+        else:
+            self.total_events = self.event_manager.count_events_between(start, end, with_archive=archive)
+        self.virtual_mode = self.total_events > VIRTUAL_THRESHOLD
+        
+        if not self.virtual_mode:
+            self.view_offset = 0
+            if matches is not None:
+                return matches
+            return self.event_manager.get_events_between(start, end, with_archive=archive)
+        
+        page_size = self.page_size()
+        self.view_offset = max(0, min(self.view_offset, self.total_events - page_size))
+        if matches is not None:
+            return matches[self.view_offset:self.view_offset + page_size]
+        return self.event_manager.get_events_window(start, end, self.view_offset, page_size,
+                                                    with_archive=archive)
+    
+    def page_size(self):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible_rows = max(int(self.event_tree.cget("height")),
+                           self.event_tree.winfo_height() // row_height)
+        return visible_rows + VIRTUAL_OVERSCAN
+    
+    def on_filter_changed(self):
+        self.view_offset = 0
+        self.refresh_event_list()
+    
+    def on_search_focus(self):
+        # Indeks pretrage se gradi u pozadini čim korisnik uđe u polje, pre prvog upita
+        if self.event_manager is not None:
+            threading.Thread(target=self.event_manager.build_search_index, daemon=True).start()
+    
+    def on_search_changed(self):
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DELAY_MS, self.run_search)
+    
+    def run_search(self):
+        self.search_job = None
+        self.on_filter_changed()
+    
+    def on_vertical_scroll(self, *args):
+        if not self.virtual_mode:
+            self.event_tree.yview(*args)
+            return
+        
+        page_size = self.page_size() - VIRTUAL_OVERSCAN
+        if args[0] == "moveto":
+            offset = int(float(args[1]) * self.total_events)
+        elif args[2] == "pages":
+            offset = self.view_offset + int(args[1]) * page_size
+        else:
+            offset = self.view_offset + int(args[1])
+        self.scroll_to(offset)
+    
+    def on_mouse_wheel(self, direction):
+        if not self.virtual_mode:
+            self.event_tree.yview_scroll(direction * 3, "units")
+        else:
+            self.scroll_to(self.view_offset + direction * 3)
+        return "break"
+    
+    def on_tree_yscroll(self, first, last):
+        # Tokom virtuelnog režima klizač prati položaj u celoj listi, ne u Treeview-u
+        if not self.virtual_mode:
+            self.v_scrollbar.set(first, last)
+    
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.total_events - (self.page_size() - VIRTUAL_OVERSCAN)))
+        if offset != self.view_offset:
+            self.view_offset = offset
+            self.refresh_event_list()
+    
+    def build_row(self, event, now):
+        # Određuje status
+        if event.is_overdue(now):
+            status = "⚠️ Prošao je rok"
+            tags = ("overdue",)
+        elif event.notified:
+            status = "🔔 Obavešten"
+            tags = ("notified",)
+        elif event.is_notification_due(now):
+            status = "📢 Sada je vreme"
+            tags = ("due",)
+        else:
+            status = "📅 Zakazan"
+            tags = ("scheduled",)
+        
+        # Format tags for display
+        tags_display = ", ".join(event.tags) if event.tags else ""
+        
+        values = (
+            event.title,
+            tags_display,
+            event.date_time.strftime("%d.%m.%Y %H:%M"),
+            event.time_until_event(now),
+            status
+        )
+        return values, tags
+    
+    @metrics.timed("refresh_event_list_seconds", "Osvežavanje liste događaja u prozoru")
     def refresh_event_list(self):
-        for item in self.event_tree.get_children():
-            self.event_tree.delete(item)
+        if self.event_manager is None:
+            return
+        self.shown_version = self.event_manager.version
+        now = datetime.now()
+        events = self.get_visible_events()
+        new_ids = [event.id for event in events]
+        wanted = set(new_ids)
         
-        events = self.get_filtered_events()
+        # Uklanja redove kojih više nema u prikazu
+        for iid in [iid for iid in self.row_order if iid not in wanted]:
+            self.event_tree.delete(iid)
+            del self.rows[iid]
         
-        for event in events:
-            # Određuje status
-            if event.is_overdue():
-                status = "⚠️ Prošao je rok"
-                tags = ("overdue",)
-            elif event.notified:
-                status = "🔔 Obavešten"
-                tags = ("notified",)
-            elif event.is_notification_due():
-                status = "📢 Sada je vreme"
-                tags = ("due",)
+        # Redovi koji su zadržali međusobni poredak ostaju na mestu, ostali se
+        # privremeno odvajaju i vraćaju na novu poziciju
+        new_positions = {iid: i for i, iid in enumerate(new_ids)}
+        kept = [iid for iid in self.row_order if iid in wanted]
+        in_order = longest_increasing_subsequence(kept, new_positions)
+        for iid in kept:
+            if iid not in in_order:
+                self.event_tree.detach(iid)
+        
+        for index, event in enumerate(events):
+            values, tags = self.build_row(event, now)
+            old_row = self.rows.get(event.id)
+            if old_row is None:
+                self.event_tree.insert("", index, iid=event.id, values=values, tags=tags)
             else:
-                status = "📅 Zakazan"
-                tags = ("scheduled",)
-            
-            # Format tags for display
-            tags_display = ", ".join(event.tags) if event.tags else ""
-            
-            self.event_tree.insert("", "end", values=(
-                event.title,
-                tags_display,
-                event.date_time.strftime("%d.%m.%Y %H:%M"),
-                event.time_until_event(),
-                status
-            ), tags=tags)
+                if old_row != (values, tags):
+                    self.event_tree.item(event.id, values=values, tags=tags)
+                if event.id not in in_order:
+                    self.event_tree.move(event.id, "", index)
+            self.rows[event.id] = (values, tags)
+        self.row_order = new_ids
         
-        self.event_tree.tag_configure("overdue", background="#ffebee", foreground="#c62828")
-        self.event_tree.tag_configure("due", background="#fff3e0", foreground="#ef6c00")
-        self.event_tree.tag_configure("notified", background="#e8f5e8", foreground="#2e7d32")
-        self.event_tree.tag_configure("scheduled", background="white", foreground="black")
+        if self.virtual_mode:
+            visible = self.page_size() - VIRTUAL_OVERSCAN
+            self.v_scrollbar.set(self.view_offset / self.total_events,
+                                 min(1.0, (self.view_offset + visible) / self.total_events))
+            self.event_tree.yview_moveto(0)
+        if self.selected_id in self.rows and self.selected_id not in self.event_tree.selection():
+            self.event_tree.selection_set(self.selected_id)
         
-        count = len(events)
+        count = self.total_events
         filter_text_map = {
             "all": "Sve",
             "today": "Danas", 
@@ -215,21 +516,30 @@ class SmartOfficePlannerApp:
             "upcoming": "Predstojeći"
         }
         filter_text = filter_text_map.get(self.filter_var.get(), "Sve")
+        if self.show_archive.get():
+            filter_text += " sa arhivom"
+        tags = self.get_selected_tags()
+        if tags:
+            filter_text += "; " + ", ".join(tags)
+        query = self.search_var.get().strip()
+        if query:
+            filter_text += f"; pretraga: {query}"
         self.status_var.set(f"Prikazano {count} događaja ({filter_text})")
     
     def on_event_select(self, event):
         selection = self.event_tree.selection()
         if not selection:
-            self.update_details("")
+            # Red koji je samo izašao iz virtuelnog prozora ostaje izabran
+            if self.selected_id in self.rows or not self.event_manager.get_by_id(self.selected_id or ""):
+                self.selected_id = None
+                self.update_details("")
             return
         
         # Dobija izabrani događaj
-        item = selection[0]
-        event_index = self.event_tree.index(item)
-        events = self.get_filtered_events()
+        self.selected_id = selection[0]
+        selected_event = self.event_manager.get_by_id(selection[0])
         
-        if event_index < len(events):
-            selected_event = events[event_index]
+        if selected_event:
             # Srpski dani u nedelji
             days_sr = ["ponedeljak", "utorak", "sreda", "četvrtak", "petak", "subota", "nedelja"]
             day_name = days_sr[selected_event.date_time.weekday()]
@@ -247,7 +557,14 @@ class SmartOfficePlannerApp:
                 details += f"Tagovi: {tags_str}\n\n"
             
             details += f"Datum i vreme: {day_name}, {selected_event.date_time.day}. {month_name} {selected_event.date_time.year} u {selected_event.date_time.strftime('%H:%M')}\n\n"
+            if selected_event.duration_minutes:
+                details += f"Trajanje: {selected_event.duration_minutes} minuta (do {selected_event.end_time.strftime('%H:%M')})\n\n"
+            if selected_event.location:
+                details += f"Lokacija: {selected_event.location}\n\n"
             details += f"Vreme do događaja: {selected_event.time_until_event()}\n\n"
+            series = self.event_manager.get_by_id(selected_event.series_id)
+            if series is not None and series.recurrence is not None:
+                details += f"Ponavljanje: {series.recurrence.describe()}\n\n"
             details += f"Obaveštenje: {selected_event.notification_minutes} minuta pre\n\n"
             details += f"Opis:\n{selected_event.description}"
             
@@ -279,13 +596,67 @@ class SmartOfficePlannerApp:
         refresh_thread = threading.Thread(target=auto_refresh, daemon=True)
         refresh_thread.start()
     
+    def watch_changes(self):
+        # Izmene sa diska primenjuje servis obaveštenja; ovde se samo osvežava prikaz
+        if self.event_manager.version != self.shown_version:
+            self.refresh_event_list()
+        # Greške odloženog upisa se prikazuju ovde, u niti prozora
+        error = self.event_manager.persist_error
+        if error != self.shown_persist_error:
+            if error is not None:
+                self.status_var.set(f"Izmene nisu sačuvane ({error}), ponovni pokušaj uskoro")
+            else:
+                self.status_var.set("Sve izmene su sačuvane")
+            self.shown_persist_error = error
+        self.root.after(CHANGE_POLL_MS, self.watch_changes)
+    
     def on_closing(self):
-        self.notification_service.stop_monitoring()
+        # Zatvaranje tokom učitavanja: pozadinska nit se gasi sa procesom
+        if self.event_manager is not None:
+            self.status_var.set("Čuvanje izmena...")
+            self.root.update_idletasks()
+            try:
+                self.event_manager.flush()
+            except Exception as e:
+                self.status_var.set(f"Izmene nisu sačuvane ({e})")
+                if not messagebox.askyesno("Izmene nisu sačuvane",
+                                           f"Neuspešno čuvanje izmena:\n{e}\n\n"
+                                           f"Da li ipak želite da zatvorite program?"):
+                    return
+        if self.notification_service is not None:
+            self.notification_service.stop_monitoring()
+        if self.event_manager is not None:
+            self.event_manager.close()
         self.root.destroy()
     
     def run(self):
         self.root.mainloop()
 
+def longest_increasing_subsequence(items, positions):
+    # Vraća skup elemenata čije pozicije čine najduži rastući podniz
+    tails = []
+    tail_items = []
+    previous = {}
+    for item in items:
+        pos = positions[item]
+        i = bisect_left(tails, pos)
+        previous[item] = tail_items[i - 1] if i > 0 else None
+        if i == len(tails):
+            tails.append(pos)
+            tail_items.append(item)
+        else:
+            tails[i] = pos
+            tail_items[i] = item
+    
+    result = set()
+    item = tail_items[-1] if tail_items else None
+    while item is not None:
+        result.add(item)
+        item = previous[item]
+    return result
+
 if __name__ == "__main__":
+    # KANCELARIJE_METRICS=<fajl> i KANCELARIJE_PROFILE=cpu|memory, vidi metrics.py
+    metrics.enable_from_env()
     app = SmartOfficePlannerApp()
     app.run()
@@ -0,0 +1,407 @@
+import atexit
+import math
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Ugrađena merenja vrućih putanja: histogrami trajanja i brojači u memoriji
+# procesa, koji se po želji periodično upisuju u fajl u Prometheus tekstualnom
+# formatu (čita ga "cli.py metrics" ili node_exporter textfile collector).
+# Podrazumevano su isključena; tada timed/observe/inc samo provere jednu
+# globalnu promenljivu. Moduli za profilisanje (cProfile, pstats,
+# tracemalloc) se uvoze tek kada se profilisanje uključi, jer bi inače
+# produžili pokretanje aplikacije.
+
+PREFIX = "kancelarije_"
+# Granice histograma u sekundama: trajanja operacija i kašnjenje obaveštenja
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DELAY_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+DUMP_INTERVAL_SECONDS = 15
+DEFAULT_DUMP_FILE = "metrike.prom"
+# Profilisanje: broj okvira steka po alokaciji i broj mesta u izveštaju
+MEMORY_FRAMES = 5
+TOP_ALLOCATIONS = 25
+PROFILE_MODES = ("cpu", "memory")
+
+_enabled = False
+_registry_lock = threading.Lock()
+_registry: Dict[str, '_Metric'] = {}
+_dump_file: Optional[str] = None
+_dump_thread: Optional[threading.Thread] = None
+_profile_mode: Optional[str] = None
+_profilers: List['_ThreadProfiler'] = []
+_local = threading.local()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = PREFIX + name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        if not _enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return super().render() + [f"{self.name}{_format_labels(key)} {_format_value(value)}"
+                                   for key, value in values]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._value: Optional[float] = None
+
+    def set(self, value: float) -> None:
+        if _enabled:
+            self._value = value
+
+    def render(self) -> List[str]:
+        if self._value is None:
+            return []
+        return super().render() + [f"{self.name} {_format_value(self._value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Broj vrednosti po pregratku (ne kumulativno), zbir i ukupan broj
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        if not _enabled:
+            return
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def time(self) -> '_Timer':
+        return _Timer(self)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        lines = super().render()
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total!r}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+
+class _Timer:
+    # with histogram.time(): ... meri trajanje bloka (i profiliše ga u režimu cpu)
+    __slots__ = ('histogram', 'start', 'profiler')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter() if _enabled else None
+        self.profiler = _profile_section() if _profile_mode == "cpu" else None
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.start is not None:
+            self.histogram.observe(time.perf_counter() - self.start)
+
+
+def _get_or_create(cls, name: str, help_text: str, *args) -> _Metric:
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, help_text, *args)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metrika {name} je već registrovana kao {metric.kind}")
+        return metric
+
+
+def counter(name: str, help_text: str) -> Counter:
+    return _get_or_create(Counter, name, help_text)
+
+
+def gauge(name: str, help_text: str) -> Gauge:
+    return _get_or_create(Gauge, name, help_text)
+
+
+def histogram(name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, help_text, buckets)
+
+
+def timed(name: str, help_text: str) -> Callable:
+    # Dekorator: trajanje svakog poziva ide u histogram name
+    metric = histogram(name, help_text)
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(metric):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def render() -> str:
+    # Svi registrovani histogrami i brojači u Prometheus tekstualnom formatu
+    if _profile_mode == "memory":
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        TRACED_MEMORY.set(current)
+        TRACED_MEMORY_PEAK.set(peak)
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def enable(dump_file: Optional[str] = None, profile: Optional[str] = None) -> None:
+    # Uključuje merenja; sa dump_file se stanje upisuje u fajl svakih
+    # DUMP_INTERVAL_SECONDS i pri izlasku, a profil (cpu ili memory) ide
+    # pored njega u <dump_file>.prof odnosno <dump_file>.alloc.txt
+    global _enabled, _dump_file, _dump_thread, _profile_mode
+    if profile is not None and profile not in PROFILE_MODES:
+        raise ValueError(f"Nepoznat režim profilisanja: {profile}")
+    _enabled = True
+    _profile_mode = profile
+    if profile == "memory":
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+    if dump_file is None:
+        return
+    _dump_file = dump_file
+    if _dump_thread is None:
+        _dump_thread = threading.Thread(target=_dump_loop, name="metrike", daemon=True)
+        _dump_thread.start()
+        atexit.register(dump)
+
+
+def enable_from_env() -> None:
+    # KANCELARIJE_METRICS=<fajl> uključuje merenja, KANCELARIJE_PROFILE=cpu|memory profilisanje
+    dump_file = os.environ.get("KANCELARIJE_METRICS")
+    profile = os.environ.get("KANCELARIJE_PROFILE") or None
+    if dump_file or profile:
+        try:
+            enable(dump_file or None, profile)
+        except ValueError as e:
+            print(f"Greška pri uključivanju merenja: {e}")
+
+
+def disable() -> None:
+    global _enabled, _profile_mode
+    if _profile_mode == "memory":
+        import tracemalloc
+        tracemalloc.stop()
+    _enabled = False
+    _profile_mode = None
+
+
+def dump(path: Optional[str] = None) -> None:
+    path = path or _dump_file
+    if path is None:
+        return
+    try:
+        _write_atomic(path, render())
+        if _profile_mode == "cpu":
+            _dump_cpu_profile(path + ".prof")
+        elif _profile_mode == "memory":
+            _write_atomic(path + ".alloc.txt", _allocation_report())
+    except OSError as e:
+        print(f"Greška pri upisu metrika: {e}")
+
+
+def _dump_loop() -> None:
+    while True:
+        time.sleep(DUMP_INTERVAL_SECONDS)
+        if _enabled:
+            dump()
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+
+
+# --- profilisanje ---
+
+class _ThreadProfiler:
+    # cProfile meri samo nit u kojoj je uključen, pa svaka nit ima svoj, a
+    # uključen je samo dok traje merena sekcija (timed/time), ne i u čekanju.
+    # Brava sprečava da se profil prepiše u fajl dok nit meri.
+
+    def __init__(self):
+        import cProfile
+        self.profile = cProfile.Profile()
+        self.lock = threading.Lock()
+        self.active = False
+
+    def stop(self) -> None:
+        self.profile.disable()
+        self.active = False
+        self.lock.release()
+
+
+def _profile_section() -> Optional[_ThreadProfiler]:
+    profiler = getattr(_local, 'profiler', None)
+    if profiler is None:
+        profiler = _local.profiler = _ThreadProfiler()
+        with _registry_lock:
+            _profilers.append(profiler)
+    if profiler.active:
+        # Ugnežđena sekcija je već obuhvaćena spoljnom
+        return None
+    profiler.lock.acquire()
+    try:
+        profiler.profile.enable()
+    except ValueError:
+        # Python 3.12+ dozvoljava samo jedan aktivan profiler u procesu
+        profiler.lock.release()
+        return None
+    profiler.active = True
+    return profiler
+
+
+def _dump_cpu_profile(path: str) -> None:
+    import pstats
+    with _registry_lock:
+        profilers = list(_profilers)
+    stats = None
+    for profiler in profilers:
+        with profiler.lock:
+            profiler.profile.create_stats()
+            if not profiler.profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profiler.profile)
+            else:
+                stats.add(profiler.profile)
+    if stats is not None:
+        stats.dump_stats(path)
+
+
+def _allocation_report() -> str:
+    # Uzorak trenutnog stanja: mesta u kodu sa najviše zauzete memorije
+    import tracemalloc
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    current, peak = tracemalloc.get_traced_memory()
+    lines = [f"Zauzeto: {current / 2**20:.1f} MiB, najviše: {peak / 2**20:.1f} MiB", ""]
+    for stat in snapshot.statistics('traceback')[:TOP_ALLOCATIONS]:
+        lines.append(f"{stat.size / 2**10:10.1f} KiB  {stat.count:8} blokova")
+        lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
+
+
+TRACED_MEMORY = gauge("traced_memory_bytes", "Memorija koju trenutno prati tracemalloc")
+TRACED_MEMORY_PEAK = gauge("traced_memory_peak_bytes", "Najveća memorija koju je zabeležio tracemalloc")
+ERRORS = counter("errors_total", "Greške po mestu nastanka")
+NOTIFICATIONS = counter("notifications_total", "Obaveštenja po ishodu slanja")
+
+
+# --- čitanje upisanog fajla (cli.py metrics --summary) ---
+
+_SAMPLE = re.compile(r'^(\w+?)(_bucket|_sum|_count)?(\{[^}]*\})? (\S+)$')
+_LE = re.compile(r'le="([^"]+)"')
+
+
+def summarize(text: str) -> List[str]:
+    # Broj merenja, prosek i procenjeni percentili (po granicama pregradaka)
+    # za svaki histogram, i vrednosti brojača
+    histograms: Dict[str, Dict] = {}
+    kinds: Dict[str, str] = {}
+    lines = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split()
+            kinds[name] = kind
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, suffix, labels, value = match.groups()
+        if kinds.get(name) != "histogram":
+            if kinds.get(name) in ("counter", "gauge"):
+                lines.append(f"{name[len(PREFIX):]}{labels or ''} = {value}")
+            continue
+        data = histograms.setdefault(name, {'buckets': []})
+        if suffix == "_bucket":
+            data['buckets'].append((float(_LE.search(labels).group(1)), float(value)))
+        else:
+            data[suffix] = float(value)
+    for name, data in sorted(histograms.items()):
+        count = data.get('_count', 0)
+        if not count:
+            continue
+        percentiles = "  ".join(f"p{q}≤{_percentile(data['buckets'], count, q / 100)}" for q in (50, 95, 99))
+        lines.append(f"{name[len(PREFIX):]}: {int(count)} merenja, prosek {data.get('_sum', 0) / count:.4f} s, "
+                     f"{percentiles}")
+    return lines
+
+
+def _percentile(buckets: List[Tuple[float, float]], count: float, q: float) -> str:
+    for bound, cumulative in sorted(buckets):
+        if cumulative >= q * count:
+            return "+Inf" if bound == math.inf else f"{bound:g}"
+    return "+Inf"
@@ -0,0 +1,195 @@
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import metrics
+from event_manager import Event
+
+APP_NAME = "Pametne Kancelarije"
+# Najviše naslova navedenih u zbirnom obaveštenju
+SUMMARY_TITLES = 8
+# Koliko često radnik bez posla proverava da li je servis zaustavljen
+WORKER_POLL_SECONDS = 0.2
+
+# Koliko posle zakazanog vremena obaveštenja je ono zaista poslato
+DELIVERY_DELAY = metrics.histogram("notification_delay_seconds",
+                                   "Kašnjenje slanja obaveštenja u odnosu na zakazano vreme",
+                                   metrics.DELAY_BUCKETS)
+
+
+class NotificationBackend(ABC):
+    # Odredište obaveštenja; notify baca izuzetak kada slanje ne uspe
+    @abstractmethod
+    def notify(self, title: str, message: str, timeout: int = 10) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class DesktopBackend(NotificationBackend):
+    # plyer se uvozi pri prvom slanju, ne pri pokretanju aplikacije
+    def notify(self, title: str, message: str, timeout: int = 10) -> None:
+        from plyer import notification
+        notification.notify(title=title, message=message, app_name=APP_NAME, timeout=timeout)
+
+
+class MemoryBackend(NotificationBackend):
+    # Lokalna zamena za plyer (testovi, rad bez grafičkog okruženja): samo pamti
+    # poslata obaveštenja, a po potrebi simulira grešku ili sporo slanje
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.fail = fail
+        self.delay = delay
+        self.sent: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def notify(self, title: str, message: str, timeout: int = 10) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Simulirana greška pri slanju obaveštenja")
+        with self._lock:
+            self.sent.append((title, message))
+
+
+def format_event(event: Event, now: Optional[datetime] = None) -> Tuple[str, str]:
+    tags_str = f" [{', '.join(event.tags)}]" if event.tags else ""
+    if event.is_overdue(now):
+        title = f"⚠️ Prošao je rok: {event.title}{tags_str}"
+        message = f"Događaj je bio zakazan za {event.date_time.strftime('%d.%m.%Y %H:%M')}\n\n{event.description}"
+    else:
+        title = f"🔔 Predstojeći događaj: {event.title}{tags_str}"
+        message = (f"Zakazano za: {event.date_time.strftime('%d.%m.%Y %H:%M')}\n"
+                   f"Vreme do događaja: {event.time_until_event(now)}\n\n{event.description}")
+    return title, message
+
+
+def format_summary(events: List[Event], now: Optional[datetime] = None) -> Tuple[str, str]:
+    if len(events) == 1:
+        return format_event(events[0], now)
+    title = f"🔔 {len(events)} predstojećih događaja"
+    lines = [f"{event.date_time.strftime('%d.%m. %H:%M')}  {event.title}"
+             for event in events[:SUMMARY_TITLES]]
+    if len(events) > SUMMARY_TITLES:
+        lines.append(f"... i još {len(events) - SUMMARY_TITLES}")
+    return title, "\n".join(lines)
+
+
+def record_delivery(events: List[Event]) -> None:
+    if not metrics.enabled():
+        return
+    sent = datetime.now()
+    for event in events:
+        DELIVERY_DELAY.observe(max(0.0, (sent - event.notification_time()).total_seconds()))
+    metrics.NOTIFICATIONS.inc(len(events), result="delivered")
+
+
+def group_events(events: List[Event], window_seconds: int) -> List[List[Event]]:
+    # Obaveštenja čije vreme pada u isti prozor (podrazumevano isti minut) idu
+    # u jedno zbirno obaveštenje; grupe su poređane po vremenu
+    window = max(1, window_seconds) * 1_000_000
+    groups: Dict[int, List[Event]] = {}
+    for event in sorted(events, key=lambda x: x.notification_epoch()):
+        groups.setdefault(event.notification_epoch() // window, []).append(event)
+    return list(groups.values())
+
+
+class RateLimiter:
+    # Klizni prozor: najviše max_calls slanja u bilo kojih period sekundi
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: threading.Event) -> bool:
+        while not stop.is_set():
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return True
+                wait = self.period - (now - self._calls[0])
+            stop.wait(wait)
+        return False
+
+
+class NotificationDispatcher:
+    # Monitor samo predaje grupe u ograničen red; slanje obavljaju radnici,
+    # pa spor ili zaglavljen backend ne blokira raspoređivanje ostalih obaveštenja.
+    # Ishod svake grupe se javlja povratnim pozivom (on_delivered / on_failed).
+
+    def __init__(self, backend: NotificationBackend,
+                 on_delivered: Callable[[List[Event]], None],
+                 on_failed: Callable[[List[Event]], None],
+                 workers: int = 2, queue_size: int = 100, group_window_seconds: int = 60,
+                 rate_limit: int = 5, rate_period: float = 60.0):
+        self.backend = backend
+        self.on_delivered = on_delivered
+        self.on_failed = on_failed
+        self.workers = workers
+        self.group_window_seconds = group_window_seconds
+        self._queue: "queue.Queue[List[Event]]" = queue.Queue(maxsize=queue_size)
+        self._limiter = RateLimiter(rate_limit, rate_period)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"obavestenja-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        # Neposlate grupe se vraćaju pozivaocu da ih ponovo rasporedi
+        while True:
+            try:
+                group = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.on_failed(group)
+
+    def submit(self, events: List[Event]) -> List[Event]:
+        # Ne blokira: vraća događaje za koje u redu nije bilo mesta
+        rejected = []
+        for group in group_events(events, self.group_window_seconds):
+            try:
+                self._queue.put_nowait(group)
+            except queue.Full:
+                rejected.extend(group)
+        return rejected
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                group = self._queue.get(timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if not self._limiter.acquire(self._stop):
+                self.on_failed(group)
+                continue
+            try:
+                title, message = format_summary(group)
+                self.backend.notify(title, message)
+            except Exception as e:
+                metrics.NOTIFICATIONS.inc(len(group), result="failed")
+                print(f"Greška pri slanju obaveštenja: {e}")
+                self.on_failed(group)
+            else:
+                record_delivery(group)
+                self.on_delivered(group)
@@ -1,72 +1,204 @@
+import heapq
+import itertools
 import threading
 import time
-from plyer import notification
-from typing import List
-from event_manager import Event, EventManager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import metrics
+from event_manager import ARCHIVE_INTERVAL_SECONDS, Event, EventManager
+from notification_dispatch import (DesktopBackend, NotificationBackend, NotificationDispatcher, format_event,
+                                   record_delivery)
+
+# Gornja granica spavanja, za slučaj da se sistemski sat pomeri ili računar probudi iz sna
+MAX_SLEEP_SECONDS = 300
+RETRY_DELAY = timedelta(seconds=60)
+# Koliko često se proveravaju izmene drugih procesa nad istim skladištem
+CHANGE_POLL_SECONDS = 2
+
+# Rad jednog kruga monitora (provera izmena, beleženje poslatih, predaja
+# dospelih radnicima), bez vremena provedenog u čekanju
+CYCLE_TIME = metrics.histogram("notifier_cycle_seconds", "Trajanje kruga monitora obaveštenja bez čekanja")
 
 class NotificationService:
-    def __init__(self, event_manager: EventManager):
+    def __init__(self, event_manager: EventManager, backend: Optional[NotificationBackend] = None,
+                 workers: int = 2, queue_size: int = 100, group_window_seconds: int = 60,
+                 rate_limit: int = 5, rate_period: float = 60.0):
         self.event_manager = event_manager
+        self.backend = backend if backend is not None else DesktopBackend()
+        self.dispatcher = NotificationDispatcher(
+            self.backend, self._on_delivered, self._on_failed, workers=workers, queue_size=queue_size,
+            group_window_seconds=group_window_seconds, rate_limit=rate_limit, rate_period=rate_period)
         self.running = False
         self.check_thread = None
+        # Min-heap (vreme obaveštenja, redni broj, događaj); zastareli unosi se
+        # preskaču jer _scheduled pamti samo važeći redni broj za svaki id
+        self._heap: List[Tuple[datetime, int, Event]] = []
+        self._scheduled: Dict[str, int] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        # Uspešno poslati događaji čije se obaveštenje beleži u sledećem krugu monitora
+        self._delivered: List[Event] = []
+        self._next_archive = time.monotonic() + ARCHIVE_INTERVAL_SECONDS
+        self.event_manager.add_listener(self._on_event_changed)
     
-    def send_notification(self, event: Event) -> None:
+    def send_notification(self, event: Event) -> bool:
+        # Pojedinačno, sinhrono slanje mimo reda radnika
         try:
-            time_until = event.time_until_event()
-            
-            # Format tags for notification
-            tags_str = f" [{', '.join(event.tags)}]" if event.tags else ""
-            
-            if event.is_overdue():
-                title = f"⚠️ Prošao je rok: {event.title}{tags_str}"
-                message = f"Događaj je bio zakazan za {event.date_time.strftime('%d.%m.%Y %H:%M')}\n\n{event.description}"
-            else:
-                title = f"🔔 Predstojeći događaj: {event.title}{tags_str}"
-                message = f"Zakazano za: {event.date_time.strftime('%d.%m.%Y %H:%M')}\nVreme do događaja: {time_until}\n\n{event.description}"
-            
-            notification.notify(
-                title=title,
-                message=message,
-                app_name="Pametne Kancelarije",
-                timeout=10
-            )
+            title, message = format_event(event)
+            self.backend.notify(title, message)
+            record_delivery([event])
             self.event_manager.mark_event_notified(event)
+            return True
             
         except Exception as e:
+            metrics.NOTIFICATIONS.inc(result="failed")
             print(f"Greška pri slanju obaveštenja: {e}")
+            return False
     
     def check_for_notifications(self) -> None:
+        # Dospela obaveštenja idu u red radnika; ono što ne stane čeka sledeći pokušaj
         events_to_notify = self.event_manager.get_events_needing_notification()
-        for event in events_to_notify:
-            self.send_notification(event)
+        self.dispatcher.start()
+        rejected = self.dispatcher.submit(events_to_notify)
+        if rejected:
+            self._on_failed(rejected)
     
     def start_monitoring(self) -> None:
         if self.running:
             return
         self.running = True
+        self._schedule_all()
+        self.dispatcher.start()
         self.check_thread = threading.Thread(target=self._monitor_loop, daemon=True)
         self.check_thread.start()
     
     def stop_monitoring(self) -> None:
         self.running = False
+        with self._condition:
+            self._condition.notify_all()
         if self.check_thread and self.check_thread.is_alive():
             self.check_thread.join(timeout=1)
+        self.dispatcher.stop()
+        self._flush_delivered()
+        self.backend.close()
+    
+    def _schedule_all(self) -> None:
+        pending = self.event_manager.get_pending_notifications()
+        with self._condition:
+            self._heap = []
+            self._scheduled = {}
+            for event in pending:
+                seq = next(self._counter)
+                self._scheduled[event.series_id] = seq
+                self._heap.append((event.notification_time(), seq, event))
+            heapq.heapify(self._heap)
+            self._condition.notify()
+    
+    def _schedule(self, event: Event, when: datetime) -> None:
+        seq = next(self._counter)
+        self._scheduled[event.series_id] = seq
+        heapq.heappush(self._heap, (when, seq, event))
+    
+    def _on_event_changed(self, op: str, event: Event) -> None:
+        # Za ponavljajuću seriju u redu je uvek samo njena sledeća pojava
+        if op == 'reload':
+            self._schedule_all()
+            return
+        if op in ('add', 'update') and event.recurrence is not None:
+            target = event.pending_occurrence()
+        elif op == 'notified' and event.series_id != event.id:
+            target = event.master.pending_occurrence()
+        elif op in ('add', 'update') and not event.notified:
+            target = event
+        else:
+            target = None
+        
+        with self._condition:
+            if target is not None:
+                self._schedule(target, target.notification_time())
+            else:
+                self._scheduled.pop(event.series_id, None)
+            self._condition.notify()
+    
+    def _on_delivered(self, events: List[Event]) -> None:
+        with self._condition:
+            self._delivered.extend(events)
+            self._condition.notify()
+            monitored = self.running
+        if not monitored:
+            self._flush_delivered()
+    
+    def _on_failed(self, events: List[Event]) -> None:
+        with self._condition:
+            retry_at = datetime.now() + RETRY_DELAY
+            for event in events:
+                self._schedule(event, retry_at)
+            self._condition.notify()
+    
+    def _flush_delivered(self) -> None:
+        # Jedan upis oznaka "obavešteno" za sve što je poslato od prošlog kruga
+        with self._condition:
+            delivered, self._delivered = self._delivered, []
+        if delivered:
+            self.event_manager.mark_events_notified(delivered)
+    
+    def _next_due_events(self) -> List[Event]:
+        # Vraća se najkasnije posle CHANGE_POLL_SECONDS, da monitor proveri izmene na disku
+        poll_at = time.monotonic() + CHANGE_POLL_SECONDS
+        with self._condition:
+            while self.running:
+                while self._heap and self._scheduled.get(self._heap[0][2].series_id) != self._heap[0][1]:
+                    heapq.heappop(self._heap)
+                
+                now = datetime.now()
+                if (self._heap and self._heap[0][0] <= now) or self._delivered:
+                    due = []
+                    while self._heap and self._heap[0][0] <= now:
+                        _, seq, event = heapq.heappop(self._heap)
+                        if self._scheduled.get(event.series_id) == seq:
+                            del self._scheduled[event.series_id]
+                            due.append(event)
+                    return due
+                
+                remaining = poll_at - time.monotonic()
+                if remaining <= 0:
+                    return []
+                timeout = min(MAX_SLEEP_SECONDS, remaining)
+                if self._heap:
+                    timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+                self._condition.wait(timeout)
+        return []
     
     def _monitor_loop(self) -> None:
         while self.running:
             try:
-                self.check_for_notifications()
-                time.sleep(60)  # Proverava svakog minuta
+                # Van self._condition: primena tuđih izmena obaveštava _on_event_changed
+                started = time.perf_counter()
+                self.event_manager.poll_changes()
+                busy = time.perf_counter() - started
+                due = self._next_due_events()
+                started = time.perf_counter()
+                self._flush_delivered()
+                if due:
+                    rejected = self.dispatcher.submit(due)
+                    if rejected:
+                        self._on_failed(rejected)
+                CYCLE_TIME.observe(busy + time.perf_counter() - started)
+                if time.monotonic() >= self._next_archive:
+                    # Proces koji dugo radi (daemon) ne bi inače arhivirao do sledećeg pokretanja
+                    self._next_archive = time.monotonic() + ARCHIVE_INTERVAL_SECONDS
+                    self.event_manager.archive_old_events()
             except Exception as e:
+                metrics.ERRORS.inc(where="monitor")
                 print(f"Greška u praćenju obaveštenja: {e}")
-                time.sleep(60)
+                with self._condition:
+                    self._condition.wait(RETRY_DELAY.total_seconds())
     
     def send_test_notification(self) -> None:
         try:
-            notification.notify(
+            self.backend.notify(
                 title="🧪 Test aplikacije Pametne Kancelarije",
                 message="Sistem obaveštenja radi ispravno!",
-                app_name="Pametne Kancelarije",
                 timeout=5
             )
         except Exception as e:
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import smtplib
+import threading
+import urllib.parse
+from abc import ABC, abstractmethod
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+from notification_dispatch import APP_NAME, DesktopBackend, NotificationBackend
+
+DEAD_LETTER_FILE = "neisporucena_obavestenja.jsonl"
+
+
+class NotificationSink(ABC):
+    # Jedno odredište obaveštenja. Svako ima svoj rok, broj ponovnih pokušaja
+    # i početno kašnjenje između pokušaja, koje se posle svakog neuspeha udvostručuje.
+    # Blokirajuće odredište šalje u zasebnoj niti, koja se ne može prekinuti,
+    # pa rok mora da poštuje samo (npr. timeout soketa).
+    blocking = False
+
+    def __init__(self, name: str, timeout: float = 10.0, retries: int = 2, backoff: float = 1.0):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    @abstractmethod
+    async def send(self, title: str, message: str) -> None:
+        ...
+
+
+class BackendSink(NotificationSink):
+    # Sinhroni NotificationBackend (plyer, MemoryBackend) u zasebnoj niti,
+    # da ne bi zaustavio petlju događaja
+    blocking = True
+
+    def __init__(self, backend: NotificationBackend, name: str = "desktop", **options):
+        super().__init__(name, **options)
+        self.backend = backend
+
+    async def send(self, title: str, message: str) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.backend.notify, title, message)
+
+
+class DesktopSink(BackendSink):
+    def __init__(self, **options):
+        super().__init__(DesktopBackend(), "desktop", **options)
+
+
+class LogSink(NotificationSink):
+    blocking = True
+
+    def __init__(self, path: str, name: str = "log", **options):
+        super().__init__(name, **options)
+        self.path = path
+        self._lock = threading.Lock()
+
+    async def send(self, title: str, message: str) -> None:
+        line = f"{datetime.now().isoformat(timespec='seconds')}  {title}  {' | '.join(message.splitlines())}\n"
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._append, line)
+
+    def _append(self, line: str) -> None:
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+class WebhookSink(NotificationSink):
+    # HTTP POST sa JSON telom preko asyncio tokova, bez dodatnih biblioteka
+    def __init__(self, url: str, name: str = "webhook", headers: Optional[Dict[str, str]] = None, **options):
+        super().__init__(name, **options)
+        self.url = url
+        self.headers = headers or {}
+
+    async def send(self, title: str, message: str) -> None:
+        url = urllib.parse.urlsplit(self.url)
+        if url.scheme not in ("http", "https"):
+            raise ValueError(f"Nepodržana adresa webhook-a: {self.url}")
+        port = url.port or (443 if url.scheme == "https" else 80)
+        body = json.dumps({'app': APP_NAME, 'title': title, 'message': message,
+                           'sent_at': datetime.now().isoformat(timespec='seconds')},
+                          ensure_ascii=False).encode('utf-8')
+        path = (url.path or "/") + (f"?{url.query}" if url.query else "")
+        headers = {'Host': url.netloc, 'Content-Type': 'application/json; charset=utf-8',
+                   'Content-Length': str(len(body)), 'Connection': 'close', **self.headers}
+        request = f"POST {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+
+        reader, writer = await asyncio.open_connection(url.hostname, port, ssl=True if url.scheme == "https" else None)
+        try:
+            writer.write(request.encode('latin-1') + body)
+            await writer.drain()
+            status_line = await reader.readline()
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        parts = status_line.decode('latin-1').split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            raise RuntimeError(f"Neispravan odgovor webhook-a: {status_line!r}")
+        if not 200 <= int(parts[1]) < 300:
+            raise RuntimeError(f"Webhook je vratio status {parts[1]}")
+
+
+class EmailSink(NotificationSink):
+    # smtplib je blokirajući, pa se slanje izvršava u zasebnoj niti; rok
+    # odredišta je timeout soketa
+    blocking = True
+
+    def __init__(self, host: str, port: int, sender: str, recipients: List[str], name: str = "email",
+                 starttls: bool = False, username: Optional[str] = None, password: Optional[str] = None,
+                 **options):
+        super().__init__(name, **options)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = recipients
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+
+    async def send(self, title: str, message: str) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._send_sync, title, message)
+
+    def _send_sync(self, title: str, message: str) -> None:
+        email = EmailMessage()
+        email['Subject'] = title
+        email['From'] = self.sender
+        email['To'] = ", ".join(self.recipients)
+        email.set_content(message)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(email)
+
+
+class DeliveryEngine(NotificationBackend):
+    # Isporuka istovremeno na sva odredišta, u asyncio petlji u pozadinskoj niti.
+    # Za NotificationDispatcher je običan backend: notify čeka da se sva
+    # odredišta završe i baca izuzetak samo ako nijedno nije uspelo. Odredište
+    # koje ni posle svih pokušaja ne uspe se upisuje u dead-letter fajl.
+
+    def __init__(self, sinks: List[NotificationSink], dead_letter_file: Optional[str] = DEAD_LETTER_FILE):
+        self.sinks = sinks
+        self.dead_letter_file = dead_letter_file
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def notify(self, title: str, message: str, timeout: int = 10) -> None:
+        results = self.deliver(title, message)
+        if results and not any(results.values()):
+            raise RuntimeError(f"Obaveštenje nije isporučeno ni na jedno odredište ({', '.join(results)})")
+
+    def deliver(self, title: str, message: str) -> Dict[str, bool]:
+        if not self.sinks:
+            return {}
+        future = asyncio.run_coroutine_threadsafe(self.fan_out(title, message), self._ensure_loop())
+        return future.result()
+
+    async def fan_out(self, title: str, message: str) -> Dict[str, bool]:
+        outcomes = await asyncio.gather(*(self._deliver_one(sink, title, message) for sink in self.sinks))
+        return {sink.name: outcome for sink, outcome in zip(self.sinks, outcomes)}
+
+    async def _deliver_one(self, sink: NotificationSink, title: str, message: str) -> bool:
+        error = None
+        for attempt in range(sink.retries + 1):
+            if attempt:
+                await asyncio.sleep(sink.backoff * 2 ** (attempt - 1))
+            try:
+                if sink.blocking:
+                    # Istekao wait_for ne bi zaustavio nit, pa bi ponovni pokušaj
+                    # poslao istu poruku još jednom dok prvi još traje
+                    await sink.send(title, message)
+                else:
+                    await asyncio.wait_for(sink.send(title, message), sink.timeout)
+                return True
+            except asyncio.TimeoutError:
+                error = f"isteklo vreme ({sink.timeout} s)"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+        self._dead_letter(sink, title, message, error, sink.retries + 1)
+        return False
+
+    def _dead_letter(self, sink: NotificationSink, title: str, message: str, error: str, attempts: int) -> None:
+        print(f"Greška pri isporuci obaveštenja na {sink.name}: {error}")
+        if not self.dead_letter_file:
+            return
+        record = {'failed_at': datetime.now().isoformat(timespec='seconds'), 'sink': sink.name,
+                  'title': title, 'message': message, 'error': error, 'attempts': attempts}
+        try:
+            with self._lock, open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Greška pri upisu neisporučenog obaveštenja: {e}")
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="isporuka", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def close(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=1)
+            loop.close()
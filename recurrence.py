@@ -0,0 +1,107 @@
+import calendar
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+
+class Recurrence:
+    # Pravilo ponavljanja u duhu RFC 5545 (FREQ, INTERVAL, UNTIL, COUNT, EXDATE),
+    # ograničeno na dnevno, nedeljno i mesečno ponavljanje
+    FREQUENCIES = ("daily", "weekly", "monthly")
+
+    __slots__ = ('frequency', 'interval', 'until', 'count', 'exceptions')
+
+    def __init__(self, frequency: str, interval: int = 1, until: Optional[datetime] = None,
+                 count: Optional[int] = None, exceptions: Optional[Iterable[datetime]] = None):
+        if frequency not in self.FREQUENCIES:
+            raise ValueError(f"Nepoznata učestalost ponavljanja: {frequency}")
+        if interval < 1:
+            raise ValueError("Interval ponavljanja mora biti pozitivan")
+        self.frequency = frequency
+        self.interval = interval
+        self.until = until
+        self.count = count
+        self.exceptions: Set[datetime] = set(exceptions) if exceptions else set()
+
+    def to_dict(self) -> Dict:
+        data = {'frequency': self.frequency, 'interval': self.interval}
+        if self.until is not None:
+            data['until'] = self.until.isoformat()
+        if self.count is not None:
+            data['count'] = self.count
+        if self.exceptions:
+            data['exceptions'] = sorted(value.isoformat() for value in self.exceptions)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Recurrence':
+        until = data.get('until')
+        return cls(
+            frequency=data['frequency'],
+            interval=data.get('interval', 1),
+            until=datetime.fromisoformat(until) if until else None,
+            count=data.get('count'),
+            exceptions=[datetime.fromisoformat(value) for value in data.get('exceptions', [])]
+        )
+
+    def describe(self) -> str:
+        units = {
+            "daily": ("svakog dana", "dana"),
+            "weekly": ("svake nedelje", "nedelja"),
+            "monthly": ("svakog meseca", "meseci"),
+        }
+        single, plural = units[self.frequency]
+        text = single if self.interval == 1 else f"svakih {self.interval} {plural}"
+        if self.until is not None:
+            text += f", do {self.until.strftime('%d.%m.%Y')}"
+        if self.count is not None:
+            text += f", {self.count} puta"
+        return text
+
+    def copy(self) -> 'Recurrence':
+        return Recurrence(self.frequency, self.interval, self.until, self.count, self.exceptions)
+
+    def occurrences(self, dtstart: datetime, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> Iterator[datetime]:
+        # Generator: pojave se računaju tek kada se zatraže, samo unutar [start, end]
+        if self.frequency == "monthly":
+            candidates = self._monthly(dtstart, start)
+        else:
+            candidates = self._fixed_step(dtstart, start)
+
+        for index, value in candidates:
+            if self.count is not None and index >= self.count:
+                return
+            if self.until is not None and value > self.until:
+                return
+            if end is not None and value > end:
+                return
+            if start is not None and value < start:
+                continue
+            if value not in self.exceptions:
+                yield value
+
+    def _fixed_step(self, dtstart: datetime, start: Optional[datetime]):
+        step = timedelta(days=self.interval * (7 if self.frequency == "weekly" else 1))
+        index = 0
+        if start is not None and start > dtstart:
+            # Skok direktno na prvu pojavu u prozoru, bez prolaska kroz prethodne
+            index = -((dtstart - start) // step)
+        while True:
+            yield index, dtstart + index * step
+            index += 1
+
+    def _monthly(self, dtstart: datetime, start: Optional[datetime]):
+        # Meseci bez tog dana (npr. 31.) se preskaču i ne ulaze u COUNT
+        index = 0
+        months = 0
+        if start is not None and start > dtstart and dtstart.day <= 28:
+            elapsed = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+            index = max(0, elapsed // self.interval - 1)
+            months = index * self.interval
+        while True:
+            year, month = divmod(dtstart.month - 1 + months, 12)
+            year += dtstart.year
+            if dtstart.day <= calendar.monthrange(year, month + 1)[1]:
+                yield index, dtstart.replace(year=year, month=month + 1)
+                index += 1
+            months += self.interval
@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    # Više čitalaca istovremeno ili jedan pisac. Pisci imaju prednost, da
+    # neprekidan niz čitanja (osvežavanje prikaza) ne bi zauvek odložio izmenu.
+    #
+    # Zaključavanje je ponovljivo unutar iste niti: pisac sme da čita i da
+    # ponovo uzme pisanje, a čitalac koji već čita ne čeka pisca u redu (inače
+    # bi ugnežđeno čitanje i pisac na čekanju blokirali jedno drugo). Prelaz
+    # sa čitanja na pisanje nije dozvoljen.
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._writer_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, 'depth', 0)
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        depth = self._read_depth()
+        if self._writer == me or depth:
+            self._local.depth = depth + 1
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.depth = 1
+
+    def release_read(self) -> None:
+        depth = self._read_depth() - 1
+        self._local.depth = depth
+        if depth or self._writer == threading.get_ident():
+            return
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            return
+        if self._read_depth():
+            raise RuntimeError("Nit koja čita ne može da pređe na pisanje")
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        self._writer_depth -= 1
+        if self._writer_depth:
+            return
+        with self._condition:
+            self._writer = None
+            self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
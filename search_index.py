@@ -0,0 +1,190 @@
+import json
+import os
+import re
+import unicodedata
+import zlib
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Verzija formata sačuvanog indeksa; fajl drugog formata se odbacuje
+FORMAT_VERSION = 1
+
+# Posle lower(): đ nema razloženi oblik (nije d sa znakom), pa se preslovljava
+# kao "dj", a ćirilica u latinicu bez dijakritika, da "састанак", "sastanak"
+# i "Sastanak" budu ista reč
+_LATIN = (('č', 'c'), ('ć', 'c'), ('š', 's'), ('ž', 'z'), ('đ', 'dj'))
+_FOLD = str.maketrans({
+    'ß': 'ss', 'æ': 'ae', 'ø': 'o', 'ł': 'l',
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'ђ': 'dj', 'е': 'e', 'ж': 'z',
+    'з': 'z', 'и': 'i', 'ј': 'j', 'к': 'k', 'л': 'l', 'љ': 'lj', 'м': 'm', 'н': 'n',
+    'њ': 'nj', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'ћ': 'c', 'у': 'u',
+    'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'c', 'џ': 'dz', 'ш': 's',
+})
+# Reč je niz slova i cifara (bez "_"), isto kao u SQLite FTS5 tokenizeru;
+# za tekst koji je posle preslovljavanja ASCII dovoljan je brži izraz
+_WORD = re.compile(r"[^\W_]+")
+_ASCII_WORD = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    # Najčešći slučaj (latinica) ide preko replace, višestruko bržeg od
+    # translate i razlaganja koji ostaju za ćirilicu i ostala pisma
+    text = text.lower()
+    if text.isascii():
+        return text
+    for letter, ascii_letters in _LATIN:
+        if letter in text:
+            text = text.replace(letter, ascii_letters)
+    if text.isascii():
+        return text
+    # é -> e + akcenat, pa se akcenat izbacuje
+    text = ''.join(ch for ch in unicodedata.normalize('NFKD', text) if not unicodedata.combining(ch))
+    return text.translate(_FOLD)
+
+
+def tokenize(text: str) -> List[str]:
+    text = fold(text)
+    return (_ASCII_WORD if text.isascii() else _WORD).findall(text)
+
+
+def query_terms(query: str) -> List[str]:
+    # Duže reči su selektivnije, pa se upit počinje od njih
+    return sorted(set(tokenize(query)), key=len, reverse=True)
+
+
+def event_text(event) -> str:
+    return f"{event.title}\n{event.description}\n{event.location}"
+
+
+def matches(terms: Iterable[str], text: str) -> bool:
+    # Provera bez indeksa: svaka reč upita je početak neke reči teksta
+    words = tokenize(text)
+    return all(any(word.startswith(term) for word in words) for term in terms)
+
+
+def _doc_hash(event_id: str, text: str) -> int:
+    return (zlib.crc32(event_id.encode()) << 32) | zlib.crc32(text.encode())
+
+
+def fingerprint(docs: Iterable[Tuple[str, str]]) -> int:
+    # XOR otisaka pojedinačnih događaja: ne zavisi od redosleda i menja se
+    # inkrementalno, pa se sačuvan indeks može proveriti bez ponovnog indeksiranja
+    result = 0
+    for event_id, text in docs:
+        result ^= _doc_hash(event_id, text)
+    return result
+
+
+class SearchIndex:
+    # Invertovani indeks za pretragu teksta: reč -> skup id-jeva događaja.
+    # Reči su i u sortiranoj listi, pa svi nastavci prefiksa čine jedan
+    # uzastopni opseg koji se nalazi binarnom pretragom.
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._words: List[str] = []
+        self.fingerprint = 0
+        # Da li se sadržaj razlikuje od sačuvanog fajla
+        self.dirty = True
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def add(self, event_id: str, text: str) -> None:
+        for word in set(tokenize(text)):
+            ids = self._postings.get(word)
+            if ids is None:
+                ids = self._postings[word] = set()
+                insort(self._words, word)
+            ids.add(event_id)
+        self.fingerprint ^= _doc_hash(event_id, text)
+        self.dirty = True
+
+    def add_many(self, docs: Iterable[Tuple[str, str]]) -> None:
+        # Nove reči se sortiraju jednom na kraju, umesto umetanja jedne po jedne
+        new_words = []
+        postings = self._postings
+        for event_id, text in docs:
+            for word in set(tokenize(text)):
+                ids = postings.get(word)
+                if ids is None:
+                    postings[word] = {event_id}
+                    new_words.append(word)
+                else:
+                    ids.add(event_id)
+            self.fingerprint ^= _doc_hash(event_id, text)
+        if new_words:
+            self._words.extend(new_words)
+            self._words.sort()
+        self.dirty = True
+
+    def remove(self, event_id: str, text: str) -> None:
+        for word in set(tokenize(text)):
+            ids = self._postings.get(word)
+            if ids is None:
+                continue
+            ids.discard(event_id)
+            if not ids:
+                del self._postings[word]
+                del self._words[bisect_left(self._words, word)]
+        self.fingerprint ^= _doc_hash(event_id, text)
+        self.dirty = True
+
+    def lookup(self, terms: List[str]) -> Set[str]:
+        # Id-jevi događaja koji za svaku reč upita imaju reč sa tim početkom
+        result: Optional[Set[str]] = None
+        for term in terms:
+            sets = self._prefix_postings(term)
+            if not sets:
+                return set()
+            if result is None:
+                result = set(sets[0]).union(*sets[1:])
+            elif len(result) * len(sets) < sum(len(ids) for ids in sets):
+                # Malo preostalih kandidata: jeftinije je proveriti svakog
+                # nego praviti uniju svih nastavaka kratkog prefiksa
+                result = {event_id for event_id in result if any(event_id in ids for ids in sets)}
+            else:
+                result &= set().union(*sets)
+            if not result:
+                break
+        return result or set()
+
+    def _prefix_postings(self, prefix: str) -> List[Set[str]]:
+        words = self._words
+        i = bisect_left(words, prefix)
+        sets = []
+        while i < len(words) and words[i].startswith(prefix):
+            sets.append(self._postings[words[i]])
+            i += 1
+        return sets
+
+    def save(self, path: str) -> None:
+        # Pogoci reči su jedan string id-jeva, pa se pri učitavanju skup pravi
+        # sa split() umesto petlje u Pythonu po svakom id-u
+        data = {'format': FORMAT_VERSION, 'fingerprint': self.fingerprint,
+                'words': {word: " ".join(ids) for word, ids in self._postings.items()}}
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, path)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str, expected_fingerprint: int) -> Optional['SearchIndex']:
+        # None ako fajla nema ili ne odgovara trenutnim događajima
+        index = cls()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') != FORMAT_VERSION or data.get('fingerprint') != expected_fingerprint:
+                return None
+            index._postings = {word: set(ids.split()) for word, ids in data['words'].items()}
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            print(f"Greška pri učitavanju indeksa pretrage: {e}")
+            return None
+        index._words = sorted(index._postings)
+        index.fingerprint = expected_fingerprint
+        index.dirty = False
+        return index
@@ -0,0 +1,445 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterable, Iterator, Optional, Set, Tuple
+from event_manager import (ConcurrentModificationError, Event, EventManager, Occurrence,
+                           OCCURRENCE_SEPARATOR)
+from event_archive import EventArchive
+from journal_store import JournalStore
+from search_index import event_text, matches, query_terms, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    date_time TEXT NOT NULL,
+    notify_at TEXT NOT NULL,
+    notification_minutes INTEGER NOT NULL,
+    notified INTEGER NOT NULL DEFAULT 0,
+    tags TEXT NOT NULL DEFAULT '[]',
+    recurrence TEXT,
+    notified_occurrences TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_date_time ON events(date_time);
+CREATE INDEX IF NOT EXISTS idx_events_notify_at ON events(notify_at) WHERE notified = 0;
+CREATE TABLE IF NOT EXISTS event_tags (
+    tag TEXT NOT NULL,
+    event_id TEXT NOT NULL REFERENCES events(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, event_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_event_tags_event ON event_tags(event_id);
+"""
+
+# Kolone dodate posle prve verzije šeme; starije baze se dopunjuju pri otvaranju
+ADDED_COLUMNS = {
+    'recurrence': "TEXT",
+    'notified_occurrences': "TEXT",
+    'duration_minutes': "INTEGER NOT NULL DEFAULT 0",
+    'location': "TEXT NOT NULL DEFAULT ''",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_events_recurring ON events(pos) WHERE recurrence IS NOT NULL;
+"""
+
+# Pretraga teksta: rowid je pos iz tabele events, a tekst se upisuje već
+# preslovljen i podeljen na reči (search_index.tokenize), pa FTS5 ne mora da
+# zna za đ i ćirilicu. Prefiksni indeksi ubrzavaju upite dok se kuca.
+SEARCH_SCHEMA = "CREATE VIRTUAL TABLE events_fts USING fts5(text, prefix='1 2 3')"
+
+COLUMNS = ("id, title, description, date_time, notification_minutes, notified, tags, "
+           "recurrence, notified_occurrences, duration_minutes, location")
+
+
+def _iso(value: datetime) -> str:
+    # Fiksna širina da bi leksikografski poredak u indeksu bio hronološki
+    return value.isoformat(timespec='microseconds')
+
+
+class SQLiteEventManager(EventManager):
+    # Isti API kao EventManager, ali događaji ostaju u bazi; upiti po datumu,
+    # vremenu obaveštenja i tagovima idu preko indeksa umesto petlje u Pythonu.
+
+    def __init__(self, data_file: str = "dogadjaji.db", migrate_from: Optional[str] = None):
+        # Arhiva i odloženi upis ne postoje: svaka izmena je odmah transakcija u bazi
+        self._migrate_from = migrate_from
+        super().__init__(data_file, archive_after_days=None)
+
+    def _open_store(self, compact_threshold: int, snapshot_format: str) -> None:
+        # Jedna konekcija za sve niti, pa se i čitanja serijalizuju; WAL daje
+        # svakom upitu dosledan snapshot baze. Brava čitalaca/pisaca iz
+        # EventManager-a štiti samo nasleđene metode.
+        self._db_lock = threading.RLock()
+        self._foreign_changes = 0
+        is_new = not os.path.exists(self.data_file)
+        self.conn = sqlite3.connect(self.data_file, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._upgrade_schema()
+        self.conn.executescript(INDEXES)
+        self._fts = self._create_search_table()
+        if is_new and self._migrate_from and os.path.exists(self._migrate_from):
+            count = migrate_json_to_sqlite(self._migrate_from, self)
+            print(f"Preneto {count} događaja iz {self._migrate_from} u {self.data_file}")
+        # data_version se menja samo kada bazu izmeni druga konekcija (drugi proces)
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _upgrade_schema(self) -> None:
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(events)")}
+        with self.conn:
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in existing:
+                    self.conn.execute(f"ALTER TABLE events ADD COLUMN {column} {definition}")
+
+    def _create_search_table(self) -> bool:
+        # Postojeća baza bez tabele za pretragu se popunjava jednom; bez FTS5
+        # (SQLite preveden bez njega) pretraga prolazi kroz sve redove
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'events_fts'").fetchone()
+            if not exists:
+                self.conn.execute(SEARCH_SCHEMA)
+                cursor = self.conn.execute(f"SELECT pos, {COLUMNS} FROM events")
+                self.conn.executemany(
+                    "INSERT INTO events_fts (rowid, text) VALUES (?, ?)",
+                    ((row[0], _search_words(self._row_to_event(row[1:]))) for row in cursor))
+            self.conn.commit()
+            return True
+        except sqlite3.OperationalError:
+            self.conn.rollback()
+            return False
+
+    @property
+    def events(self) -> List[Event]:
+        return self._query(f"SELECT {COLUMNS} FROM events ORDER BY pos")
+
+    @property
+    def version(self) -> int:
+        with self._db_lock:
+            return self.conn.total_changes + self._foreign_changes
+
+    def poll_changes(self) -> bool:
+        # Upiti uvek čitaju bazu, pa je dovoljno da slušaoci sve ponovo pročitaju
+        with self._db_lock:
+            data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+            if changed:
+                self._foreign_changes += 1
+        if changed:
+            self._notify_listeners('reload', None)
+        return changed
+
+    def snapshot(self) -> Tuple[Event, ...]:
+        # Svaki red je nov objekat, pa je rezultat upita već nepromenljiv pogled
+        return tuple(self.events)
+
+    def iter_events(self) -> Iterator[Event]:
+        # Posebna konekcija, da čitanje u delovima ne bi držalo zajedničku bravu
+        conn = sqlite3.connect(self.data_file)
+        try:
+            cursor = conn.execute(f"SELECT {COLUMNS} FROM events ORDER BY pos")
+            while True:
+                rows = cursor.fetchmany(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_event(row)
+        finally:
+            conn.close()
+
+    def existing_ids(self, event_ids: Iterable[str]) -> Set[str]:
+        event_ids = list(event_ids)
+        found = set()
+        with self._db_lock:
+            # SQLite ograničava broj parametara u jednom upitu
+            for i in range(0, len(event_ids), 500):
+                chunk = event_ids[i:i + 500]
+                found.update(row[0] for row in self.conn.execute(
+                    f"SELECT id FROM events WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+        return found
+
+    def add_event(self, event: Event) -> None:
+        self.add_events([event])
+
+    def add_events(self, events: Iterable[Event]) -> None:
+        added = []
+        with self._db_lock, self.conn:
+            for event in events:
+                self._insert(event)
+                added.append(event)
+        for event in added:
+            self._notify_listeners('add', event)
+
+    def get_by_id(self, event_id: str) -> Optional[Event]:
+        if OCCURRENCE_SEPARATOR in event_id:
+            return self._occurrence_by_id(event_id)
+        events = self._query(f"SELECT {COLUMNS} FROM events WHERE id = ?", (event_id,))
+        return events[0] if events else None
+
+    def remove_event(self, index: int) -> bool:
+        if index < 0:
+            return False
+        with self._db_lock:
+            row = self.conn.execute(
+                "SELECT id FROM events ORDER BY pos LIMIT 1 OFFSET ?", (index,)).fetchone()
+            return row is not None and self.remove_by_id(row[0])
+
+    def remove_by_id(self, event_id: str) -> bool:
+        if OCCURRENCE_SEPARATOR in event_id:
+            return self._remove_occurrence(event_id)
+        with self._db_lock, self.conn:
+            event = self.get_by_id(event_id)
+            if event is None:
+                return False
+            self._delete(event_id)
+        self._notify_listeners('remove', event)
+        return True
+
+    def update_event(self, event_id: str, updated_event: Event, expected: Optional[Event] = None) -> bool:
+        event_id = event_id.partition(OCCURRENCE_SEPARATOR)[0]
+        with self._db_lock, self.conn:
+            row = self.conn.execute(
+                "SELECT pos FROM events WHERE id = ?", (event_id,)).fetchone()
+            if row is None:
+                return False
+            if expected is not None:
+                # Redovi su uvek novi objekti, pa se porede sadržaji (bez oznaka obaveštenja)
+                current = self.get_by_id(event_id)
+                if _edited_fields(current) != _edited_fields(getattr(expected, 'master', expected)):
+                    raise ConcurrentModificationError(f"Događaj {event_id} je u međuvremenu izmenjen")
+            updated_event.id = event_id
+            self._delete(event_id)
+            self._insert(updated_event, pos=row[0])
+        self._notify_listeners('update', updated_event)
+        return True
+
+    def _single_between(self, start: Optional[datetime], end: Optional[datetime]) -> List[Event]:
+        where, params = self._single_clause(start, end)
+        return self._query(f"SELECT {COLUMNS} FROM events {where} ORDER BY date_time", params)
+
+    def _single_window(self, start: Optional[datetime], end: Optional[datetime],
+                       offset: int, limit: int) -> List[Event]:
+        where, params = self._single_clause(start, end)
+        return self._query(
+            f"SELECT {COLUMNS} FROM events {where} ORDER BY date_time LIMIT ? OFFSET ?",
+            params + (limit, offset))
+
+    def _single_count(self, start: Optional[datetime], end: Optional[datetime]) -> int:
+        where, params = self._single_clause(start, end)
+        with self._db_lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM events {where}", params).fetchone()[0]
+
+    def _recurring_masters(self) -> List[Event]:
+        return self._query(f"SELECT {COLUMNS} FROM events WHERE recurrence IS NOT NULL ORDER BY pos")
+
+    def get_events_by_tags(self, any_of: Optional[Iterable[str]] = None,
+                           all_of: Optional[Iterable[str]] = None,
+                           none_of: Optional[Iterable[str]] = None,
+                           start: Optional[datetime] = None,
+                           end: Optional[datetime] = None,
+                           with_archive: bool = True) -> List[Event]:
+        where, params = self._single_clause(start, end)
+        conditions = [where[len("WHERE "):]]
+        params = list(params)
+        if all_of:
+            tags = sorted(set(all_of))
+            conditions.append(
+                f"id IN (SELECT event_id FROM event_tags WHERE tag IN ({', '.join('?' * len(tags))}) "
+                f"GROUP BY event_id HAVING COUNT(*) = ?)")
+            params += tags + [len(tags)]
+        if any_of:
+            tags = list(any_of)
+            conditions.append(
+                f"id IN (SELECT event_id FROM event_tags WHERE tag IN ({', '.join('?' * len(tags))}))")
+            params += tags
+        if none_of:
+            tags = list(none_of)
+            conditions.append(
+                f"id NOT IN (SELECT event_id FROM event_tags WHERE tag IN ({', '.join('?' * len(tags))}))")
+            params += tags
+        singles = self._query(
+            f"SELECT {COLUMNS} FROM events WHERE {' AND '.join(conditions)} ORDER BY date_time",
+            tuple(params))
+        masters = [master for master in self._recurring_masters()
+                   if self._tags_match(master, any_of, all_of, none_of)]
+        return list(self._with_occurrences(singles, masters, start, end))
+
+    def search(self, query: str, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, with_archive: bool = True) -> List[Event]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        if not self._fts:
+            found = [event for event in self.iter_events() if matches(terms, event_text(event))]
+            singles = sorted((event for event in found if event.recurrence is None
+                              and (start is None or event.date_time >= start)
+                              and (end is None or event.date_time <= end)), key=lambda x: x.epoch)
+            masters = [event for event in found if event.recurrence is not None]
+            return list(self._with_occurrences(singles, masters, start, end))
+        # Sve reči moraju da se nađu, svaka kao početak reči
+        match = " ".join(f'"{term}"*' for term in terms)
+        found = "pos IN (SELECT rowid FROM events_fts WHERE events_fts MATCH ?)"
+        where, params = self._single_clause(start, end)
+        singles = self._query(
+            f"SELECT {COLUMNS} FROM events {where} AND {found} ORDER BY date_time", params + (match,))
+        masters = self._query(
+            f"SELECT {COLUMNS} FROM events WHERE recurrence IS NOT NULL AND {found} ORDER BY pos", (match,))
+        return list(self._with_occurrences(singles, masters, start, end))
+
+    def build_search_index(self) -> None:
+        # Tabela za pretragu se ažurira uz svaki upis, pa nema šta da se gradi
+        pass
+
+    @staticmethod
+    def _single_clause(start: Optional[datetime], end: Optional[datetime]):
+        conditions, params = ["recurrence IS NULL"], []
+        if start is not None:
+            conditions.append("date_time >= ?")
+            params.append(_iso(start))
+        if end is not None:
+            conditions.append("date_time <= ?")
+            params.append(_iso(end))
+        return f"WHERE {' AND '.join(conditions)}", tuple(params)
+
+    def _max_duration_minutes(self) -> int:
+        with self._db_lock:
+            return self.conn.execute("SELECT COALESCE(MAX(duration_minutes), 0) FROM events").fetchone()[0]
+
+    def get_events_needing_notification(self) -> List[Event]:
+        now = datetime.now()
+        due = self._query(
+            f"SELECT {COLUMNS} FROM events WHERE notified = 0 AND notify_at <= ? "
+            f"AND recurrence IS NULL ORDER BY notify_at",
+            (_iso(now),))
+        return due + self._due_occurrences(now)
+
+    def get_pending_notifications(self) -> List[Event]:
+        pending = self._query(
+            f"SELECT {COLUMNS} FROM events WHERE notified = 0 AND recurrence IS NULL ORDER BY notify_at")
+        return pending + self._pending_occurrences()
+
+    def mark_events_notified(self, events: Iterable[Event]) -> None:
+        # Cela grupa obaveštenja se potvrđuje u jednoj transakciji; događaj
+        # pomeren posle isporuke se ne označava (vidi EventManager)
+        marked = []
+        with self._db_lock, self.conn:
+            for event in events:
+                if isinstance(event, Occurrence):
+                    master = self.get_by_id(event.series_id)
+                    current = None if master is None else event.in_series(master)
+                    if current is None:
+                        continue
+                    current.notified = True
+                    self.conn.execute(
+                        "UPDATE events SET notified_occurrences = ? WHERE id = ?",
+                        (self._encode_notified(master), master.id))
+                else:
+                    cursor = self.conn.execute(
+                        "UPDATE events SET notified = 1 WHERE id = ? AND notify_at = ? AND recurrence IS NULL",
+                        (event.id, _iso(event.notification_time())))
+                    if not cursor.rowcount:
+                        continue
+                    current = event
+                    current.notified = True
+                marked.append(current)
+        for event in marked:
+            self._notify_listeners('notified', event)
+
+    def save_events(self) -> None:
+        # Svaka izmena je već potvrđena u svojoj transakciji
+        pass
+
+    def load_events(self) -> None:
+        pass
+
+    def close(self) -> None:
+        with self._db_lock:
+            self.conn.close()
+
+    def _insert(self, event: Event, pos: Optional[int] = None) -> None:
+        notify_at = event.date_time - timedelta(minutes=event.notification_minutes)
+        recurrence = json.dumps(event.recurrence.to_dict()) if event.recurrence else None
+        cursor = self.conn.execute(
+            "INSERT INTO events (pos, id, title, description, date_time, notify_at, "
+            "notification_minutes, notified, tags, recurrence, notified_occurrences, "
+            "duration_minutes, location) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (pos, event.id, event.title, event.description, _iso(event.date_time),
+             _iso(notify_at), event.notification_minutes, int(event.notified),
+             json.dumps(event.tags, ensure_ascii=False), recurrence, self._encode_notified(event),
+             event.duration_minutes, event.location))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO event_tags (tag, event_id) VALUES (?, ?)",
+            [(tag, event.id) for tag in event.tags])
+        if self._fts:
+            self.conn.execute("INSERT INTO events_fts (rowid, text) VALUES (?, ?)",
+                              (cursor.lastrowid, _search_words(event)))
+
+    def _delete(self, event_id: str) -> None:
+        # Virtuelna tabela nema ON DELETE CASCADE, pa se red za pretragu briše ručno
+        if self._fts:
+            self.conn.execute(
+                "DELETE FROM events_fts WHERE rowid = (SELECT pos FROM events WHERE id = ?)", (event_id,))
+        self.conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Event]:
+        with self._db_lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [self._row_to_event(row) for row in rows]
+
+    @staticmethod
+    def _encode_notified(event: Event) -> Optional[str]:
+        if not event.notified_occurrences:
+            return None
+        return json.dumps(event.to_dict()['notified_occurrences'])
+
+    @staticmethod
+    def _row_to_event(row: tuple) -> Event:
+        (event_id, title, description, date_time, minutes, notified, tags, recurrence, occurrences,
+         duration, location) = row
+        data = {
+            'id': event_id,
+            'title': title,
+            'description': description,
+            'date_time': date_time,
+            'notification_minutes': minutes,
+            'notified': bool(notified),
+            'tags': json.loads(tags),
+            'duration_minutes': duration,
+            'location': location,
+        }
+        if recurrence:
+            data['recurrence'] = json.loads(recurrence)
+        if occurrences:
+            data['notified_occurrences'] = json.loads(occurrences)
+        return Event.from_dict(data)
+
+
+def _search_words(event: Event) -> str:
+    return " ".join(tokenize(event_text(event)))
+
+
+def _edited_fields(event: Event) -> Dict:
+    data = event.to_dict()
+    data.pop('notified', None)
+    data.pop('notified_occurrences', None)
+    return data
+
+
+def migrate_json_to_sqlite(json_file: str, manager: SQLiteEventManager) -> int:
+    # Čita snapshot, žurnal i arhivu JSON skladišta i sve prebacuje u jednoj transakciji
+    store = JournalStore(json_file)
+    data = store.load()
+    store.close()
+    events = [Event.from_dict(item) for item in data]
+    ids = {event.id for event in events}
+    archive = EventArchive(json_file + ".arhiva", Event.from_dict, Event.from_row)
+    events += [event for event in archive.iter_all() if event.id not in ids]
+    manager.add_events(events)
+    return len(events)
@@ -2,6 +2,11 @@
 
 # Skripta za pokretanje Pametnog Kancelarijskog Planera
 # Ova skripta postavlja virtuelno okruženje i pokreće aplikaciju
+#
+# Instalacija zavisnosti, provera tkinter-a i probno obaveštenje izvršavaju se
+# samo kada se nešto promenilo (requirements.txt, ova skripta ili verzija
+# Python-a). Tada se upisuje oznaka u venv/.provereno, pa sledeća pokretanja
+# odmah startuju aplikaciju. "./start.sh --proveri" ponavlja proveru.
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR"
@@ -15,15 +20,20 @@ if [ ! -d "venv" ]; then
     fi
 fi
 source venv/bin/activate
-pip install -r requirements.txt > /dev/null 2>&1
-python -c "import tkinter" 2>/dev/null
-if [ $? -ne 0 ]; then
-    echo "❌ tkinter nije dostupan. Molimo instalirajte ga:"
-    echo "   sudo apt install python3-tk"
-    exit 1
-fi
 
-python -c "
+STAMP_FILE="venv/.provereno"
+STAMP="$(cat requirements.txt "${BASH_SOURCE[0]}" | cksum) $(python -V 2>&1)"
+if [ "$1" = "--proveri" ] || [ ! -f "$STAMP_FILE" ] || [ "$(cat "$STAMP_FILE")" != "$STAMP" ]; then
+    pip install -r requirements.txt > /dev/null 2>&1
+    python -c "import tkinter" 2>/dev/null
+    if [ $? -ne 0 ]; then
+        echo "❌ tkinter nije dostupan. Molimo instalirajte ga:"
+        echo "   sudo apt install python3-tk"
+        exit 1
+    fi
+
+    python -c "
+import sys
 try:
     from plyer import notification
     notification.notify(
@@ -34,7 +44,13 @@ try:
     # print('Sistem obaveštenja radi')
 except Exception as e:
     print(f'Sistem obaveštenja neće raditi ispravno: {e}')
+    sys.exit(1)
 "
+    # Oznaka se upisuje samo ako je sve prošlo, da bi se neuspela provera ponovila
+    if [ $? -eq 0 ]; then
+        echo "$STAMP" > "$STAMP_FILE"
+    fi
+fi
 python main.py
 echo "Projektni zadatak za Epos Seminarski"
 echo "================================"
@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import Callable, Optional
+
+# Upis kreće kada izmene zastanu ovoliko sekundi, a najkasnije MAX posle
+# prve neupisane izmene (kada izmene stižu bez prestanka)
+WRITE_DELAY_SECONDS = 0.3
+MAX_WRITE_DELAY_SECONDS = 2.0
+# Posle neuspelog upisa (nedostupan deljeni disk) sledeći pokušaj ne ide pre ovoga
+RETRY_SECONDS = 5.0
+
+
+class WriteBehind:
+    # Pozadinska nit za odloženi upis. Izmena je u memoriji odmah, a
+    # schedule() samo beleži da postoji nešto za upis; write() (npr.
+    # JournalStore.flush) se poziva tek kada izmene zastanu, pa se brze
+    # uzastopne izmene spajaju u jedan upis. Neuspeo upis se ponavlja, a
+    # poruka o grešci je u error dok neki upis ne uspe. flush() je granica
+    # trajnosti: kada se vrati bez izuzetka, sve ranije izmene su na disku.
+
+    def __init__(self, write: Callable[[], None], delay: float = WRITE_DELAY_SECONDS,
+                 max_delay: float = MAX_WRITE_DELAY_SECONDS, retry_delay: float = RETRY_SECONDS,
+                 name: str = "odlozeni-upis"):
+        self.write = write
+        self.delay = delay
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.error: Optional[str] = None
+        self._condition = threading.Condition()
+        # Vreme prve i poslednje neupisane izmene (None kada nema ničega)
+        self._first: Optional[float] = None
+        self._last = 0.0
+        self._retry_at = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def schedule(self) -> None:
+        now = time.monotonic()
+        with self._condition:
+            if self._first is None:
+                self._first = now
+            self._last = now
+            self._condition.notify()
+
+    def flush(self) -> None:
+        # U niti pozivaoca; ako pozadinska nit upravo piše, write() čeka na nju
+        with self._condition:
+            self._first = None
+        self._write()
+
+    def close(self) -> None:
+        # Zaustavlja nit; ono što je ostalo u redu upisuje pozivalac (flush)
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    if self._first is not None:
+                        due = max(min(self._last + self.delay, self._first + self.max_delay), self._retry_at)
+                        wait = due - time.monotonic()
+                        if wait <= 0:
+                            break
+                    else:
+                        wait = None
+                    self._condition.wait(wait)
+                self._first = None
+            try:
+                self._write()
+            except Exception:
+                pass
+
+    def _write(self) -> None:
+        # Neuspeli zapisi su ostali u redu, pa se ponovni pokušaj zakazuje kao nova izmena
+        try:
+            self.write()
+        except Exception as e:
+            with self._condition:
+                self.error = str(e) or type(e).__name__
+                now = time.monotonic()
+                self._retry_at = now + self.retry_delay
+                if self._first is None:
+                    self._first = self._last = now
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.error = None
+            self._retry_at = 0.0